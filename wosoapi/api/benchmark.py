@@ -0,0 +1,516 @@
+"""Query-count and latency benchmark of every API and page route.
+
+``seed`` builds a deterministic synthetic dataset, ``cases`` lists the
+requests made against it and ``run_cases`` measures them. The
+``benchmark`` management command ties them together.
+"""
+
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.db import connection
+from django.template.response import SimpleTemplateResponse
+from django.test import Client
+from django.urls import get_resolver, reverse
+from rest_framework.serializers import BaseSerializer
+
+from api.exports import COLUMNAR_STREAMS, STREAMS
+from api.models import (
+    Club,
+    ClubSeasonStat,
+    Country,
+    Goalkeeper,
+    League,
+    Player,
+    PlayerSeasonStats,
+    Season,
+    name_slug,
+)
+from api.views import ClubSeasonStatView, GoalkeeperView, PlayerSeasonStatsView
+
+# code, name, country, country code
+LEAGUES = [
+    ("WSL", "Women's Super League", "England", "ENG"),
+    ("Frauen", "Frauen-Bundesliga", "Germany", "GER"),
+    ("Arkema", "Arkema Première Ligue", "France", "FRA"),
+    ("LigaF", "Liga F", "Spain", "ESP"),
+    ("SerieA", "Serie A Femminile", "Italy", "ITA"),
+    ("NWSL", "National Women's Soccer League", "United States", "USA"),
+]
+FIRST_NAMES = ["Alex", "Beth", "Chloe", "Dana", "Ella", "Fran", "Gina", "Hana"]
+LAST_NAMES = ["Smith", "Müller", "Martin", "García", "Rossi", "Brown", "Kerr"]
+POSITIONS = ["FW", "MF", "DF", "FW,MF", "DF,MF"]
+GOALKEEPERS_PER_CLUB = 2
+# Filled explicitly rather than with random numbers
+SEEDED_FIELDS = {"age", "league_position", "points_won", "minutes_played"}
+
+# Route names that are measured, i.e. everything in api/urls.py and core/urls.py
+URLCONFS = ["api.urls", "core.urls"]
+
+
+def _stat_values(rnd, model):
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.is_relation or field.primary_key or field.name in SEEDED_FIELDS:
+            continue
+        kind = field.get_internal_type()
+        if kind in ("IntegerField", "SmallIntegerField"):
+            values[field.name] = rnd.randint(0, 40)
+        elif kind == "FloatField":
+            values[field.name] = round(rnd.uniform(0, 15), 2)
+    return values
+
+
+def seed(leagues=3, seasons=3, clubs=8, players=20, random_seed=0):
+    """Fills the database with ``leagues`` x ``seasons`` x ``clubs`` x ``players``.
+
+    Every club has ``players`` outfield players and two goalkeepers, who
+    keep playing for it every season. The same arguments always produce the
+    same rows. Returns the number of player season rows created.
+    """
+    rnd = random.Random(random_seed)
+    league_objs = []
+    for code, name, country_name, country_code in LEAGUES[:leagues]:
+        country = Country.objects.create(name=country_name, code=country_code)
+        league_objs.append(
+            League.objects.create(
+                country=country, name=name, code=code, total_clubs=clubs
+            )
+        )
+
+    season_objs = Season.objects.bulk_create(
+        Season(league=league, season=f"{2020 + s}/{2021 + s}")
+        for league in league_objs
+        for s in range(seasons)
+    )
+    # bulk_create() skips save(), so the (unique) names get their slugs here
+    club_objs = Club.objects.bulk_create(
+        Club(
+            name=name,
+            slug=name_slug(name),
+            fbref_id=f"{league.code.lower()}c{c:03d}",
+            stadium=f"{league.code} Stadium {c + 1:02d}",
+        )
+        for league in league_objs
+        for c in range(clubs)
+        for name in [f"{league.code} Club {c + 1:02d}"]
+    )
+    squad_size = players + GOALKEEPERS_PER_CLUB
+    player_objs = Player.objects.bulk_create(
+        Player(
+            full_name=name,
+            slug=name_slug(name),
+            fbref_id=f"p{i:06d}",
+            nationality=f"{country} {country.upper()}",
+            age=rnd.randint(16, 36),
+        )
+        for i, country in enumerate(
+            rnd.choice(["eng", "ger", "fra", "esp", "ita", "usa"])
+            for _ in range(len(club_objs) * squad_size)
+        )
+        for name in [f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)} {i}"]
+    )
+
+    club_stats, player_stats, goalkeeper_stats = [], [], []
+    for season in season_objs:
+        league = season.league
+        league_clubs = [club for club in club_objs if club.name.startswith(league.code)]
+        for position, club in enumerate(league_clubs, start=1):
+            club_stats.append(
+                ClubSeasonStat(
+                    club=club,
+                    season=season,
+                    league=league,
+                    league_position=position,
+                    points_won=rnd.randint(0, 66),
+                    **_stat_values(rnd, ClubSeasonStat),
+                )
+            )
+            index = club_objs.index(club) * squad_size
+            squad = player_objs[index : index + squad_size]
+            for player in squad[GOALKEEPERS_PER_CLUB:]:
+                player_stats.append(
+                    PlayerSeasonStats(
+                        player=player,
+                        season=season,
+                        club=club,
+                        league=league,
+                        position=rnd.choice(POSITIONS),
+                        age=player.age,
+                        minutes_played=rnd.randint(0, 2500),
+                        **_stat_values(rnd, PlayerSeasonStats),
+                    )
+                )
+            for player in squad[:GOALKEEPERS_PER_CLUB]:
+                goalkeeper_stats.append(
+                    Goalkeeper(
+                        player=player,
+                        season=season,
+                        club=club,
+                        league=league,
+                        age=player.age,
+                        **_stat_values(rnd, Goalkeeper),
+                    )
+                )
+
+    ClubSeasonStat.objects.bulk_create(club_stats, batch_size=1000)
+    PlayerSeasonStats.objects.bulk_create(player_stats, batch_size=1000)
+    Goalkeeper.objects.bulk_create(goalkeeper_stats, batch_size=1000)
+    return len(player_stats)
+
+
+class Case:
+    """One request of the benchmark."""
+
+    def __init__(self, name, kwargs=None, query="", admin=False, tag=""):
+        self.name = name
+        self.kwargs = kwargs or {}
+        self.query = query
+        self.admin = admin
+        # Tells apart the cases of one route that only differ in their kwargs
+        self.tag = tag
+
+    @property
+    def url(self):
+        url = reverse(self.name, kwargs=self.kwargs)
+        return f"{url}?{self.query}" if self.query else url
+
+    @property
+    def label(self):
+        label = f"{self.name}[{self.tag}]" if self.tag else self.name
+        return f"{label}?{self.query}" if self.query else label
+
+
+def cases():
+    """The requests to measure, with ids taken from the seeded data."""
+    league = League.objects.order_by("id").first()
+    season = Season.objects.filter(league=league).order_by("season").last()
+    club = Club.objects.order_by("id").first()
+    stat = PlayerSeasonStats.objects.order_by("id").first()
+    goalkeeper = Goalkeeper.objects.order_by("id").first()
+    club_stat = ClubSeasonStat.objects.order_by("id").first()
+    pk = lambda obj: {"pk": obj.pk}
+
+    return [
+        Case("api-root"),
+        Case("all_countries-list"),
+        Case("all_countries-list", query="search=an&ordering=-code"),
+        Case("all_countries-detail", pk(league.country)),
+        Case("all_leagues-list"),
+        Case("all_leagues-list", query="country__name__icontains=an&ordering=-name"),
+        Case("all_leagues-detail", pk(league)),
+        Case("seasons-list"),
+        Case("seasons-list", query=f"season={season.season}&ordering=-league__name"),
+        Case("seasons-detail", pk(season)),
+        Case("all_clubs-list"),
+        Case("all_clubs-list", query="search=Club&ordering=-name&limit=100"),
+        Case("all_clubs-detail", pk(club)),
+        Case("club_stats-list"),
+        Case(
+            "club_stats-list",
+            query=f"season__season={season.season}&ordering=-points_won&limit=50",
+        ),
+        Case("club_stats-list", query="search=Club&goals_scored__gte=10"),
+        Case("club_stats-list", query="ordering=-goal_diff&limit=20"),
+        Case("club_stats-export", query=f"season__season={season.season}"),
+        Case("club_stats-detail", pk(club_stat)),
+        Case("all_players-list"),
+        Case("all_players-list", query="age__gte=25&ordering=-age&limit=100"),
+        Case("all_players-list", query="search=Smith"),
+        Case("all_players-detail", pk(stat.player)),
+        Case("all_players-percentiles", pk(stat.player)),
+        Case(
+            "all_players-percentiles",
+            pk(stat.player),
+            query=f"season={season.season}&peer=top5&position=MF",
+        ),
+        Case("all_players-similar", pk(stat.player)),
+        Case(
+            "all_players-similar",
+            pk(stat.player),
+            query=f"season={season.season}&k=25&method=zscore&peer=top5",
+        ),
+        Case("season_player_stats-list"),
+        Case("season_player_stats-list", query="limit=100"),
+        Case(
+            "season_player_stats-list",
+            query=f"league__code={league.code}&season__season={season.season}"
+            "&ordering=-xg&limit=50",
+        ),
+        Case(
+            "season_player_stats-list",
+            query="goals__gte=10&minutes_played__gte=500&ordering=-assists",
+        ),
+        Case(
+            "season_player_stats-list",
+            query="minutes_played__gte=900&ordering=-xg_per90&limit=50",
+        ),
+        Case("season_player_stats-list", query="search=Smith&limit=50"),
+        Case(
+            "season_player_stats-list",
+            query="fields=player_name,club_name,goals,xg&ordering=-goals&limit=100",
+        ),
+        Case("season_player_stats-list", query="cursor=&limit=50"),
+        Case("season_player_stats-list", query="limit=50&offset=500&count=false"),
+        Case("season_player_stats-export"),
+        Case(
+            "season_player_stats-export",
+            query=f"format=ndjson&league__code={league.code}&fields=player_name,goals,xg",
+        ),
+        Case("season_player_stats-detail", pk(stat)),
+        Case("goalkeepers-list"),
+        Case("goalkeepers-list", query="ordering=-saves&limit=50"),
+        Case("goalkeepers-list", query=f"league__code={league.code}"),
+        Case("goalkeepers-list", query="omit=league,season&limit=100"),
+        Case("goalkeepers-export", query="format=ndjson"),
+        *(
+            Case("season_player_stats-export", query=f"format={name}")
+            for name in COLUMNAR_STREAMS
+        ),
+        Case("goalkeepers-detail", pk(goalkeeper)),
+        Case("search", query="q=Smith"),
+        Case("search", query=f"q={league.code}+Club&type=club&limit=50"),
+        Case("league_seasons", {"league_id": league.pk}),
+        Case("league_clubs", {"league_id": league.pk}, query="limit=50"),
+        Case("league_players", {"league_id": league.pk}),
+        Case(
+            "league_players",
+            {"league_id": league.pk},
+            query=f"season__season={season.season}&ordering=-goals&limit=50",
+        ),
+        Case("league_goalkeepers", {"league_id": league.pk}),
+        Case("club_detail", {"club_id": club.pk}),
+        Case("club_players", {"club_id": club.pk}),
+        Case("club_players", {"club_id": club.pk}, query="limit=100"),
+        Case("club_goalkeepers", {"club_id": club.pk}),
+        Case("documentation_view"),
+        Case("response_cache_stats", admin=True),
+        Case("home"),
+        Case("club_stats_by_league", {"league_code": league.code}),
+        Case("club_stats_by_club", {"club_name": str(club.pk)}, tag="id"),
+        Case("club_stats_by_club", {"club_name": club.name}, tag="name"),
+        Case("player_detail", {"player_id": stat.player.full_name}),
+        Case(
+            "player_detail",
+            {"player_id": goalkeeper.player.full_name},
+            tag="goalkeeper",
+        ),
+        Case("robots_txt"),
+        Case(
+            "europe_top5_leagues",
+            {"season_season": season.season.replace("/", "-")},
+        ),
+        Case("europe_season_lists"),
+    ]
+
+
+def route_names():
+    """Every named route of ``URLCONFS``."""
+    names = set()
+    for urlconf in URLCONFS:
+        for pattern in get_resolver(urlconf).url_patterns:
+            for inner in getattr(pattern, "url_patterns", [pattern]):
+                if inner.name:
+                    names.add(inner.name)
+    return names
+
+
+def clear_caches():
+    """Drops every cached page and response so each request does its full work."""
+    from api.mixins import response_caches
+    from api.season_cache import season_caches
+
+    for cache in caches.all():
+        cache.clear()
+    for cache in response_caches.values():
+        cache.clear()
+    for cache in season_caches:
+        cache.clear()
+
+
+class SqlTimer:
+    """A ``connection.execute_wrapper`` counting and timing the queries."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class Probe:
+    """Accumulates the time spent in a function, minus the SQL it ran."""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.seconds = 0.0
+        self.depth = 0
+
+    def wrap(self, func):
+        def timed(*args, **kwargs):
+            if self.depth:
+                return func(*args, **kwargs)
+            self.depth += 1
+            sql = self.sql.seconds
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.seconds += elapsed - (self.sql.seconds - sql)
+                self.depth -= 1
+
+        return timed
+
+
+@contextmanager
+def probes():
+    """Times the SQL, serializer ``.data`` and response rendering while active."""
+    sql = SqlTimer()
+    serialize, render = Probe(sql), Probe(sql)
+    data = BaseSerializer.data
+    original_render = SimpleTemplateResponse.render
+    BaseSerializer.data = property(serialize.wrap(data.fget))
+    SimpleTemplateResponse.render = render.wrap(original_render)
+    try:
+        with connection.execute_wrapper(sql):
+            yield sql, serialize, render
+    finally:
+        BaseSerializer.data = data
+        SimpleTemplateResponse.render = original_render
+
+
+def measure(client, case, headers, runs):
+    """Requests ``case`` ``runs`` times (after one warm-up) with cold caches."""
+    samples = {"queries": [], "sql": [], "serialize": [], "render": [], "latency": []}
+    for attempt in range(runs + 1):
+        clear_caches()
+        with probes() as (sql, serialize, render):
+            started = time.perf_counter()
+            # secure, or SECURE_SSL_REDIRECT answers every request with a 301
+            response = client.get(case.url, secure=True, **headers)
+            # Streamed exports only run their queries as they are read
+            content = (
+                b"".join(response.streaming_content)
+                if response.streaming
+                else response.content
+            )
+            elapsed = time.perf_counter() - started
+        if attempt == 0:
+            continue
+        samples["queries"].append(sql.queries)
+        samples["sql"].append(sql.seconds * 1000)
+        samples["serialize"].append(serialize.seconds * 1000)
+        samples["render"].append(render.seconds * 1000)
+        samples["latency"].append(elapsed * 1000)
+
+    latency = samples["latency"]
+    return {
+        "url": case.url,
+        "status": response.status_code,
+        "bytes": len(content),
+        "queries": max(samples["queries"]),
+        "sql_ms": round(statistics.mean(samples["sql"]), 3),
+        "serialize_ms": round(statistics.mean(samples["serialize"]), 3),
+        "render_ms": round(statistics.mean(samples["render"]), 3),
+        "p50_ms": round(statistics.median(latency), 3),
+        "p95_ms": round(statistics.quantiles(latency, n=20)[18], 3),
+    }
+
+
+def run_cases(selected, headers, admin_headers, runs=20):
+    """``{label: measurement}`` for every case in ``selected``."""
+    client = Client(raise_request_exception=False)
+    results = {}
+    for case in selected:
+        results[case.label] = measure(
+            client, case, admin_headers if case.admin else headers, runs
+        )
+    return results
+
+
+FAST_LIST_ROUTES = {
+    "season_player_stats-list": PlayerSeasonStatsView,
+    "goalkeepers-list": GoalkeeperView,
+    "club_stats-list": ClubSeasonStatView,
+}
+
+
+@contextmanager
+def fast_list(view, enabled):
+    previous = view.fast_list
+    view.fast_list = enabled
+    try:
+        yield
+    finally:
+        view.fast_list = previous
+
+
+def fast_list_speedup(headers, limits=(10, 100, 1000), runs=20):
+    """The stats lists measured with and without ``FastListMixin``.
+
+    Returns ``{label: {"rows": ..., "serializer": ..., "values": ...}}``
+    with the measurements of both paths for every page size.
+    """
+    client = Client(raise_request_exception=False)
+    results = {}
+    for name, view in FAST_LIST_ROUTES.items():
+        for limit in limits:
+            case = Case(name, query=f"limit={limit}")
+            response = client.get(case.url, secure=True, **headers)
+            result = {"rows": len(response.json()["results"])}
+            for key, enabled in (("serializer", False), ("values", True)):
+                with fast_list(view, enabled):
+                    result[key] = measure(client, case, headers, runs)
+            results[case.label] = result
+    return results
+
+
+def export_formats(headers, runs=5):
+    """Every season player stats row as one JSON list page and in each export format.
+
+    Returns ``{label: {"rows": ..., **measurement}}``, the list page first.
+    """
+    client = Client(raise_request_exception=False)
+    rows = PlayerSeasonStats.objects.count()
+    selected = [Case("season_player_stats-list", query=f"limit={rows}")]
+    selected += [
+        Case("season_player_stats-export", query=f"format={name}")
+        for name in [*STREAMS, *COLUMNAR_STREAMS]
+    ]
+    return {
+        case.label: {"rows": rows, **measure(client, case, headers, runs)}
+        for case in selected
+    }
+
+
+def compare(baseline, results):
+    """The regressions of ``results`` against ``baseline``, as messages.
+
+    A route regresses when it runs more queries than before or stops
+    answering with a success status. A route that used to fail is only
+    compared once it has a successful baseline.
+    """
+    regressions = []
+    for label, current in results.items():
+        before = baseline.get(label)
+        if before is None or before["status"] >= 400:
+            continue
+        if current["queries"] > before["queries"]:
+            regressions.append(
+                f"{label}: {before['queries']} -> {current['queries']} queries"
+            )
+        if before["status"] < 400 <= current["status"]:
+            regressions.append(
+                f"{label}: status {before['status']} -> {current['status']}"
+            )
+    return regressions
@@ -0,0 +1,179 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+import pandas as pd
+
+_preloaded_csvs = ContextVar("preloaded_csvs", default={})
+_preloaded_conversions = ContextVar("preloaded_conversions", default={})
+
+INT = "int"
+FLOAT = "float"
+TEXT = "text"
+AGE = "age"
+
+
+class Column:
+    """One model field filled from a CSV column.
+
+    ``dtype`` is ``INT``, ``FLOAT``, ``TEXT`` or ``AGE`` (``"YY-DDD"``
+    strings or plain numbers). Missing values become ``default``. With
+    ``minus`` the field is the difference of two numeric columns and falls
+    back to ``default`` when either of them is missing.
+    """
+
+    def __init__(self, field, csv, dtype=INT, default=0, minus=None):
+        self.field = field
+        self.csv = csv
+        self.dtype = dtype
+        self.default = default
+        self.minus = minus
+
+    @property
+    def sources(self):
+        return [self.csv] if self.minus is None else [self.csv, self.minus]
+
+    def __repr__(self):
+        return f"Column({self.field!r}, {self.csv!r}, {self.dtype!r})"
+
+
+def read_csv(path):
+    """``pd.read_csv(path)``, or the frame already parsed for it by ``preloaded``."""
+    frame = _preloaded_csvs.get().get(path)
+    if frame is None:
+        return pd.read_csv(path)
+    return frame.copy()
+
+
+@contextmanager
+def preloaded(frames, conversions=None):
+    """Serve ``{path: DataFrame}`` to ``read_csv`` instead of reading the files again.
+
+    ``conversions`` (``{(path, spec_key(columns)): (data, valid)}``) are
+    served to ``convert`` the same way.
+    """
+    tokens = (
+        _preloaded_csvs.set({**_preloaded_csvs.get(), **frames}),
+        _preloaded_conversions.set(
+            {**_preloaded_conversions.get(), **(conversions or {})}
+        ),
+    )
+    try:
+        yield
+    finally:
+        _preloaded_csvs.reset(tokens[0])
+        _preloaded_conversions.reset(tokens[1])
+
+
+def spec_key(columns):
+    """A hashable key for a list of ``Column``, equal across processes."""
+    return tuple(
+        (column.field, column.csv, column.dtype, column.default, column.minus)
+        for column in columns
+    )
+
+
+def read_and_convert(path, specs):
+    """``(DataFrame, {spec_key: (data, valid)})`` for the CSV at ``path``.
+
+    Run in a worker process: the file is parsed and converted with every
+    spec in ``specs`` whose columns it has.
+    """
+    df = pd.read_csv(path)
+    conversions = {
+        spec_key(columns): convert(df, columns)
+        for columns in specs
+        if set(required_columns(columns)) <= set(df.columns)
+    }
+    return df, conversions
+
+
+def required_columns(columns):
+    """The CSV columns a spec reads, in order and without repeats."""
+    return list(dict.fromkeys(name for column in columns for name in column.sources))
+
+
+def parse_numbers(column):
+    """``float(str(value).replace(",", ""))`` for a whole column.
+
+    Missing values stay NaN, and so do values that don't parse.
+    """
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        return column.astype(float)
+    text = column.astype(str).str.replace(",", "", regex=False)
+    parsed = pd.to_numeric(text, errors="coerce").where(column.notna())
+    # to_numeric only finds the bad values; astype parses exactly like float()
+    return text[parsed.notna()].astype(float).reindex(column.index)
+
+
+def parse_age(column):
+    """Ages like ``"23-123"`` (years-days) or ``23.0`` as integers, else NA."""
+    text = column.astype(str).str.strip()
+    has_days = text.str.contains("-", regex=False)
+    years = text.str.split("-", n=1).str[0]
+    age = pd.to_numeric(
+        years.where(~has_days | years.str.fullmatch(r"\d+")), errors="coerce"
+    )
+    return np.trunc(age.where(column.notna() & np.isfinite(age))).astype("Int64")
+
+
+def convert(df, columns, path=None):
+    """Converts the CSV columns of ``df`` into one typed column per field.
+
+    Returns the converted frame and a boolean Series that is False for the
+    rows holding a value that isn't a number, i.e. the rows the per-cell
+    ``int(float(...))`` conversion used to reject. When ``df`` was read
+    from ``path`` and ``preloaded`` holds a conversion of that file, its
+    rows for ``df``'s index are returned instead.
+    """
+    done = path and _preloaded_conversions.get().get((path, spec_key(columns)))
+    if done:
+        data, valid = done
+        return data.loc[df.index], valid.loc[df.index]
+
+    numbers = {}
+    valid = pd.Series(True, index=df.index)
+
+    def number(name):
+        nonlocal valid
+        if name not in numbers:
+            numbers[name] = parse_numbers(df[name])
+            valid &= df[name].isna() | numbers[name].notna()
+        return numbers[name]
+
+    data = {}
+    for column in columns:
+        if column.dtype == TEXT:
+            raw = df[column.csv]
+            data[column.field] = raw.astype(object).where(raw.notna(), column.default)
+        elif column.dtype == AGE:
+            data[column.field] = parse_age(df[column.csv])
+        else:
+            values = number(column.csv)
+            if column.minus is not None:
+                values = values - number(column.minus)
+            if column.dtype == INT:
+                finite = np.isfinite(values)
+                valid &= values.isna() | finite
+                values = np.trunc(values.where(finite, column.default)).astype("int64")
+            else:
+                values = values.fillna(column.default)
+            data[column.field] = values
+    return pd.DataFrame(data, index=df.index), valid
+
+
+def records(data):
+    """The rows of a converted frame as dicts of plain Python values."""
+    return data.astype(object).where(data.notna(), None).to_dict("records")
+
+
+def fingerprints(data):
+    """A 16 character hash of every converted row.
+
+    Stored next to the imported row, it lets the next import skip the rows
+    whose values didn't change. The hash covers the column names and order
+    too, so changing a spec makes every row count as changed once.
+    """
+    hashes = pd.util.hash_pandas_object(data, index=False)
+    salt = pd.util.hash_array(np.array([",".join(data.columns)], dtype=object))[0]
+    return (hashes ^ salt).map("{:016x}".format)
@@ -0,0 +1,224 @@
+import csv
+import io
+from itertools import islice
+
+from django.conf import settings
+from django.db import models
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Rows read per database round trip, and written per streamed chunk
+CHUNK_SIZE = 2000
+# Rows per Arrow record batch and Parquet row group
+BATCH_SIZE = 10000
+
+
+class CSVRenderer(BaseRenderer):
+    """``text/csv`` for the export actions.
+
+    Exports stream their rows with ``stream_csv``; this renderer only
+    writes the (error) responses that go through DRF, as key/value rows.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        items = data.items() if isinstance(data, dict) else enumerate(data)
+        for key, value in items:
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(message) for message in value)
+            writer.writerow([key, value])
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Newline delimited JSON, one object per line, see ``stream_ndjson``."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(data, accepted_media_type, renderer_context) + b"\n"
+
+
+def stream_csv(names, rows):
+    """A header and one CSV line per row, yielded ``CHUNK_SIZE`` rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_ndjson(names, rows):
+    """One JSON object per row and line, yielded ``CHUNK_SIZE`` rows at a time."""
+    # The same settings as DRF's JSONRenderer
+    encoder = JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+    lines = []
+    for row in rows:
+        lines.append(encoder.encode(dict(zip(names, row))))
+        if len(lines) == CHUNK_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+class ArrowRenderer(BaseRenderer):
+    """Apache Arrow IPC stream for the export actions, see ``stream_arrow``.
+
+    Binary formats can't hold an error; ``ExportMixin`` sends those as JSON.
+    """
+
+    media_type = "application/vnd.apache.arrow.stream"
+    format = "arrow"
+    charset = None
+    render_style = "binary"
+
+
+class ParquetRenderer(ArrowRenderer):
+    """Apache Parquet for the export actions, see ``stream_parquet``."""
+
+    media_type = "application/vnd.apache.parquet"
+    format = "parquet"
+
+
+def arrow_type(field):
+    """The Arrow type holding the values of the model ``field``."""
+    if field.is_relation:
+        field = field.target_field
+    if field.generated:
+        field = field.output_field
+    if isinstance(field, models.BooleanField):
+        return pyarrow.bool_()
+    if isinstance(field, models.FloatField):
+        return pyarrow.float64()
+    if isinstance(field, models.DecimalField):
+        return pyarrow.decimal128(field.max_digits, field.decimal_places)
+    # The auto fields subclass the integer field of their size
+    if isinstance(field, models.BigIntegerField):
+        return pyarrow.int64()
+    if isinstance(field, models.PositiveSmallIntegerField):
+        return pyarrow.uint16()
+    if isinstance(field, models.SmallIntegerField):
+        return pyarrow.int16()
+    if isinstance(field, models.PositiveIntegerField):
+        return pyarrow.uint32()
+    if isinstance(field, models.IntegerField):
+        return pyarrow.int32()
+    if isinstance(field, models.DateTimeField):
+        return pyarrow.timestamp("us", tz="UTC" if settings.USE_TZ else None)
+    if isinstance(field, models.DateField):
+        return pyarrow.date32()
+    return pyarrow.string()
+
+
+def arrow_schema(model, names, lookups):
+    """An Arrow schema for the ``values_list(*lookups)`` rows of ``model``.
+
+    The types mirror the model fields, and a column is nullable when any
+    field along its lookup is.
+    """
+    columns = []
+    for name, lookup in zip(names, lookups):
+        current, nullable = model, False
+        for part in lookup.split("__"):
+            field = current._meta.get_field(part)
+            nullable = nullable or field.null
+            current = field.related_model
+        columns.append(pyarrow.field(name, arrow_type(field), nullable=nullable))
+    return pyarrow.schema(columns)
+
+
+def record_batches(schema, rows):
+    """``BATCH_SIZE`` rows at a time, transposed into one Arrow array per column."""
+    rows = iter(rows)
+    while batch := list(islice(rows, BATCH_SIZE)):
+        yield pyarrow.RecordBatch.from_arrays(
+            [
+                pyarrow.array(column, type=field.type)
+                for column, field in zip(zip(*batch), schema)
+            ],
+            schema=schema,
+        )
+
+
+class _Sink:
+    """A write only file for pyarrow, emptied as the response streams it."""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        # Parquet records the offsets of its row groups in the footer
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _stream_batches(open_writer, schema, rows):
+    sink = _Sink()
+    writer = open_writer(pyarrow.PythonFile(sink, mode="w"), schema)
+    for batch in record_batches(schema, rows):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def stream_arrow(schema, rows):
+    """An Arrow IPC stream, one record batch per ``BATCH_SIZE`` rows."""
+    return _stream_batches(pyarrow.ipc.new_stream, schema, rows)
+
+
+def stream_parquet(schema, rows):
+    """A Parquet file, one row group per ``BATCH_SIZE`` rows."""
+    return _stream_batches(pyarrow.parquet.ParquetWriter, schema, rows)
+
+
+STREAMS = {CSVRenderer.format: stream_csv, NDJSONRenderer.format: stream_ndjson}
+# Written from the database values, typed with ``arrow_schema``
+COLUMNAR_STREAMS = {}
+EXPORT_RENDERERS = [CSVRenderer, NDJSONRenderer]
+if pyarrow is not None:
+    COLUMNAR_STREAMS = {
+        ArrowRenderer.format: stream_arrow,
+        ParquetRenderer.format: stream_parquet,
+    }
+    EXPORT_RENDERERS += [ArrowRenderer, ParquetRenderer]
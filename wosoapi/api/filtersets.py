@@ -0,0 +1,16 @@
+from django_filters.rest_framework import DjangoFilterBackend, FilterSet
+
+
+class StatsFilterSet(FilterSet):
+    """``FilterSet`` that also builds filters for the derived (generated) columns."""
+
+    @classmethod
+    def filter_for_lookup(cls, field, lookup_type):
+        # Filter a generated column like the values it holds
+        if field.generated:
+            field = field.output_field
+        return super().filter_for_lookup(field, lookup_type)
+
+
+class StatsFilterBackend(DjangoFilterBackend):
+    filterset_base = StatsFilterSet
@@ -0,0 +1,431 @@
+"""Composite index proposals from the queries the API actually runs.
+
+``replay`` records the SQL of the benchmark cases and ``read_log`` loads
+statements captured elsewhere. ``access_pattern`` reduces a SELECT on one
+of the api tables to what an index could serve: the columns compared for
+equality, the columns sorted by and the range comparisons. Equality on a
+joined table's column (``league__code=WSL``) counts as equality on the
+foreign key. ``propose`` turns the patterns into equality, sort, range
+ordered indexes. It drops those an existing index, or a longer proposal,
+already covers, and ranks the rest by the SQL time they would serve.
+
+The parser only knows Django's SQL: quoted names, ``AND``-ed WHERE terms,
+and ORDER BY on columns, select aliases or select positions. Anything
+else (ORs, functions, subqueries) is left out of a pattern, and so is a
+sort without a filter or a LIMIT.
+"""
+
+import re
+import statistics
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.db import connection, models
+from django.test import Client
+
+from api.benchmark import clear_caches
+
+# Longer composite indexes cost more to write than they save on reads
+MAX_COLUMNS = 4
+# Smaller tables are scanned about as fast as an index is searched
+MIN_ROWS = 1000
+KEYWORDS = (" FROM ", " WHERE ", " GROUP BY ", " HAVING ", " ORDER BY ", " LIMIT ")
+COLUMN = re.compile(r'^"(\w+)"\."(\w+)"')
+JOIN = re.compile(
+    r'(?:INNER|LEFT OUTER) JOIN "(\w+)"(?: (\w+))? ON '
+    r'\("(\w+)"\."(\w+)" = "(\w+)"\."(\w+)"\)'
+)
+TERM = re.compile(r'^"(\w+)"\."(\w+)" (=|IN|IS NULL|>=|<=|>|<|BETWEEN)(?=\s|\(|$)')
+ORDER_TERM = re.compile(r'^(?:"(\w+)"\."(\w+)"|(\d+)|"(\w+)")(?: (ASC|DESC))?')
+EQUALITY = ("=", "IN", "IS NULL")
+# PostgreSQL's log_statement / log_min_duration_statement lines
+LOG_LINE = re.compile(
+    r"(?:duration: (?P<ms>[\d.]+) ms\s+)?(?:statement|execute [^:]*): (?P<sql>.*)"
+)
+
+
+class Query:
+    """One captured statement."""
+
+    def __init__(self, label, sql, params=None, seconds=0.0):
+        self.label = label
+        self.sql = sql
+        self.params = params
+        self.seconds = seconds
+
+
+class QueryLog:
+    """A ``connection.execute_wrapper`` keeping every statement and its time."""
+
+    def __init__(self):
+        self.queries = []
+        self.label = ""
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                Query(self.label, sql, params, time.perf_counter() - started)
+            )
+
+
+def replay(selected, headers, admin_headers):
+    """The queries of one cold-cache request per benchmark case."""
+    client = Client(raise_request_exception=False)
+    log = QueryLog()
+    for case in selected:
+        clear_caches()
+        log.label = case.label
+        with connection.execute_wrapper(log):
+            response = client.get(
+                case.url, secure=True, **(admin_headers if case.admin else headers)
+            )
+            if response.streaming:
+                b"".join(response.streaming_content)
+    return log.queries
+
+
+def read_log(path):
+    """The SELECTs of a log with one statement per line.
+
+    PostgreSQL's ``statement:`` / ``execute <name>:`` prefixes are
+    stripped, and a ``duration:`` on the same line is kept as the time.
+    """
+    queries = []
+    for line in Path(path).read_text().splitlines():
+        match = LOG_LINE.search(line)
+        sql = match["sql"] if match else line.strip()
+        if sql.upper().startswith("SELECT"):
+            seconds = float(match["ms"]) / 1000 if match and match["ms"] else 0.0
+            queries.append(Query(Path(path).name, sql.rstrip(";"), None, seconds))
+    return queries
+
+
+def split_top(text, separator):
+    """``text`` split on ``separator`` outside parentheses and quotes."""
+    parts, depth, quote, start, index = [], 0, None, 0, 0
+    while index < len(text):
+        char = text[index]
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0 and text.startswith(separator, index):
+            parts.append(text[start:index])
+            index += len(separator)
+            start = index
+            continue
+        index += 1
+    parts.append(text[start:])
+    return parts
+
+
+def closing(text):
+    """The index of the parenthesis closing the one ``text`` starts with."""
+    depth, quote = 0, None
+    for index, char in enumerate(text):
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return index
+    return -1
+
+
+def unwrap(text):
+    """``text`` without the parentheses around all of it."""
+    text = text.strip()
+    while text.startswith("(") and closing(text) == len(text) - 1:
+        text = text[1:-1].strip()
+    return text
+
+
+def clauses(sql):
+    """``{"SELECT": ..., "FROM": ..., "WHERE": ..., ...}`` of the outer query."""
+    positions = []
+    for keyword in KEYWORDS:
+        parts = split_top(sql, keyword)
+        if len(parts) > 1:
+            positions.append((len(parts[0]), keyword))
+    positions.sort()
+    result, start, name = {}, 0, "SELECT"
+    for position, keyword in positions:
+        result[name] = sql[start:position]
+        start, name = position + len(keyword), keyword.strip()
+    result[name] = sql[start:]
+    result["SELECT"] = result["SELECT"].strip()[len("SELECT") :]
+    return result
+
+
+class Pattern:
+    """How a query reads one table."""
+
+    def __init__(self, table, equal, order, ranges):
+        self.table = table
+        self.equal = equal
+        self.order = order
+        self.ranges = ranges
+
+
+def access_pattern(sql, tables):
+    """The ``Pattern`` of a SELECT on one of ``tables``, or ``None``."""
+    if not sql.lstrip().upper().startswith("SELECT"):
+        return None
+    parts = clauses(sql)
+    source = parts.get("FROM", "").strip()
+    if source.startswith("("):
+        # COUNT(*) FROM (SELECT ...) subquery
+        return access_pattern(source[1 : closing(source)], tables)
+    match = re.match(r'"(\w+)"', source)
+    table = match and match.group(1)
+    if table not in tables:
+        return None
+
+    foreign_keys = {}
+    for join in JOIN.finditer(source):
+        joined, alias, left, left_column, right, right_column = join.groups()
+        if left == table:
+            foreign_keys[alias or joined] = left_column
+
+    equal, ranges = set(), set()
+    for term in split_top(unwrap(parts.get("WHERE", "")), " AND "):
+        term = unwrap(term)
+        match = TERM.match(term)
+        if not match or len(split_top(term, " OR ")) > 1:
+            continue
+        term_table, column, operator = match.groups()
+        if term_table != table:
+            if term_table not in foreign_keys or operator not in EQUALITY:
+                continue
+            column = foreign_keys[term_table]
+        (equal if operator in EQUALITY else ranges).add(column)
+    if "id" in equal:
+        return None
+
+    selected = split_top(parts["SELECT"], ", ")
+    order = []
+    for term in split_top(parts.get("ORDER BY", ""), ", "):
+        match = ORDER_TERM.match(term.strip())
+        if not match:
+            break
+        term_table, column, position, alias, direction = match.groups()
+        if position or alias:
+            # ORDER BY 15 / "alias": the selected expression
+            expression = (
+                selected[int(position) - 1]
+                if position
+                else next((s for s in selected if s.endswith(f' AS "{alias}"')), "")
+            )
+            found = COLUMN.match(expression.strip())
+            if not found:
+                break
+            term_table, column = found.groups()
+        if term_table != table:
+            break
+        if column not in equal:
+            order.append((column, direction == "DESC"))
+    ranges -= equal
+    if not (equal or ranges) and "LIMIT" not in parts:
+        # Reading a whole table in index order is slower than sorting it
+        return None
+    return Pattern(table, frozenset(equal), tuple(order), frozenset(ranges))
+
+
+class Proposal:
+    """An index on ``table`` and the queries it would serve."""
+
+    def __init__(self, table, columns, equal_count):
+        self.table = table
+        # ((column, descending), ...), the equality columns first
+        self.columns = columns
+        self.equal_count = equal_count
+        self.queries = 0
+        self.seconds = 0.0
+        self.labels = set()
+        self.example = None
+        self.existing = None
+
+    def add(self, query):
+        self.queries += 1
+        self.seconds += query.seconds
+        self.labels.add(query.label)
+        if self.example is None or query.seconds > self.example.seconds:
+            self.example = query
+
+    def absorb(self, other):
+        self.queries += other.queries
+        self.seconds += other.seconds
+        self.labels |= other.labels
+
+    def covers(self, columns, equal_count):
+        """Whether this index serves ``columns`` as its leading columns."""
+        return covers(self.columns, columns, equal_count)
+
+    def index(self, model):
+        """The ``models.Index`` for ``model``, named the way Django would."""
+        names = {field.column: field.name for field in model._meta.concrete_fields}
+        index = models.Index(
+            fields=[f"{'-' if desc else ''}{names[c]}" for c, desc in self.columns]
+        )
+        index.set_name_with_model(model)
+        return index
+
+    def describe(self):
+        return ", ".join(f"{c} DESC" if desc else c for c, desc in self.columns)
+
+
+def covers(index, columns, equal_count):
+    """Whether ``index`` starts with ``columns``; sort columns may be reversed."""
+    if [c for c, _ in index[: len(columns)]] != [c for c, _ in columns]:
+        return False
+    sort = [(index[i][1], columns[i][1]) for i in range(equal_count, len(columns))]
+    return all(a == b for a, b in sort) or all(a != b for a, b in sort)
+
+
+def existing_indexes(table):
+    """``{name: ((column, descending), ...)}`` of the indexes on ``table``."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    indexes = {}
+    for name, info in constraints.items():
+        columns = info["columns"]
+        if not columns or None in columns:
+            continue
+        if info["index"] or info["unique"] or info["primary_key"]:
+            orders = info.get("orders") or ["ASC"] * len(columns)
+            indexes[name] = tuple(
+                (column, order == "DESC") for column, order in zip(columns, orders)
+            )
+    return indexes
+
+
+def model_for(table):
+    """The api model stored in ``table``."""
+    return next(
+        model
+        for model in apps.get_app_config("api").get_models()
+        if model._meta.db_table == table
+    )
+
+
+def propose(queries):
+    """``Proposal`` s for ``queries``, the most SQL time first.
+
+    Tables under ``MIN_ROWS`` rows get none. The proposals an existing
+    index already covers have ``existing`` set.
+    """
+    models_by_table = {
+        model._meta.db_table: model for model in apps.get_app_config("api").get_models()
+    }
+    patterns = []
+    for query in queries:
+        pattern = access_pattern(query.sql, models_by_table)
+        if pattern:
+            patterns.append((pattern, query))
+
+    # Shared equality columns first, so one index serves more patterns
+    frequency = {}
+    for pattern, _ in patterns:
+        for column in pattern.equal:
+            key = (pattern.table, column)
+            frequency[key] = frequency.get(key, 0) + 1
+
+    proposals = {}
+    for pattern, query in patterns:
+        equal = sorted(pattern.equal, key=lambda c: (-frequency[(pattern.table, c)], c))
+        columns = [(column, False) for column in equal] + list(pattern.order)
+        if not pattern.order and pattern.ranges:
+            columns.append((min(pattern.ranges), False))
+        columns = tuple(columns[:MAX_COLUMNS])
+        key = (pattern.table, columns)
+        if key not in proposals:
+            proposals[key] = Proposal(
+                pattern.table, columns, min(len(equal), len(columns))
+            )
+        proposals[key].add(query)
+
+    rows = {table: model.objects.count() for table, model in models_by_table.items()}
+    kept = []
+    for proposal in sorted(proposals.values(), key=lambda p: -len(p.columns)):
+        if rows[proposal.table] < MIN_ROWS:
+            continue
+        host = next(
+            (
+                other
+                for other in kept
+                if other.table == proposal.table
+                and other.covers(proposal.columns, proposal.equal_count)
+            ),
+            None,
+        )
+        if host:
+            host.absorb(proposal)
+        else:
+            kept.append(proposal)
+
+    for proposal in kept:
+        for name, columns in existing_indexes(proposal.table).items():
+            if covers(columns, proposal.columns, proposal.equal_count):
+                proposal.existing = name
+                break
+    kept.sort(key=lambda p: (-p.seconds, -p.queries, p.table, p.columns))
+    return kept
+
+
+def explain(query):
+    """The database's plan for ``query``, one line per step."""
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f"{prefix} {query.sql}", query.params)
+        rows = cursor.fetchall()
+    # SQLite's EXPLAIN QUERY PLAN rows end with the step's description
+    return [str(row[-1]) for row in rows]
+
+
+def time_query(query, runs=5):
+    """The median time of ``query`` in milliseconds."""
+    samples = []
+    with connection.cursor() as cursor:
+        for _ in range(runs):
+            started = time.perf_counter()
+            cursor.execute(query.sql, query.params)
+            cursor.fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def trial(proposal, runs=5):
+    """The plan and time of the proposal's slowest query without and with it.
+
+    The index only exists during the trial.
+    """
+    model = model_for(proposal.table)
+    index = proposal.index(model)
+    before = (explain(proposal.example), time_query(proposal.example, runs))
+    with connection.schema_editor() as editor:
+        editor.add_index(model, index)
+    try:
+        analyze()
+        after = (explain(proposal.example), time_query(proposal.example, runs))
+    finally:
+        with connection.schema_editor() as editor:
+            editor.remove_index(model, index)
+    return before, after
+
+
+def analyze():
+    """Refreshes the planner statistics, which a fresh database doesn't have."""
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
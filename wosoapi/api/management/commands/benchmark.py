@@ -0,0 +1,236 @@
+import json
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import benchmark
+from core.leaderboards import refresh_leaderboards
+
+# Keep the benchmark away from the configured (possibly shared) cache servers
+LOCAL_CACHES = {
+    name: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    for name in ("default", "pages")
+}
+
+
+def parse_size(value):
+    try:
+        size = [int(part) for part in value.split(",")]
+    except ValueError:
+        size = []
+    if len(size) != 4 or min(size) < 1:
+        raise CommandError(
+            f'--size must be four positive integers "leagues,seasons,clubs,players", not "{value}".'
+        )
+    if size[0] > len(benchmark.LEAGUES):
+        raise CommandError(f"--size supports at most {len(benchmark.LEAGUES)} leagues.")
+    return size
+
+
+class Command(BaseCommand):
+    help = "Measures the query count and latency of every API and page route on a synthetic dataset."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            type=str,
+            default="3,3,8,20",
+            help='Leagues, seasons per league, clubs per league and players per club (default: "3,3,8,20").',
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=20,
+            help="Measured requests per route, after one warm-up request (default: 20).",
+        )
+        parser.add_argument(
+            "--only",
+            type=str,
+            default="",
+            help="Only measure the routes whose label contains this text.",
+        )
+        parser.add_argument(
+            "--fast-list",
+            action="store_true",
+            help="Also time the stats lists at 10, 100 and 1000 rows with the serializers and with the values_list() path.",
+        )
+        parser.add_argument(
+            "--export-formats",
+            action="store_true",
+            help="Also time every season player stats row as one JSON list page and in each export format.",
+        )
+        parser.add_argument(
+            "--save",
+            type=str,
+            help="Write the results to this JSON file, to be used as a baseline.",
+        )
+        parser.add_argument(
+            "--compare",
+            type=str,
+            help="Compare against a baseline file and fail if any route runs more queries.",
+        )
+
+    def load_baseline(self, path, size):
+        try:
+            baseline = json.loads(Path(path).read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read the baseline "{path}": {e}')
+        if baseline["meta"]["size"] != size:
+            raise CommandError(
+                f"The baseline was recorded with --size "
+                f"{','.join(map(str, baseline['meta']['size']))}; run with the same size to compare."
+            )
+        return baseline["routes"]
+
+    def write_table(self, results, baseline):
+        self.stdout.write(
+            f"{'route':<70} {'status':>6} {'queries':>9} {'sql':>8} "
+            f"{'serialize':>9} {'render':>8} {'p50':>8} {'p95':>8}"
+        )
+        for label, result in results.items():
+            queries = str(result["queries"])
+            before = baseline.get(label)
+            if before and before["queries"] != result["queries"]:
+                queries = f"{before['queries']}->{queries}"
+            self.stdout.write(
+                f"{label[:70]:<70} {result['status']:>6} {queries:>9} "
+                f"{result['sql_ms']:>8.2f} {result['serialize_ms']:>9.2f} "
+                f"{result['render_ms']:>8.2f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f}"
+            )
+
+    def write_speedups(self, speedups):
+        self.stdout.write(
+            f"\n{'list':<40} {'rows':>6} {'serializer p50':>15} "
+            f"{'values p50':>11} {'speedup':>8}"
+        )
+        for label, result in speedups.items():
+            regular = result["serializer"]["p50_ms"]
+            fast = result["values"]["p50_ms"]
+            self.stdout.write(
+                f"{label:<40} {result['rows']:>6} {regular:>15.2f} "
+                f"{fast:>11.2f} {regular / fast:>7.1f}x"
+            )
+
+    def write_export_formats(self, formats):
+        json_bytes = json_ms = None
+        self.stdout.write(
+            f"\n{'export':<50} {'rows':>6} {'bytes':>11} {'p50':>9} "
+            f"{'size':>7} {'time':>7}"
+        )
+        for label, result in formats.items():
+            # The JSON list page comes first and is the reference
+            json_bytes = json_bytes or result["bytes"]
+            json_ms = json_ms or result["p50_ms"]
+            self.stdout.write(
+                f"{label[:50]:<50} {result['rows']:>6} {result['bytes']:>11} "
+                f"{result['p50_ms']:>9.2f} {result['bytes'] / json_bytes:>6.0%} "
+                f"{result['p50_ms'] / json_ms:>6.0%}"
+            )
+
+    def handle(self, *args, **kwargs):
+        size = parse_size(kwargs["size"])
+        if kwargs["runs"] < 2:
+            raise CommandError("--runs must be at least 2.")
+        baseline = (
+            self.load_baseline(kwargs["compare"], size) if kwargs["compare"] else {}
+        )
+
+        # Everything runs in a throwaway test database, never the real one
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+        try:
+            with override_settings(CACHES=LOCAL_CACHES):
+                started = time.perf_counter()
+                rows = benchmark.seed(*size)
+                refresh_leaderboards()
+                self.stdout.write(
+                    f"Seeded {rows} player season rows "
+                    f"({time.perf_counter() - started:.2f}s)\n"
+                )
+
+                User = get_user_model()
+                user = User.objects.create_user(
+                    username="benchmark", email="benchmark@example.com", is_active=True
+                )
+                admin = User.objects.create_superuser(
+                    username="benchmark-admin", email="admin@example.com"
+                )
+
+                cases = benchmark.cases()
+                missing = benchmark.route_names() - {case.name for case in cases}
+                if missing:
+                    raise CommandError(
+                        f"No benchmark case for route(s): {', '.join(sorted(missing))}"
+                    )
+                selected = [case for case in cases if kwargs["only"] in case.label]
+                headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+                results = benchmark.run_cases(
+                    selected,
+                    headers,
+                    {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(admin)}"},
+                    kwargs["runs"],
+                )
+                speedups = (
+                    benchmark.fast_list_speedup(headers, runs=kwargs["runs"])
+                    if kwargs["fast_list"]
+                    else {}
+                )
+                formats = (
+                    benchmark.export_formats(headers, runs=kwargs["runs"])
+                    if kwargs["export_formats"]
+                    else {}
+                )
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+        self.write_table(results, baseline)
+        if speedups:
+            self.write_speedups(speedups)
+        if formats:
+            self.write_export_formats(formats)
+
+        if kwargs["save"]:
+            Path(kwargs["save"]).write_text(
+                json.dumps(
+                    {
+                        "meta": {"size": size, "runs": kwargs["runs"]},
+                        "routes": results,
+                        "fast_list": speedups,
+                        "export_formats": formats,
+                    },
+                    indent=2,
+                )
+                + "\n"
+            )
+            self.stdout.write(f"\nSaved {len(results)} routes to {kwargs['save']}")
+
+        if kwargs["compare"]:
+            regressions = benchmark.compare(baseline, results)
+            if regressions:
+                raise CommandError(
+                    "Regressions against the baseline:\n  " + "\n  ".join(regressions)
+                )
+            self.stdout.write(
+                self.style.SUCCESS("\nNo route runs more queries than in the baseline.")
+            )
+
+
+"""
+ python manage.py benchmark
+ python manage.py benchmark --size 6,4,12,25 --runs 50 --save benchmark.json
+ python manage.py benchmark --size 6,4,12,25 --compare benchmark.json
+ python manage.py benchmark --only season_player_stats --runs 5
+ python manage.py benchmark --only goalkeepers --fast-list
+ python manage.py benchmark --size 6,4,12,175 --only export --runs 3 --export-formats
+"""
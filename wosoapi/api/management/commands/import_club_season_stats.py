@@ -1,6 +1,7 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
-from api.models import Club, Season, League, ClubSeasonStat
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from api.columns import read_csv
+from api.models import Club, Season, League, ClubSeasonStat, DataVersion
 
 
 class Command(BaseCommand):
@@ -20,7 +21,13 @@ class Command(BaseCommand):
             required=True,
             help="The ID of the league to associate the stats with.",
         )
+        parser.add_argument(
+            "--skip-refresh",
+            action="store_true",
+            help="Don't rebuild the leaderboards afterwards (e.g. when importing several files in a row).",
+        )
 
+    @DataVersion.deferred()
     def handle(self, *args, **kwargs):
         csv_file_path = kwargs["csv_file"]
         season_id = kwargs["season_id"]
@@ -31,12 +38,11 @@ class Command(BaseCommand):
             season = Season.objects.get(pk=season_id)
             league = League.objects.get(pk=league_id)
         except (Season.DoesNotExist, League.DoesNotExist) as e:
-            self.stdout.write(self.style.ERROR(f"{e}"))
-            return
+            raise CommandError(str(e))
 
         try:
             # Read the CSV file
-            df = pd.read_csv(csv_file_path)
+            df = read_csv(csv_file_path)
 
             # Counters for tracking imports
             created_count = 0
@@ -106,12 +112,16 @@ class Command(BaseCommand):
                 )
             )
 
+            if not kwargs["skip_refresh"]:
+                call_command("refresh_leaderboards", stdout=self.stdout)
+            DataVersion.bump_models(ClubSeasonStat, seasons=[season.season])
+
         except FileNotFoundError:
-            self.stdout.write(
-                self.style.ERROR(f'The file "{csv_file_path}" was not found.')
-            )
+            raise CommandError(f'The file "{csv_file_path}" was not found.')
+        except CommandError:
+            raise
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"An error occurred: {e}"))
+            raise CommandError(f"An error occurred: {e}") from e
 
 
 """
@@ -121,4 +131,4 @@ class Command(BaseCommand):
  python manage.py import_club_season_stats NWSL_2025_26_TEAM_STATS.csv --season_id=4 --league_id=3
  python manage.py import_club_season_stats LigaF_2025_26_TEAM_STATS.csv --season_id=5 --league_id=4
  python manage.py import_club_season_stats SerieA_2025_26_TEAM_STATS.csv --season_id=8 --league_id=7
-"""
\ No newline at end of file
+"""
@@ -1,6 +1,6 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
-from api.models import Club
+from django.core.management.base import BaseCommand, CommandError
+from api.columns import read_csv
+from api.models import Club, DataVersion
 
 
 class Command(BaseCommand):
@@ -9,12 +9,13 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("csv_file", type=str, help="The path to the CSV file.")
 
+    @DataVersion.deferred()
     def handle(self, *args, **kwargs):
         csv_file_path = kwargs["csv_file"]
 
         try:
             # Read the CSV file
-            df = pd.read_csv(csv_file_path)
+            df = read_csv(csv_file_path)
 
             # Counters for tracking imports
             created_count = 0
@@ -50,13 +51,14 @@ class Command(BaseCommand):
                     f"Import complete! Created: {created_count}, Updated: {updated_count}"
                 )
             )
+            DataVersion.bump_models(Club)
 
         except FileNotFoundError:
-            self.stdout.write(
-                self.style.ERROR(f'The file "{csv_file_path}" was not found.')
-            )
+            raise CommandError(f'The file "{csv_file_path}" was not found.')
+        except CommandError:
+            raise
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"An error occurred: {e}"))
+            raise CommandError(f"An error occurred: {e}") from e
 
 
 # python manage.py import_clubs WSL_2025_26_TEAM_STATS.csv
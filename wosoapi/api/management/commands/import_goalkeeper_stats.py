@@ -1,8 +1,36 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.db import IntegrityError
-from api.models import Player, Club, Season, League, Goalkeeper
-import numpy as np
+from api.columns import (
+    AGE,
+    FLOAT,
+    Column,
+    convert,
+    fingerprints,
+    read_csv,
+    records,
+    required_columns,
+)
+from api.models import Player, Club, Season, League, Goalkeeper, DataVersion
+
+# How each Goalkeeper field is read from the CSV
+COLUMNS = [
+    Column("age", "age", AGE, None),
+    Column("matches_played", "gk_games"),
+    Column("minutes_played", "gk_minutes"),
+    Column("goals_conceded", "gk_goals_against"),
+    Column("shots_faced", "gk_shots_on_target_against"),
+    Column("saves", "gk_saves"),
+    Column("save_percentage", "gk_save_pct", FLOAT, 0.0),
+    Column("clean_sheets", "gk_clean_sheets"),
+    Column("psxg", "gk_psxg", FLOAT, 0.0),
+    Column("psxg_performance", "gk_psxg_net", FLOAT, 0.0),
+    Column("pen_saved", "gk_pens_saved"),
+    Column("passes", "gk_passes"),
+    Column("crosses_stopped", "gk_crosses_stopped"),
+    Column("sweeper_action", "gk_def_actions_outside_pen_area"),
+    Column("sweeper_action_per90", "gk_def_actions_outside_pen_area_per90", FLOAT, 0.0),
+]
 
 
 class Command(BaseCommand):
@@ -27,7 +55,18 @@ class Command(BaseCommand):
             required=True,
             help="The database ID of the league (e.g., 189).",
         )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rewrite every row, even those whose fingerprint shows they didn't change (e.g. after editing rows by hand).",
+        )
+        parser.add_argument(
+            "--skip-refresh",
+            action="store_true",
+            help="Don't rebuild the leaderboards afterwards (e.g. when importing several files in a row).",
+        )
 
+    @DataVersion.deferred()
     def handle(self, *args, **kwargs):
         """The main logic for the management command."""
         csv_file_path = kwargs["csv_file"]
@@ -36,66 +75,60 @@ class Command(BaseCommand):
 
         try:
             # Read the CSV file into a pandas DataFrame
-            df = pd.read_csv(csv_file_path)
+            df = read_csv(csv_file_path)
 
             # Look up the Season and League objects by their IDs
             try:
                 season = Season.objects.get(id=season_id)
             except Season.DoesNotExist:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"Season with ID {season_id} does not exist. Please check the ID and try again."
-                    )
+                raise CommandError(
+                    f"Season with ID {season_id} does not exist. Please check the ID and try again."
                 )
-                return
 
             try:
                 league = League.objects.get(id=league_id)
             except League.DoesNotExist:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"League with ID {league_id} does not exist. Please check the ID and try again."
-                    )
+                raise CommandError(
+                    f"League with ID {league_id} does not exist. Please check the ID and try again."
                 )
-                return
 
             # Check for the existence of required columns for goalkeepers
             required_cols = [
                 "player_id",
                 "team_id",
                 "position",
-                "age",
-                "gk_games",
-                "gk_minutes",
-                "gk_goals_against",
-                "gk_shots_on_target_against",
-                "gk_saves",
-                "gk_save_pct",
-                "gk_clean_sheets",
-                "gk_psxg",
-                "gk_psxg_net",
-                "gk_pens_saved",
-                "gk_passes",
-                "gk_crosses_stopped",
-                "gk_def_actions_outside_pen_area",
-                "gk_def_actions_outside_pen_area_per90",
+                *required_columns(COLUMNS),
             ]
 
             missing_cols = [col for col in required_cols if col not in df.columns]
             if missing_cols:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"CSV file is missing the following required columns for Goalkeeper stats: {', '.join(missing_cols)}"
-                    )
+                raise CommandError(
+                    f"CSV file is missing the following required columns for Goalkeeper stats: {', '.join(missing_cols)}"
                 )
-                return
 
             # Counters for tracking the import process
             created_count = 0
             updated_count = 0
+            unchanged_count = 0
 
-            # Iterate through each row of the DataFrame
-            for _, row in df.iterrows():
+            # Convert every column up front; the loop only talks to the database
+            converted, valid = convert(df, COLUMNS, csv_file_path)
+            converted["fingerprint"] = fingerprints(
+                converted.assign(league_id=league.id)
+            )
+            rows = df[["player_id", "team_id", "position"]].to_dict("records")
+
+            # Fingerprints of the rows already imported, to skip unchanged ones
+            stored = {}
+            if not kwargs["full"]:
+                stored = {
+                    (player, club): fingerprint
+                    for player, club, fingerprint in Goalkeeper.objects.filter(
+                        season=season
+                    ).values_list("player__fbref_id", "club__fbref_id", "fingerprint")
+                }
+
+            for row, fields, is_valid in zip(rows, records(converted), valid):
                 # Skip outfield players
                 if row["position"] != "GK":
                     self.stdout.write(
@@ -105,119 +138,18 @@ class Command(BaseCommand):
                     )
                     continue
 
+                key = (row["player_id"], row["team_id"])
+                if is_valid and stored.get(key) == fields["fingerprint"]:
+                    unchanged_count += 1
+                    continue
+
                 try:
                     # Look up the Player and Club objects using their fbref_id
                     player = Player.objects.get(fbref_id=row["player_id"])
                     club = Club.objects.get(fbref_id=row["team_id"])
-
-                    # The age column contains values in the format 'YY-DDD'.
-                    # This code splits the string at the hyphen and takes the year part.
-                    # It also handles cases where age is a float or is missing.
-                    try:
-                        age_str = str(row["age"])
-                        if pd.notna(row["age"]) and "-" in age_str:
-                            age = int(age_str.split("-")[0])
-                        elif pd.notna(row["age"]):
-                            age = int(float(age_str))
-                        else:
-                            age = None
-                    except (ValueError, TypeError):
-                        age = None
-
-                    # Prepare data, handling potential NaN values, commas, and decimals in numbers
-                    goals_conceded = (
-                        int(float(str(row["gk_goals_against"]).replace(",", "")))
-                        if pd.notna(row["gk_goals_against"])
-                        else 0
-                    )
-                    psxg = (
-                        float(str(row["gk_psxg"]).replace(",", ""))
-                        if pd.notna(row["gk_psxg"])
-                        else 0.0
-                    )
-
-                    data = {
-                        "position": "GK",
-                        "age": age,
-                        "matches_played": (
-                            int(float(str(row["gk_games"]).replace(",", "")))
-                            if pd.notna(row["gk_games"])
-                            else 0
-                        ),
-                        "minutes_played": (
-                            int(float(str(row["gk_minutes"]).replace(",", "")))
-                            if pd.notna(row["gk_minutes"])
-                            else 0
-                        ),
-                        "goals_conceded": goals_conceded,
-                        "shots_faced": (
-                            int(
-                                float(
-                                    str(row["gk_shots_on_target_against"]).replace(
-                                        ",", ""
-                                    )
-                                )
-                            )
-                            if pd.notna(row["gk_shots_on_target_against"])
-                            else 0
-                        ),
-                        "saves": (
-                            int(float(str(row["gk_saves"]).replace(",", "")))
-                            if pd.notna(row["gk_saves"])
-                            else 0
-                        ),
-                        "save_percentage": (
-                            float(str(row["gk_save_pct"]).replace(",", ""))
-                            if pd.notna(row["gk_save_pct"])
-                            else 0.0
-                        ),
-                        "clean_sheets": (
-                            int(float(str(row["gk_clean_sheets"]).replace(",", "")))
-                            if pd.notna(row["gk_clean_sheets"])
-                            else 0
-                        ),
-                        "psxg": psxg,
-                        "psxg_performance": (
-                            float(str(row["gk_psxg_net"]).replace(",", ""))
-                            if pd.notna(row["gk_psxg_net"])
-                            else 0.0
-                        ),
-                        "pen_saved": (
-                            int(float(str(row["gk_pens_saved"]).replace(",", "")))
-                            if pd.notna(row["gk_pens_saved"])
-                            else 0
-                        ),
-                        "passes": (
-                            int(float(str(row["gk_passes"]).replace(",", "")))
-                            if pd.notna(row["gk_passes"])
-                            else 0
-                        ),
-                        "crosses_stopped": (
-                            int(float(str(row["gk_crosses_stopped"]).replace(",", "")))
-                            if pd.notna(row["gk_crosses_stopped"])
-                            else 0
-                        ),
-                        "sweeper_action": (
-                            int(
-                                float(
-                                    str(row["gk_def_actions_outside_pen_area"]).replace(
-                                        ",", ""
-                                    )
-                                )
-                            )
-                            if pd.notna(row["gk_def_actions_outside_pen_area"])
-                            else 0
-                        ),
-                        "sweeper_action_per90": (
-                            float(
-                                str(
-                                    row["gk_def_actions_outside_pen_area_per90"]
-                                ).replace(",", "")
-                            )
-                            if pd.notna(row["gk_def_actions_outside_pen_area_per90"])
-                            else 0.0
-                        ),
-                    }
+                    if not is_valid:
+                        raise ValueError("could not convert a value to a number")
+                    data = {"position": "GK", **fields}
 
                     # Use update_or_create to handle new and existing stats entries.
                     obj, created = Goalkeeper.objects.update_or_create(
@@ -227,6 +159,7 @@ class Command(BaseCommand):
                         league=league,
                         defaults=data,
                     )
+                    stored[key] = fields["fingerprint"]
 
                     if created:
                         created_count += 1
@@ -271,16 +204,23 @@ class Command(BaseCommand):
             # Final summary
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"\nGoalkeeper season stats import complete! Created: {created_count}, Updated: {updated_count}"
+                    f"\nGoalkeeper season stats import complete! Created: {created_count}, Updated: {updated_count}, Unchanged: {unchanged_count}"
                 )
             )
 
+            # Nothing to refresh or invalidate when every row was unchanged
+            if created_count or updated_count:
+                if not kwargs["skip_refresh"]:
+                    call_command("refresh_leaderboards", stdout=self.stdout)
+                DataVersion.bump_models(Goalkeeper, seasons=[season.season])
+
         except FileNotFoundError:
-            self.stdout.write(
-                self.style.ERROR(f'The file "{csv_file_path}" was not found.')
-            )
+            raise CommandError(f'The file "{csv_file_path}" was not found.')
+        except CommandError:
+            raise
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"An unexpected error occurred: {e}"))
+            raise CommandError(f"An unexpected error occurred: {e}") from e
+
 
 """
  python manage.py import_goalkeeper_stats WSL_2025_26_ALL_PLAYER_STATS.csv --season-id=2 --league-id=1
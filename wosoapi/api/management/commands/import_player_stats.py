@@ -1,8 +1,68 @@
+import time
+
 import pandas as pd
-from django.core.management.base import BaseCommand
-from django.db import IntegrityError
-from api.models import Player, Club, Season, League, PlayerSeasonStats
-import numpy as np
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from api.columns import (
+    AGE,
+    FLOAT,
+    TEXT,
+    Column,
+    convert,
+    fingerprints,
+    read_csv,
+    records,
+    required_columns,
+)
+from api.models import Player, Club, Season, League, PlayerSeasonStats, DataVersion
+
+# How each PlayerSeasonStats field is read from the CSV
+COLUMNS = [
+    Column("position", "position", TEXT, None),
+    Column("age", "age", AGE, None),
+    Column("matches_played", "games"),
+    Column("minutes_played", "minutes"),
+    Column("matches_completed", "games_complete"),
+    Column("matches_substituted", "games_subs"),
+    Column("unused_sub", "unused_subs"),
+    Column("goals", "goals"),
+    Column("assists", "assists"),
+    Column("xg", "xg", FLOAT, 0.0),
+    Column("npxg", "npxg", FLOAT, 0.0),
+    Column("xg_performance", "goals", FLOAT, 0.0, minus="xg"),
+    Column("npxg_performance", "goals", FLOAT, 0.0, minus="npxg"),
+    Column("prog_carries", "progressive_carries"),
+    Column("prog_carries_final_3rd", "carries_into_final_third"),
+    Column("prog_passes", "progressive_passes"),
+    Column("shots_target", "shots_on_target"),
+    Column("passes_to_final_3rd", "passes_into_final_third"),
+    Column("passes_to_pen_area", "passes_into_penalty_area"),
+    Column("pass_switches", "passes_switches"),
+    Column("through_ball", "through_balls"),
+    Column("shots_creation_action", "sca"),
+    Column("offsides", "offsides"),
+    Column("pen_won", "pens_won"),
+    Column("pen_conceded", "pens_conceded"),
+    Column("tackles", "tackles"),
+    Column("ball_recoveries", "ball_recoveries"),
+    Column("aerial_duels_won", "aerials_won"),
+    Column("aerial_duels_lost", "aerials_lost"),
+    Column("blocks", "blocks"),
+    Column("tackles_won", "tackles_won"),
+    Column("interceptions", "interceptions"),
+    Column("touches", "touches"),
+    Column("dispossessed", "dispossessed"),
+    Column("miscontrols", "miscontrols"),
+    Column("take_ons", "take_ons"),
+    Column("take_ons_won", "take_ons_won"),
+    Column("fouls_won", "fouled"),
+    Column("fouls_committed", "fouls"),
+    Column("carries_to_final_3rd", "carries_into_final_third"),
+    Column("carries_to_pen_area", "carries_into_penalty_area"),
+    Column("yellow_card", "cards_yellow"),
+    Column("red_card", "cards_red"),
+]
 
 
 class Command(BaseCommand):
@@ -27,7 +87,23 @@ class Command(BaseCommand):
             required=True,
             help="The database ID of the league (e.g., 189).",
         )
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Resolve, convert and write all rows in bulk instead of one row at a time.",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rewrite every row, even those whose fingerprint shows they didn't change (e.g. after editing rows by hand).",
+        )
+        parser.add_argument(
+            "--skip-refresh",
+            action="store_true",
+            help="Don't rebuild the leaderboards afterwards (e.g. when importing several files in a row).",
+        )
 
+    @DataVersion.deferred()
     def handle(self, *args, **kwargs):
         """The main logic for the management command."""
         csv_file_path = kwargs["csv_file"]
@@ -36,424 +112,287 @@ class Command(BaseCommand):
 
         try:
             # Read the CSV file into a pandas DataFrame
-            df = pd.read_csv(csv_file_path)
+            df = read_csv(csv_file_path)
 
             # Look up the Season and League objects by their IDs
             try:
                 season = Season.objects.get(id=season_id)
             except Season.DoesNotExist:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"Season with ID {season_id} does not exist. Please check the ID and try again."
-                    )
+                raise CommandError(
+                    f"Season with ID {season_id} does not exist. Please check the ID and try again."
                 )
-                return
 
             try:
                 league = League.objects.get(id=league_id)
             except League.DoesNotExist:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"League with ID {league_id} does not exist. Please check the ID and try again."
-                    )
+                raise CommandError(
+                    f"League with ID {league_id} does not exist. Please check the ID and try again."
                 )
-                return
 
             # Check for the existence of required columns
-            required_cols = [
-                "player_id",
-                "team_id",
-                "position",
-                "age",
-                "games",
-                "minutes",
-                "goals",
-                "assists",
-                "xg",
-                "npxg",
-                "progressive_carries",
-                "progressive_passes",
-                "shots_on_target",
-                "passes_into_final_third",
-                "passes_into_penalty_area",
-                "passes_switches",
-                "through_balls",
-                "sca",
-                "offsides",
-                "pens_won",
-                "pens_conceded",
-                "tackles",
-                "ball_recoveries",
-                "aerials_won",
-                "aerials_lost",
-                "blocks",
-                "tackles_won",
-                "interceptions",
-                "touches",
-                "dispossessed",
-                "miscontrols",
-                "take_ons",
-                "take_ons_won",
-                "fouled",
-                "fouls",
-                "carries_into_final_third",
-                "carries_into_penalty_area",
-                "cards_yellow",
-                "cards_red",
-                "games_complete",
-                "games_subs",
-                "unused_subs",
-            ]
+            required_cols = ["player_id", "team_id", *required_columns(COLUMNS)]
             if not all(col in df.columns for col in required_cols):
+                raise CommandError(
+                    f"CSV file must contain all required columns for PlayerSeasonStats."
+                )
+
+            upsert = self.bulk_upsert if kwargs["bulk"] else self.upsert_rows
+            created_count, updated_count, unchanged_count = upsert(
+                df, season, league, full=kwargs["full"], path=csv_file_path
+            )
+
+            # Final summary
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"\nPlayer season stats import complete! Created: {created_count}, Updated: {updated_count}, Unchanged: {unchanged_count}"
+                )
+            )
+
+            # Nothing to refresh or invalidate when every row was unchanged
+            if created_count or updated_count:
+                if not kwargs["skip_refresh"]:
+                    call_command("refresh_leaderboards", stdout=self.stdout)
+                DataVersion.bump_models(PlayerSeasonStats, seasons=[season.season])
+
+        except FileNotFoundError:
+            raise CommandError(f'The file "{csv_file_path}" was not found.')
+        except CommandError:
+            raise
+        except Exception as e:
+            raise CommandError(f"An unexpected error occurred: {e}") from e
+
+    def stored_fingerprints(self, season, full):
+        """``{(player fbref_id, club fbref_id): fingerprint}`` of the season's rows."""
+        if full:
+            return {}
+        rows = PlayerSeasonStats.objects.filter(season=season).values_list(
+            "player__fbref_id", "club__fbref_id", "fingerprint"
+        )
+        return {(player, club): fingerprint for player, club, fingerprint in rows}
+
+    def upsert_rows(self, df, season, league, full=False, path=None):
+        """Imports the rows one at a time with ``update_or_create``.
+
+        Rows whose fingerprint matches the stored one are skipped without
+        touching the database.
+        """
+        # Counters for tracking the import process
+        created_count = 0
+        updated_count = 0
+        unchanged_count = 0
+
+        # Convert every column up front; the loop only talks to the database
+        data, valid = convert(df, COLUMNS, path)
+        data["fingerprint"] = fingerprints(data.assign(league_id=league.id))
+        rows = df[["player_id", "team_id", "position"]].to_dict("records")
+        stored = self.stored_fingerprints(season, full)
+
+        for row, defaults, is_valid in zip(rows, records(data), valid):
+            # Skip goalkeepers
+            if row["position"] == "GK":
                 self.stdout.write(
-                    self.style.ERROR(
-                        f"CSV file must contain all required columns for PlayerSeasonStats."
-                    )
+                    self.style.NOTICE(f"Skipping goalkeeper: {row['player_id']}")
                 )
-                return
+                continue
 
-            # Counters for tracking the import process
-            created_count = 0
-            updated_count = 0
+            key = (row["player_id"], row["team_id"])
+            if is_valid and stored.get(key) == defaults["fingerprint"]:
+                unchanged_count += 1
+                continue
 
-            # Iterate through each row of the DataFrame
-            for _, row in df.iterrows():
-                # Skip goalkeepers
-                if row["position"] == "GK":
-                    self.stdout.write(
-                        self.style.NOTICE(f"Skipping goalkeeper: {row['player_id']}")
-                    )
-                    continue
-
-                try:
-                    # Look up the Player and Club objects using their fbref_id
-                    player = Player.objects.get(fbref_id=row["player_id"])
-                    club = Club.objects.get(fbref_id=row["team_id"])
-
-                    # The age column contains values in the format 'YY-DDD'.
-                    # This code splits the string at the hyphen and takes the year part.
-                    # It also handles cases where age is a float or is missing.
-                    try:
-                        age_str = str(row["age"])
-                        if pd.notna(row["age"]) and "-" in age_str:
-                            age = int(age_str.split("-")[0])
-                        elif pd.notna(row["age"]):
-                            age = int(float(age_str))
-                        else:
-                            age = None
-                    except (ValueError, TypeError):
-                        age = None
-
-                    # Prepare data, handling potential NaN values, commas, and decimals in numbers
-                    data = {
-                        "position": (
-                            row["position"] if pd.notna(row["position"]) else None
-                        ),
-                        "age": age,
-                        "matches_played": (
-                            int(float(str(row["games"]).replace(",", "")))
-                            if pd.notna(row["games"])
-                            else 0
-                        ),
-                        "minutes_played": (
-                            int(float(str(row["minutes"]).replace(",", "")))
-                            if pd.notna(row["minutes"])
-                            else 0
-                        ),
-                        "matches_completed": (
-                            int(float(str(row["games_complete"]).replace(",", "")))
-                            if pd.notna(row["games_complete"])
-                            else 0
-                        ),
-                        "matches_substituted": (
-                            int(float(str(row["games_subs"]).replace(",", "")))
-                            if pd.notna(row["games_subs"])
-                            else 0
-                        ),
-                        "unused_sub": (
-                            int(float(str(row["unused_subs"]).replace(",", "")))
-                            if pd.notna(row["unused_subs"])
-                            else 0
-                        ),
-                        "goals": (
-                            int(float(str(row["goals"]).replace(",", "")))
-                            if pd.notna(row["goals"])
-                            else 0
-                        ),
-                        "assists": (
-                            int(float(str(row["assists"]).replace(",", "")))
-                            if pd.notna(row["assists"])
-                            else 0
-                        ),
-                        "xg": (
-                            float(str(row["xg"]).replace(",", ""))
-                            if pd.notna(row["xg"])
-                            else 0.0
-                        ),
-                        "npxg": (
-                            float(str(row["npxg"]).replace(",", ""))
-                            if pd.notna(row["npxg"])
-                            else 0.0
-                        ),
-                        "xg_performance": (
-                            (
-                                float(str(row["goals"]).replace(",", ""))
-                                - float(str(row["xg"]).replace(",", ""))
-                            )
-                            if pd.notna(row["goals"]) and pd.notna(row["xg"])
-                            else 0.0
-                        ),
-                        "npxg_performance": (
-                            (
-                                float(str(row["goals"]).replace(",", ""))
-                                - float(str(row["npxg"]).replace(",", ""))
-                            )
-                            if pd.notna(row["goals"]) and pd.notna(row["npxg"])
-                            else 0.0
-                        ),
-                        "prog_carries": (
-                            int(float(str(row["progressive_carries"]).replace(",", "")))
-                            if pd.notna(row["progressive_carries"])
-                            else 0
-                        ),
-                        "prog_carries_final_3rd": (
-                            int(
-                                float(
-                                    str(row["carries_into_final_third"]).replace(
-                                        ",", ""
-                                    )
-                                )
-                            )
-                            if pd.notna(row["carries_into_final_third"])
-                            else 0
-                        ),
-                        "prog_passes": (
-                            int(float(str(row["progressive_passes"]).replace(",", "")))
-                            if pd.notna(row["progressive_passes"])
-                            else 0
-                        ),
-                        "shots_target": (
-                            int(float(str(row["shots_on_target"]).replace(",", "")))
-                            if pd.notna(row["shots_on_target"])
-                            else 0
-                        ),
-                        "passes_to_final_3rd": (
-                            int(
-                                float(
-                                    str(row["passes_into_final_third"]).replace(",", "")
-                                )
-                            )
-                            if pd.notna(row["passes_into_final_third"])
-                            else 0
-                        ),
-                        "passes_to_pen_area": (
-                            int(
-                                float(
-                                    str(row["passes_into_penalty_area"]).replace(
-                                        ",", ""
-                                    )
-                                )
-                            )
-                            if pd.notna(row["passes_into_penalty_area"])
-                            else 0
-                        ),
-                        "pass_switches": (
-                            int(float(str(row["passes_switches"]).replace(",", "")))
-                            if pd.notna(row["passes_switches"])
-                            else 0
-                        ),
-                        "through_ball": (
-                            int(float(str(row["through_balls"]).replace(",", "")))
-                            if pd.notna(row["through_balls"])
-                            else 0
-                        ),
-                        "shots_creation_action": (
-                            int(float(str(row["sca"]).replace(",", "")))
-                            if pd.notna(row["sca"])
-                            else 0
-                        ),
-                        "offsides": (
-                            int(float(str(row["offsides"]).replace(",", "")))
-                            if pd.notna(row["offsides"])
-                            else 0
-                        ),
-                        "pen_won": (
-                            int(float(str(row["pens_won"]).replace(",", "")))
-                            if pd.notna(row["pens_won"])
-                            else 0
-                        ),
-                        "pen_conceded": (
-                            int(float(str(row["pens_conceded"]).replace(",", "")))
-                            if pd.notna(row["pens_conceded"])
-                            else 0
-                        ),
-                        "tackles": (
-                            int(float(str(row["tackles"]).replace(",", "")))
-                            if pd.notna(row["tackles"])
-                            else 0
-                        ),
-                        "ball_recoveries": (
-                            int(float(str(row["ball_recoveries"]).replace(",", "")))
-                            if pd.notna(row["ball_recoveries"])
-                            else 0
-                        ),
-                        "aerial_duels_won": (
-                            int(float(str(row["aerials_won"]).replace(",", "")))
-                            if pd.notna(row["aerials_won"])
-                            else 0
-                        ),
-                        "aerial_duels_lost": (
-                            int(float(str(row["aerials_lost"]).replace(",", "")))
-                            if pd.notna(row["aerials_lost"])
-                            else 0
-                        ),
-                        "blocks": (
-                            int(float(str(row["blocks"]).replace(",", "")))
-                            if pd.notna(row["blocks"])
-                            else 0
-                        ),
-                        "tackles_won": (
-                            int(float(str(row["tackles_won"]).replace(",", "")))
-                            if pd.notna(row["tackles_won"])
-                            else 0
-                        ),
-                        "interceptions": (
-                            int(float(str(row["interceptions"]).replace(",", "")))
-                            if pd.notna(row["interceptions"])
-                            else 0
-                        ),
-                        "touches": (
-                            int(float(str(row["touches"]).replace(",", "")))
-                            if pd.notna(row["touches"])
-                            else 0
-                        ),
-                        "dispossessed": (
-                            int(float(str(row["dispossessed"]).replace(",", "")))
-                            if pd.notna(row["dispossessed"])
-                            else 0
-                        ),
-                        "miscontrols": (
-                            int(float(str(row["miscontrols"]).replace(",", "")))
-                            if pd.notna(row["miscontrols"])
-                            else 0
-                        ),
-                        "take_ons": (
-                            int(float(str(row["take_ons"]).replace(",", "")))
-                            if pd.notna(row["take_ons"])
-                            else 0
-                        ),
-                        "take_ons_won": (
-                            int(float(str(row["take_ons_won"]).replace(",", "")))
-                            if pd.notna(row["take_ons_won"])
-                            else 0
-                        ),
-                        "fouls_won": (
-                            int(float(str(row["fouled"]).replace(",", "")))
-                            if pd.notna(row["fouled"])
-                            else 0
-                        ),
-                        "fouls_committed": (
-                            int(float(str(row["fouls"]).replace(",", "")))
-                            if pd.notna(row["fouls"])
-                            else 0
-                        ),
-                        "carries_to_final_3rd": (
-                            int(
-                                float(
-                                    str(row["carries_into_final_third"]).replace(
-                                        ",", ""
-                                    )
-                                )
-                            )
-                            if pd.notna(row["carries_into_final_third"])
-                            else 0
-                        ),
-                        "carries_to_pen_area": (
-                            int(
-                                float(
-                                    str(row["carries_into_penalty_area"]).replace(
-                                        ",", ""
-                                    )
-                                )
-                            )
-                            if pd.notna(row["carries_into_penalty_area"])
-                            else 0
-                        ),
-                        "yellow_card": (
-                            int(float(str(row["cards_yellow"]).replace(",", "")))
-                            if pd.notna(row["cards_yellow"])
-                            else 0
-                        ),
-                        "red_card": (
-                            int(float(str(row["cards_red"]).replace(",", "")))
-                            if pd.notna(row["cards_red"])
-                            else 0
-                        ),
-                    }
-
-                    # Use update_or_create to handle new and existing stats entries.
-                    # This respects the unique constraint on (player, season, club).
-                    obj, created = PlayerSeasonStats.objects.update_or_create(
-                        player=player,
-                        season=season,
-                        club=club,
-                        league=league,
-                        defaults=data,
-                    )
+            try:
+                # Look up the Player and Club objects using their fbref_id
+                player = Player.objects.get(fbref_id=row["player_id"])
+                club = Club.objects.get(fbref_id=row["team_id"])
+                if not is_valid:
+                    raise ValueError("could not convert a value to a number")
 
-                    if created:
-                        created_count += 1
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f"Created stats for {player.full_name} at {club.name}"
-                            )
-                        )
-                    else:
-                        updated_count += 1
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f"Updated stats for {player.full_name} at {club.name}"
-                            )
-                        )
+                # Use update_or_create to handle new and existing stats entries.
+                # This respects the unique constraint on (player, season, club).
+                obj, created = PlayerSeasonStats.objects.update_or_create(
+                    player=player,
+                    season=season,
+                    club=club,
+                    league=league,
+                    defaults=defaults,
+                )
+                stored[key] = defaults["fingerprint"]
 
-                except Player.DoesNotExist:
+                if created:
+                    created_count += 1
                     self.stdout.write(
-                        self.style.ERROR(
-                            f"Skipping row: Player with fbref_id '{row['player_id']}' not found in the database. Please run the import_players command first."
+                        self.style.SUCCESS(
+                            f"Created stats for {player.full_name} at {club.name}"
                         )
                     )
-                except Club.DoesNotExist:
+                else:
+                    updated_count += 1
                     self.stdout.write(
-                        self.style.ERROR(
-                            f"Skipping row: Club with fbref_id '{row['team_id']}' not found in the database. Please run the import_clubs command first."
+                        self.style.WARNING(
+                            f"Updated stats for {player.full_name} at {club.name}"
                         )
                     )
-                except IntegrityError as e:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"Integrity Error for player ID {row['player_id']} at club ID {row['team_id']}: {e}"
-                        )
+
+            except Player.DoesNotExist:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Skipping row: Player with fbref_id '{row['player_id']}' not found in the database. Please run the import_players command first."
                     )
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"An unexpected error occurred while processing row for player ID {row['player_id']}: {e}"
-                        )
+                )
+            except Club.DoesNotExist:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Skipping row: Club with fbref_id '{row['team_id']}' not found in the database. Please run the import_clubs command first."
                     )
+                )
+            except IntegrityError as e:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Integrity Error for player ID {row['player_id']} at club ID {row['team_id']}: {e}"
+                    )
+                )
+            except Exception as e:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"An unexpected error occurred while processing row for player ID {row['player_id']}: {e}"
+                    )
+                )
 
-            # Final summary
+        return created_count, updated_count, unchanged_count
+
+    def bulk_upsert(self, df, season, league, full=False, path=None):
+        """Imports every row with a handful of queries.
+
+        The players and clubs are resolved with one ``IN`` query each, the
+        columns are converted with vectorized pandas operations and all rows
+        are written by a single ``bulk_create(update_conflicts=True)`` in one
+        transaction. Rows that the row-by-row import would skip are skipped
+        here too, so the created/updated/unchanged counts are the same, and
+        only new or changed rows are written.
+        """
+        timings = {}
+        started = time.perf_counter()
+
+        goalkeepers = df["position"] == "GK"
+        if goalkeepers.any():
             self.stdout.write(
-                self.style.SUCCESS(
-                    f"\nPlayer season stats import complete! Created: {created_count}, Updated: {updated_count}"
+                self.style.NOTICE(f"Skipping {goalkeepers.sum()} goalkeepers")
+            )
+        df = df[~goalkeepers]
+
+        # Resolve the fbref ids with one query per model
+        players = dict(
+            Player.objects.filter(
+                fbref_id__in=df["player_id"].dropna().unique().tolist()
+            ).values_list("fbref_id", "id")
+        )
+        clubs = dict(
+            Club.objects.filter(
+                fbref_id__in=df["team_id"].dropna().unique().tolist()
+            ).values_list("fbref_id", "id")
+        )
+        player_ids = df["player_id"].map(players)
+        club_ids = df["team_id"].map(clubs)
+        for fbref_id in df.loc[player_ids.isna(), "player_id"].unique():
+            self.stdout.write(
+                self.style.ERROR(
+                    f"Skipping row: Player with fbref_id '{fbref_id}' not found in the database. Please run the import_players command first."
+                )
+            )
+        for fbref_id in df.loc[
+            player_ids.notna() & club_ids.isna(), "team_id"
+        ].unique():
+            self.stdout.write(
+                self.style.ERROR(
+                    f"Skipping row: Club with fbref_id '{fbref_id}' not found in the database. Please run the import_clubs command first."
                 )
             )
+        resolved = player_ids.notna() & club_ids.notna()
+        timings["resolve"] = time.perf_counter() - started
 
-        except FileNotFoundError:
+        # Convert the columns
+        started = time.perf_counter()
+        data, valid = convert(df, COLUMNS, path)
+        data["fingerprint"] = fingerprints(data.assign(league_id=league.id))
+        for player_id in df.loc[resolved & ~valid, "player_id"]:
             self.stdout.write(
-                self.style.ERROR(f'The file "{csv_file_path}" was not found.')
+                self.style.ERROR(
+                    f"An unexpected error occurred while processing row for player ID {player_id}: could not convert a value to a number"
+                )
             )
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"An unexpected error occurred: {e}"))
+        data["player_id"] = player_ids
+        data["club_id"] = club_ids
+        data = data[resolved & valid].astype({"player_id": "int64", "club_id": "int64"})
+
+        # Rows already stored under another league can't be upserted without
+        # moving them, which is what update_or_create refuses to do as well.
+        existing = {
+            (player_id, club_id): (league_id, "" if full else fingerprint)
+            for player_id, club_id, league_id, fingerprint in PlayerSeasonStats.objects.filter(
+                season=season, player_id__in=data["player_id"].unique().tolist()
+            ).values_list(
+                "player_id", "club_id", "league_id", "fingerprint"
+            )
+        }
+        keys = list(zip(data["player_id"], data["club_id"]))
+        conflicts = pd.Series(
+            [existing.get(key, (league.id,))[0] != league.id for key in keys],
+            index=data.index,
+            dtype=bool,
+        )
+        for player_id, team_id in df.loc[
+            conflicts[conflicts].index, ["player_id", "team_id"]
+        ].itertuples(index=False):
+            self.stdout.write(
+                self.style.ERROR(
+                    f"Integrity Error for player ID {player_id} at club ID {team_id}: already stored under another league"
+                )
+            )
+        data = data[~conflicts]
+
+        # Count like the row-by-row import: a repeated (player, club) row
+        # is compared with the one before it.
+        created_count = updated_count = unchanged_count = 0
+        latest = {key: fingerprint for key, (_, fingerprint) in existing.items()}
+        keys = list(zip(data["player_id"], data["club_id"]))
+        for key, fingerprint in zip(keys, data["fingerprint"]):
+            if key not in latest:
+                created_count += 1
+            elif latest[key] == fingerprint:
+                unchanged_count += 1
+            else:
+                updated_count += 1
+            latest[key] = fingerprint
+
+        # Only write the rows that end up different from what is stored
+        data = data.drop_duplicates(["player_id", "club_id"], keep="last")
+        stored = [
+            existing.get(key, (None, None))[1]
+            for key in zip(data["player_id"], data["club_id"])
+        ]
+        data = data[data["fingerprint"] != stored]
+        timings["transform"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            PlayerSeasonStats.objects.bulk_create(
+                [
+                    PlayerSeasonStats(season=season, league=league, **record)
+                    for record in records(data)
+                ],
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["player", "season", "club"],
+                update_fields=[column.field for column in COLUMNS] + ["fingerprint"],
+            )
+        timings["write"] = time.perf_counter() - started
+
+        self.stdout.write(
+            "Timings: "
+            + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items())
+        )
+        return created_count, updated_count, unchanged_count
+
 
 """
  python manage.py import_player_stats WSL_2025_26_ALL_PLAYER_STATS.csv --season-id=2 --league-id=1
@@ -462,4 +401,5 @@ class Command(BaseCommand):
  python manage.py import_player_stats NWSL_2025_26_ALL_PLAYER_STATS.csv --season-id=4 --league-id=3
  python manage.py import_player_stats LigaF_2025_26_ALL_PLAYER_STATS.csv --season-id=5 --league-id=4
  python manage.py import_player_stats SerieA_2025_26_ALL_PLAYER_STATS.csv --season-id=8 --league-id=7
-"""
\ No newline at end of file
+ python manage.py import_player_stats WSL_2025_26_ALL_PLAYER_STATS.csv --season-id=2 --league-id=1 --bulk
+"""
@@ -1,8 +1,15 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.db import IntegrityError
-from api.models import Player
-import numpy as np
+from api.columns import AGE, TEXT, Column, convert, read_csv, records, required_columns
+from api.models import Player, DataVersion
+
+# How each Player field is read from the CSV
+COLUMNS = [
+    Column("full_name", "player_name", TEXT, None),
+    Column("nationality", "nationality", TEXT, None),
+    Column("age", "age", AGE, None),
+]
 
 
 class Command(BaseCommand):
@@ -15,60 +22,42 @@ class Command(BaseCommand):
             type=str,
             help="The path to the CSV file containing player data.",
         )
+        parser.add_argument(
+            "--skip-refresh",
+            action="store_true",
+            help="Don't rebuild the leaderboards afterwards (e.g. when importing several files in a row).",
+        )
 
+    @DataVersion.deferred()
     def handle(self, *args, **kwargs):
         """The main logic for the management command."""
         csv_file_path = kwargs["csv_file"]
 
         try:
             # Read the CSV file into a pandas DataFrame
-            df = pd.read_csv(csv_file_path)
+            df = read_csv(csv_file_path)
 
             # Check for the existence of required columns
-            required_cols = ["player_name", "player_id", "nationality", "age"]
+            required_cols = ["player_id", *required_columns(COLUMNS)]
             if not all(col in df.columns for col in required_cols):
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"CSV file must contain the following columns: {', '.join(required_cols)}"
-                    )
+                raise CommandError(
+                    f"CSV file must contain the following columns: {', '.join(required_cols)}"
                 )
-                return
 
             # Counters for tracking the import process
             created_count = 0
             updated_count = 0
 
-            # Iterate through each row of the DataFrame
-            for _, row in df.iterrows():
-                try:
-                    # Clean and prepare the data from the row
-                    nationality = (
-                        row["nationality"] if pd.notna(row["nationality"]) else None
-                    )
-
-                    # The age column contains values in the format 'YY-DDD'.
-                    # This code splits the string at the hyphen and takes the year part.
-                    # It also handles cases where age is a float or is missing.
-                    try:
-                        age_str = str(row["age"])
-                        if pd.notna(row["age"]) and "-" in age_str:
-                            age = int(age_str.split("-")[0])
-                        elif pd.notna(row["age"]):
-                            age = int(float(age_str))
-                        else:
-                            age = None
-                    except (ValueError, TypeError):
-                        age = None
+            # Convert every column up front; the loop only talks to the database
+            converted, _ = convert(df, COLUMNS, csv_file_path)
 
+            for fbref_id, defaults in zip(df["player_id"], records(converted)):
+                try:
                     # Use update_or_create to handle new and existing players
                     # The 'fbref_id' is used as the unique identifier to prevent duplicates.
                     player, created = Player.objects.update_or_create(
-                        fbref_id=row["player_id"],
-                        defaults={
-                            "full_name": row["player_name"],
-                            "nationality": nationality,
-                            "age": age,
-                        },
+                        fbref_id=fbref_id,
+                        defaults=defaults,
                     )
 
                     if created:
@@ -88,7 +77,7 @@ class Command(BaseCommand):
                 except Exception as e:
                     self.stdout.write(
                         self.style.ERROR(
-                            f"Skipping row due to an error for player ID {row['player_id']}: {e}"
+                            f"Skipping row due to an error for player ID {fbref_id}: {e}"
                         )
                     )
 
@@ -99,12 +88,16 @@ class Command(BaseCommand):
                 )
             )
 
+            if not kwargs["skip_refresh"]:
+                call_command("refresh_leaderboards", stdout=self.stdout)
+            DataVersion.bump_models(Player)
+
         except FileNotFoundError:
-            self.stdout.write(
-                self.style.ERROR(f'The file "{csv_file_path}" was not found.')
-            )
+            raise CommandError(f'The file "{csv_file_path}" was not found.')
+        except CommandError:
+            raise
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"An unexpected error occurred: {e}"))
+            raise CommandError(f"An unexpected error occurred: {e}") from e
 
 
 """
@@ -0,0 +1,243 @@
+import io
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from api.columns import preloaded, read_and_convert
+from api.management.commands import (
+    import_goalkeeper_stats,
+    import_player_stats,
+    import_players,
+)
+from api.models import League, Season, DataVersion
+
+# The column specs the players CSVs are converted with in the workers
+PLAYER_SPECS = [
+    import_players.COLUMNS,
+    import_player_stats.COLUMNS,
+    import_goalkeeper_stats.COLUMNS,
+]
+
+
+class Command(BaseCommand):
+    help = "Imports players, clubs and their season stats for several leagues from a manifest file."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "manifest",
+            type=str,
+            help="A JSON file listing the league code, season and CSV files to import (see the example below).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of processes used to parse and convert the CSV files (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Import the player stats with import_player_stats --bulk.",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rewrite every stats row, even those that didn't change since the last import.",
+        )
+        parser.add_argument(
+            "--skip-refresh",
+            action="store_true",
+            help="Don't rebuild the leaderboards after the import.",
+        )
+
+    def load_manifest(self, path):
+        """The manifest entries with their league and season resolved.
+
+        File paths are relative to the manifest. Seasons that don't exist yet
+        are created; unknown league codes are an error.
+        """
+        try:
+            manifest = json.loads(Path(path).read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read the manifest "{path}": {e}')
+
+        base = Path(path).resolve().parent
+        entries = []
+        for item in manifest.get("leagues", []):
+            missing = [key for key in ("league", "players", "clubs") if key not in item]
+            season = item.get("season", manifest.get("season"))
+            if missing or not season:
+                raise CommandError(
+                    f"Manifest entry {item} needs a league, a season, a players and a clubs file."
+                )
+            entries.append(
+                {
+                    "code": item["league"],
+                    "season": season,
+                    "players": str(base / item["players"]),
+                    "clubs": str(base / item["clubs"]),
+                }
+            )
+        if not entries:
+            raise CommandError("The manifest doesn't list any leagues.")
+
+        codes = [entry["code"] for entry in entries]
+        leagues = League.objects.in_bulk(codes, field_name="code")
+        unknown = [code for code in codes if code not in leagues]
+        if unknown:
+            raise CommandError(f"Unknown league code(s): {', '.join(unknown)}")
+
+        for entry in entries:
+            entry["league"] = leagues[entry["code"]]
+            entry["season"], created = Season.objects.get_or_create(
+                league=entry["league"], season=entry["season"]
+            )
+            if created:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Created season {entry['season'].season} for {entry['code']}"
+                    )
+                )
+        return entries
+
+    def parse(self, specs, workers):
+        """Reads and converts every CSV once, in parallel.
+
+        ``specs`` is ``{path: [columns, ...]}``. Returns the frames and the
+        conversions in the form ``preloaded`` takes them.
+        """
+        paths = list(specs)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            try:
+                results = list(executor.map(read_and_convert, paths, specs.values()))
+            except FileNotFoundError as e:
+                raise CommandError(f'The file "{e.filename}" was not found.')
+        frames, conversions = {}, {}
+        for path, (frame, converted) in zip(paths, results):
+            frames[path] = frame
+            for key, done in converted.items():
+                conversions[(path, key)] = done
+        return frames, conversions
+
+    def run(self, label, name, *args, **options):
+        """Runs one import command and echoes its summary line.
+
+        A command that fails marks ``label`` as failed; the commands still
+        to run for it are skipped.
+        """
+        if label in self.failed:
+            return 0
+        verbose = self.verbosity > 1
+        output = self.stdout if verbose else io.StringIO()
+        started = time.perf_counter()
+        try:
+            call_command(name, *args, stdout=output, **options)
+        except CommandError as e:
+            self.failed[label] = f"{name}: {e}"
+            self.stderr.write(f"{label:<8} {name:<26} failed: {e}")
+            return time.perf_counter() - started
+        elapsed = time.perf_counter() - started
+        if not verbose:
+            lines = [line for line in output.getvalue().splitlines() if line.strip()]
+            summary = lines[-1] if lines else ""
+            self.stdout.write(f"{label:<8} {name:<26} {elapsed:6.2f}s  {summary}")
+        return elapsed
+
+    @DataVersion.deferred()
+    def handle(self, *args, **kwargs):
+        self.verbosity = kwargs["verbosity"]
+        self.failed = {}
+        started = time.perf_counter()
+        timings = {}
+
+        entries = self.load_manifest(kwargs["manifest"])
+
+        # Parse and convert the CSVs of every league at once; each file is
+        # read and converted only once even though several commands import
+        # from it.
+        specs = {}
+        for entry in entries:
+            specs[entry["players"]] = PLAYER_SPECS
+            specs.setdefault(entry["clubs"], [])
+        phase = time.perf_counter()
+        frames, conversions = self.parse(specs, kwargs["workers"])
+        timings["parse"] = time.perf_counter() - phase
+        self.stdout.write(f"Parsed {len(specs)} files ({timings['parse']:.2f}s)")
+
+        # The database writes run one command at a time, players and clubs
+        # first since every stats import looks them up.
+        phase = time.perf_counter()
+        with preloaded(frames, conversions):
+            for entry in entries:
+                self.run(
+                    entry["code"], "import_players", entry["players"], skip_refresh=True
+                )
+                self.run(entry["code"], "import_clubs", entry["clubs"])
+            for entry in entries:
+                ids = {"season_id": entry["season"].id, "league_id": entry["league"].id}
+                self.run(
+                    entry["code"],
+                    "import_club_season_stats",
+                    entry["clubs"],
+                    skip_refresh=True,
+                    **ids,
+                )
+                self.run(
+                    entry["code"],
+                    "import_player_stats",
+                    entry["players"],
+                    bulk=kwargs["bulk"],
+                    full=kwargs["full"],
+                    skip_refresh=True,
+                    **ids,
+                )
+                self.run(
+                    entry["code"],
+                    "import_goalkeeper_stats",
+                    entry["players"],
+                    full=kwargs["full"],
+                    skip_refresh=True,
+                    **ids,
+                )
+        timings["write"] = time.perf_counter() - phase
+
+        if self.failed:
+            raise CommandError(
+                "The leaderboards were not refreshed, these leagues failed to import: "
+                + "; ".join(f"{code} ({error})" for code, error in self.failed.items())
+            )
+        if not kwargs["skip_refresh"]:
+            timings["refresh"] = self.run("all", "refresh_leaderboards")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nSeason import complete! {len(entries)} leagues, {len(specs)} files in "
+                f"{time.perf_counter() - started:.2f}s ("
+                + ", ".join(
+                    f"{name} {seconds:.2f}s" for name, seconds in timings.items()
+                )
+                + ")"
+            )
+        )
+
+
+"""
+ python manage.py import_season season_2025_26.json
+ python manage.py import_season season_2025_26.json --bulk --workers=4
+
+ season_2025_26.json:
+ {
+     "season": "2025/2026",
+     "leagues": [
+         {"league": "WSL", "players": "WSL_2025_26_ALL_PLAYER_STATS.csv", "clubs": "WSL_2025_26_TEAM_STATS.csv"},
+         {"league": "Frauen", "players": "Frauen_2025_26_ALL_PLAYER_STATS.csv", "clubs": "Frauen_2025_26_TEAM_STATS.csv"},
+         {"league": "Arkema", "players": "Arkema_2025_26_ALL_PLAYER_STATS.csv", "clubs": "Arkema_2025_26_TEAM_STATS.csv"},
+         {"league": "NWSL", "season": "2025", "players": "NWSL_2025_26_ALL_PLAYER_STATS.csv", "clubs": "NWSL_2025_26_TEAM_STATS.csv"},
+         {"league": "LigaF", "players": "LigaF_2025_26_ALL_PLAYER_STATS.csv", "clubs": "LigaF_2025_26_TEAM_STATS.csv"},
+         {"league": "SerieA", "players": "SerieA_2025_26_ALL_PLAYER_STATS.csv", "clubs": "SerieA_2025_26_TEAM_STATS.csv"}
+     ]
+ }
+"""
@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import benchmark, index_advisor
+from api.management.commands.benchmark import LOCAL_CACHES, parse_size
+from core.leaderboards import refresh_leaderboards
+
+
+class Command(BaseCommand):
+    help = "Proposes composite indexes for the queries of the benchmark routes or of a query log."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            type=str,
+            default="6,4,12,25",
+            help='Synthetic dataset: leagues, seasons per league, clubs per league and players per club (default: "6,4,12,25").',
+        )
+        parser.add_argument(
+            "--log",
+            type=str,
+            help="Analyze the SELECTs of this file (one per line, PostgreSQL log prefixes allowed) instead of replaying the benchmark routes.",
+        )
+        parser.add_argument(
+            "--only",
+            type=str,
+            default="",
+            help="Only replay the benchmark routes whose label contains this text.",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=10,
+            help="Number of proposals to show (default: 10).",
+        )
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Create each shown proposal for a moment and print the plan and time of its slowest query before and after.",
+        )
+
+    def write_proposals(self, proposals, top):
+        new = [p for p in proposals if p.existing is None][:top]
+        self.stdout.write(
+            f"{'table':<24} {'index':<52} {'queries':>8} {'sql ms':>9}  routes"
+        )
+        for proposal in new:
+            self.stdout.write(
+                f"{proposal.table:<24} {proposal.describe()[:52]:<52} "
+                f"{proposal.queries:>8} {proposal.seconds * 1000:>9.2f}  "
+                f"{len(proposal.labels)}"
+            )
+        covered = [p for p in proposals if p.existing is not None]
+        if covered:
+            self.stdout.write("\nAlready covered:")
+            for proposal in covered:
+                self.stdout.write(
+                    f"  {proposal.table} ({proposal.describe()}) by {proposal.existing}"
+                )
+        return new
+
+    def write_trial(self, proposal):
+        (plan, before), (new_plan, after) = index_advisor.trial(proposal)
+        self.stdout.write(
+            f"\n{proposal.table} ({proposal.describe()}): "
+            f"{before:.2f} ms -> {after:.2f} ms\n  {proposal.example.label}"
+        )
+        self.stdout.write("  before:")
+        for line in plan:
+            self.stdout.write(f"    {line}")
+        self.stdout.write("  after:")
+        for line in new_plan:
+            self.stdout.write(f"    {line}")
+
+    def handle(self, *args, **kwargs):
+        size = parse_size(kwargs["size"])
+        if kwargs["top"] < 1:
+            raise CommandError("--top must be at least 1.")
+
+        # Everything runs in a throwaway test database, never the real one
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+        try:
+            with override_settings(CACHES=LOCAL_CACHES):
+                rows = benchmark.seed(*size)
+                refresh_leaderboards()
+                index_advisor.analyze()
+                self.stdout.write(f"Seeded {rows} player season rows\n")
+
+                if kwargs["log"]:
+                    try:
+                        queries = index_advisor.read_log(kwargs["log"])
+                    except OSError as e:
+                        raise CommandError(f'Could not read "{kwargs["log"]}": {e}')
+                else:
+                    User = get_user_model()
+                    user = User.objects.create_user(
+                        username="advisor", email="advisor@example.com", is_active=True
+                    )
+                    admin = User.objects.create_superuser(
+                        username="advisor-admin", email="admin@example.com"
+                    )
+                    queries = index_advisor.replay(
+                        [c for c in benchmark.cases() if kwargs["only"] in c.label],
+                        {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"},
+                        {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(admin)}"},
+                    )
+                self.stdout.write(f"Analyzed {len(queries)} queries\n")
+
+                new = self.write_proposals(
+                    index_advisor.propose(queries), kwargs["top"]
+                )
+                if new:
+                    self.stdout.write("\nAs Meta.indexes:")
+                    for proposal in new:
+                        model = index_advisor.model_for(proposal.table)
+                        index = proposal.index(model)
+                        self.stdout.write(
+                            f"  {model.__name__}: models.Index(fields={index.fields!r}, "
+                            f'name="{index.name}")'
+                        )
+                if kwargs["explain"]:
+                    for proposal in new:
+                        self.write_trial(proposal)
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+
+"""
+ python manage.py index_advisor
+ python manage.py index_advisor --only season_player_stats --explain
+ python manage.py index_advisor --size 6,4,12,175 --top 5 --explain
+ python manage.py index_advisor --log slow_queries.log
+"""
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_dataversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="goalkeeper",
+            name="fingerprint",
+            field=models.CharField(blank=True, default="", max_length=16),
+        ),
+        migrations.AddField(
+            model_name="playerseasonstats",
+            name="fingerprint",
+            field=models.CharField(blank=True, default="", max_length=16),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+def name_slug(name):
+    """``api.models.name_slug`` as of this migration; kept here so it can't drift."""
+    return "".join(name.split()).replace("-", "").casefold()
+
+
+def fill_slugs(apps, schema_editor):
+    """The slugs ``SluggedModel.save()`` would give, in id order."""
+    for model_name, source in (("Club", "name"), ("Player", "full_name")):
+        model = apps.get_model("api", model_name)
+        taken, rows = set(), []
+        for row in model.objects.order_by("id").only("id", source, "fbref_id"):
+            row.slug = name_slug(getattr(row, source))
+            if row.slug in taken:
+                row.slug += name_slug(row.fbref_id)
+            taken.add(row.slug)
+            rows.append(row)
+        model.objects.bulk_update(rows, ["slug"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="club",
+            name="slug",
+            field=models.CharField(default="", editable=False, max_length=350),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="player",
+            name="slug",
+            field=models.CharField(default="", editable=False, max_length=600),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_slugs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Apart from 0009, so the index is built after the slugs are committed
+
+    dependencies = [
+        ("api", "0009_club_slug_player_slug"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="club",
+            name="slug",
+            field=models.CharField(editable=False, max_length=350, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="player",
+            name="slug",
+            field=models.CharField(editable=False, max_length=600, unique=True),
+        ),
+    ]
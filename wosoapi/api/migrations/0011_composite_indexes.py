@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_unique_slugs"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(
+                fields=["full_name"], name="api_player_full_na_e65fa1_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="playerseasonstats",
+            index=models.Index(
+                fields=["-goals", "-assists", "-minutes_played"],
+                name="api_players_goals_5eedf5_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="playerseasonstats",
+            index=models.Index(
+                fields=["club", "-goals", "-assists", "-minutes_played"],
+                name="api_players_club_id_a4f29e_idx",
+            ),
+        ),
+    ]
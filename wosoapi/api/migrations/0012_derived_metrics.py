@@ -0,0 +1,256 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:37
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="clubseasonstat",
+            name="goal_diff",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.expressions.CombinedExpression(
+                    models.F("goals_scored"), "-", models.F("goals_conceded")
+                ),
+                null=True,
+                output_field=models.IntegerField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="clubseasonstat",
+            name="xg_diff",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.expressions.CombinedExpression(
+                    models.F("xg_created"), "-", models.F("xg_conceded")
+                ),
+                null=True,
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="goalkeeper",
+            name="goals_conceded_per90",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        minutes_played__gt=0,
+                        then=django.db.models.expressions.CombinedExpression(
+                            django.db.models.expressions.CombinedExpression(
+                                models.F("goals_conceded"), "*", models.Value(90.0)
+                            ),
+                            "/",
+                            models.F("minutes_played"),
+                        ),
+                    ),
+                    default=None,
+                ),
+                null=True,
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="goalkeeper",
+            name="psxg_per90",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        minutes_played__gt=0,
+                        then=django.db.models.expressions.CombinedExpression(
+                            django.db.models.expressions.CombinedExpression(
+                                models.F("psxg"), "*", models.Value(90.0)
+                            ),
+                            "/",
+                            models.F("minutes_played"),
+                        ),
+                    ),
+                    default=None,
+                ),
+                null=True,
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="playerseasonstats",
+            name="GA",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.expressions.CombinedExpression(
+                    models.F("goals"), "+", models.F("assists")
+                ),
+                null=True,
+                output_field=models.IntegerField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="playerseasonstats",
+            name="goals_per90",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        minutes_played__gt=0,
+                        then=django.db.models.expressions.CombinedExpression(
+                            django.db.models.expressions.CombinedExpression(
+                                models.F("goals"), "*", models.Value(90.0)
+                            ),
+                            "/",
+                            models.F("minutes_played"),
+                        ),
+                    ),
+                    default=None,
+                ),
+                null=True,
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="playerseasonstats",
+            name="npxg_per90",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        minutes_played__gt=0,
+                        then=django.db.models.expressions.CombinedExpression(
+                            django.db.models.expressions.CombinedExpression(
+                                models.F("npxg"), "*", models.Value(90.0)
+                            ),
+                            "/",
+                            models.F("minutes_played"),
+                        ),
+                    ),
+                    default=None,
+                ),
+                null=True,
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="playerseasonstats",
+            name="sca_per90",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        minutes_played__gt=0,
+                        then=django.db.models.expressions.CombinedExpression(
+                            django.db.models.expressions.CombinedExpression(
+                                models.F("shots_creation_action"),
+                                "*",
+                                models.Value(90.0),
+                            ),
+                            "/",
+                            models.F("minutes_played"),
+                        ),
+                    ),
+                    default=None,
+                ),
+                null=True,
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="playerseasonstats",
+            name="tackles_won_pct",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        tackles__gt=0,
+                        then=django.db.models.expressions.CombinedExpression(
+                            django.db.models.expressions.CombinedExpression(
+                                models.F("tackles_won"), "*", models.Value(100.0)
+                            ),
+                            "/",
+                            models.F("tackles"),
+                        ),
+                    ),
+                    default=None,
+                ),
+                null=True,
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="playerseasonstats",
+            name="take_ons_won_pct",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        take_ons__gt=0,
+                        then=django.db.models.expressions.CombinedExpression(
+                            django.db.models.expressions.CombinedExpression(
+                                models.F("take_ons_won"), "*", models.Value(100.0)
+                            ),
+                            "/",
+                            models.F("take_ons"),
+                        ),
+                    ),
+                    default=None,
+                ),
+                null=True,
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="playerseasonstats",
+            name="xg_per90",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        minutes_played__gt=0,
+                        then=django.db.models.expressions.CombinedExpression(
+                            django.db.models.expressions.CombinedExpression(
+                                models.F("xg"), "*", models.Value(90.0)
+                            ),
+                            "/",
+                            models.F("minutes_played"),
+                        ),
+                    ),
+                    default=None,
+                ),
+                null=True,
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="playerseasonstats",
+            index=models.Index(fields=["-GA"], name="api_players_GA_3a5d15_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="playerseasonstats",
+            index=models.Index(
+                fields=["-goals_per90"], name="api_players_goals_p_c273a0_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="playerseasonstats",
+            index=models.Index(
+                fields=["-xg_per90"], name="api_players_xg_per9_812646_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="playerseasonstats",
+            index=models.Index(
+                fields=["-npxg_per90"], name="api_players_npxg_pe_59dfb6_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="playerseasonstats",
+            index=models.Index(
+                fields=["-sca_per90"], name="api_players_sca_per_369250_idx"
+            ),
+        ),
+    ]
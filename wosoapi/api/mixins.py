@@ -0,0 +1,624 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from urllib.parse import urlencode
+
+from django.core.exceptions import FieldDoesNotExist
+from django.http import Http404, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotAcceptable, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from api.exports import (
+    CHUNK_SIZE,
+    COLUMNAR_STREAMS,
+    EXPORT_RENDERERS,
+    STREAMS,
+    arrow_schema,
+)
+from api.models import DataVersion
+from api.snapshot import get_snapshots, lookup_getter, merge_ordered
+
+
+class DataVersionMixin:
+    """The ``DataVersion`` rows a view's output depends on.
+
+    That is the serializer's model and every model it points to. The rows
+    are read once per request and shared by the mixins below.
+    """
+
+    def get_version_models(self):
+        model = self.get_serializer_class().Meta.model
+        related = [
+            field.related_model for field in model._meta.fields if field.is_relation
+        ]
+        return [model, *related]
+
+    def get_data_versions(self):
+        """``{name: (generation, updated_at)}`` for ``get_version_models()``."""
+        if not hasattr(self, "_data_versions"):
+            names = [DataVersion.name_for(model) for model in self.get_version_models()]
+            rows = DataVersion.objects.filter(name__in=names).values_list(
+                "name", "generation", "updated_at"
+            )
+            found = {
+                name: (generation, updated_at) for name, generation, updated_at in rows
+            }
+            self._data_versions = {name: found.get(name, (0, None)) for name in names}
+        return self._data_versions
+
+    def get_version_token(self):
+        return ",".join(
+            f"{name}={generation}"
+            for name, (generation, _) in self.get_data_versions().items()
+        )
+
+
+class ConditionalGetMixin(DataVersionMixin):
+    """ETag / Last-Modified validators for list and detail responses.
+
+    The validators come from the ``DataVersion`` rows of the view's model and
+    the models it points to, so they change whenever an import or a write
+    touches that data. A request whose ``If-None-Match`` (or
+    ``If-Modified-Since``) still matches gets a 304 before any filtering,
+    pagination or serialization happens.
+    """
+
+    def get_validators(self, request):
+        fingerprint = "|".join(
+            [
+                request.get_full_path(),
+                request.accepted_renderer.media_type,
+                self.get_version_token(),
+            ]
+        )
+        etag = quote_etag(hashlib.md5(fingerprint.encode("utf-8")).hexdigest())
+        last_modified = max(
+            (
+                updated_at
+                for _, updated_at in self.get_data_versions().values()
+                if updated_at is not None
+            ),
+            default=None,
+        )
+        return etag, last_modified
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            candidates = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        return (
+            last_modified is not None
+            and if_modified_since is not None
+            and int(last_modified.timestamp()) <= if_modified_since
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+class ResponseCache:
+    """A size-bounded, thread-safe LRU of list response data for one endpoint."""
+
+    def __init__(self, model, max_entries):
+        self.model = model
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, data):
+        with self.lock:
+            self.entries[key] = data
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+            }
+
+
+# Endpoint name -> ResponseCache, for every view that opted in.
+response_caches = {}
+
+
+class ResponseCacheMixin(DataVersionMixin):
+    """Opt-in, in-process read-through cache for list responses.
+
+    Set ``response_cache_size`` on a view to enable it. The key is the URL,
+    scheme and host included, plus the query string with its parameters
+    sorted (``limit``/``offset`` included) and the current data versions.
+    Writes through the view clear
+    every cache of the same model. Imports change the versions, so their
+    old keys are never read again and age out of the LRU.
+    """
+
+    response_cache_size = 0
+
+    def get_response_cache(self):
+        if not self.response_cache_size:
+            return None
+        name = type(self).__name__
+        if name not in response_caches:
+            response_caches[name] = ResponseCache(
+                self.get_serializer_class().Meta.model, self.response_cache_size
+            )
+        return response_caches[name]
+
+    def get_response_cache_key(self, request):
+        # The cached data holds absolute next/previous links, so the scheme
+        # and host are part of the key
+        url = request.build_absolute_uri(request.path)
+        params = sorted(request.query_params.lists())
+        return "|".join([url, urlencode(params, doseq=True), self.get_version_token()])
+
+    def list(self, request, *args, **kwargs):
+        cache = self.get_response_cache()
+        if cache is None:
+            return super().list(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers={"X-Response-Cache": "hit"})
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data)
+        response["X-Response-Cache"] = "miss"
+        return response
+
+    def invalidate_response_caches(self):
+        model = self.get_serializer_class().Meta.model
+        for cache in response_caches.values():
+            if cache.model is model:
+                cache.clear()
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.invalidate_response_caches()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.invalidate_response_caches()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.invalidate_response_caches()
+
+
+def _readable(serializer, names=None):
+    return [
+        field
+        for name, field in serializer.fields.items()
+        if not field.write_only and (names is None or name in names)
+    ]
+
+
+def _related_paths(serializer, model, prefix="", names=None):
+    for field in _readable(serializer, names):
+        if field.source == "*":
+            continue
+        if isinstance(field, serializers.BaseSerializer):
+            # A nested serializer for a relation reads every field of it
+            parts = field.source_attrs
+        else:
+            # "x.y" reads y off the related x; a plain field needs no join
+            parts = field.source_attrs[:-1]
+        current, path = model, prefix
+        for part in parts:
+            try:
+                relation = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                break
+            if not (relation.many_to_one or relation.one_to_one):
+                break
+            path = f"{path}__{part}" if path else part
+            current = relation.related_model
+            yield path
+        else:
+            if isinstance(field, serializers.Serializer) and path:
+                yield from _related_paths(field, current, path)
+
+
+@lru_cache(maxsize=None)
+def plan_select_related(serializer_class, names=None):
+    """The ``select_related()`` paths ``serializer_class`` needs to avoid N+1s.
+
+    Every readable field whose source walks through a forward relation
+    (``ReadOnlyField(source="league.code")``, a nested serializer, ...) is
+    joined, so the related rows come with the page instead of one query per
+    row. Write-only fields such as the ``*_id`` primary key fields are
+    skipped, they only ever read the local column. ``names`` limits the plan
+    to those fields.
+    """
+    serializer = serializer_class()
+    paths = _related_paths(serializer, serializer_class.Meta.model, names=names)
+    return tuple(sorted(set(paths)))
+
+
+@lru_cache(maxsize=None)
+def plan_only(serializer_class, names):
+    """The ``only()`` columns that the ``names`` fields of ``serializer_class`` read.
+
+    ``None`` when one of them isn't backed by a column (a method, a
+    property, ...), in which case every column has to be loaded.
+    """
+    columns = []
+    for field in _readable(serializer_class(), names):
+        current, path = serializer_class.Meta.model, []
+        for part in field.source_attrs:
+            try:
+                model_field = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete:
+                return None
+            path.append(part)
+            if not model_field.is_relation:
+                break
+            current = model_field.related_model
+        columns.append("__".join(path))
+    return tuple(columns)
+
+
+@lru_cache(maxsize=None)
+def readable_fields(serializer_class):
+    return tuple(field.field_name for field in _readable(serializer_class()))
+
+
+class SelectRelatedMixin:
+    """Joins the relations the view's serializer reads, see ``plan_select_related``.
+
+    It is applied in ``filter_queryset`` so that it covers the list and the
+    detail responses, whatever ``get_queryset`` returns.
+    """
+
+    def get_select_related(self):
+        return plan_select_related(self.get_serializer_class())
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        related = self.get_select_related()
+        return queryset.select_related(*related) if related else queryset
+
+
+class SparseFieldsMixin(SelectRelatedMixin):
+    """``?fields=a,b`` and ``?omit=c`` sparse fieldsets for read requests.
+
+    Only the requested fields are serialized, and the query only selects
+    their columns and joins the relations they read. Unknown field names
+    are a 400. Writes always use the whole serializer.
+    """
+
+    def get_sparse_fields(self):
+        """The ``frozenset`` of field names to render, or ``None`` for all of them."""
+        if hasattr(self, "_sparse_fields"):
+            return self._sparse_fields
+
+        self._sparse_fields = None
+        params = self.request.query_params
+        if self.request.method not in ("GET", "HEAD") or not (
+            "fields" in params or "omit" in params
+        ):
+            return None
+
+        available = readable_fields(self.get_serializer_class())
+        requested = {
+            key: [
+                name.strip() for name in params.get(key, "").split(",") if name.strip()
+            ]
+            for key in ("fields", "omit")
+        }
+        errors = {
+            key: [f"Unknown field(s): {', '.join(unknown)}"]
+            for key, names in requested.items()
+            if (unknown := [name for name in names if name not in available])
+        }
+        if errors:
+            raise ValidationError(errors)
+
+        names = set(requested["fields"] or available) - set(requested["omit"])
+        self._sparse_fields = frozenset(names)
+        return self._sparse_fields
+
+    def get_select_related(self):
+        return plan_select_related(
+            self.get_serializer_class(), self.get_sparse_fields()
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        names = self.get_sparse_fields()
+        columns = names is not None and plan_only(self.get_serializer_class(), names)
+        return queryset.only(*columns) if columns else queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        names = self.get_sparse_fields()
+        if names is not None:
+            fields = getattr(serializer, "child", serializer).fields
+            for name in readable_fields(self.get_serializer_class()):
+                if name not in names:
+                    fields.pop(name)
+        return serializer
+
+
+# Fields whose to_representation() returns a database value of the matching
+# type unchanged, so the fast list path can copy them as they are.
+_VERBATIM_FIELDS = (
+    serializers.ReadOnlyField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.FloatField,
+    serializers.BooleanField,
+)
+
+
+@lru_cache(maxsize=None)
+def plan_values(serializer_class, names=None):
+    """``(field names, values_list() lookups, converters)`` for a fast list.
+
+    The converters are ``to_representation`` for the fields that aren't
+    copied verbatim and ``None`` for the others. ``None`` for the whole plan
+    when a field can't be read with a lookup.
+    """
+    serializer = serializer_class()
+    fields = _readable(serializer, names)
+    lookups = plan_only(serializer_class, frozenset(f.field_name for f in fields))
+    if lookups is None or any(
+        isinstance(field, serializers.BaseSerializer) for field in fields
+    ):
+        return None
+    converters = tuple(
+        None if type(field) in _VERBATIM_FIELDS else field.to_representation
+        for field in fields
+    )
+    return tuple(field.field_name for field in fields), lookups, converters
+
+
+class FastListMixin:
+    """Serializes list pages straight from ``values_list()`` rows.
+
+    The page is read as tuples of the serializer's sources (``league.code``
+    becomes ``league__code``) and zipped with the field names, which skips
+    building model instances and DRF's per field attribute lookups. The
+    output is the same as the serializer's. Serializers with nested or
+    computed fields, and ``fast_list = False``, use the regular path.
+    ``count_queryset`` is the page's queryset before ``values_list()``, for
+    paginators that count without the joins the columns need.
+    """
+
+    fast_list = True
+
+    def get_values_plan(self):
+        names = getattr(self, "get_sparse_fields", lambda: None)()
+        return plan_values(self.get_serializer_class(), names)
+
+    def list(self, request, *args, **kwargs):
+        plan = self.fast_list and self.get_values_plan()
+        if not plan:
+            return super().list(request, *args, **kwargs)
+
+        names, lookups, converters = plan
+        self.count_queryset = self.filter_queryset(self.get_queryset())
+        queryset = self.count_queryset.values_list(*lookups)
+        page = self.paginate_queryset(queryset)
+        data = represent(names, converters, queryset if page is None else page)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+
+def represent(names, converters, rows):
+    """``plan_values`` rows (tuples of the lookups) as the serializer's dicts."""
+    data = [dict(zip(names, row)) for row in rows]
+    for name, convert in zip(names, converters):
+        if convert is not None:
+            for item in data:
+                if item[name] is not None:
+                    item[name] = convert(item[name])
+    return data
+
+
+class SnapshotListMixin:
+    """Serves nested list pages from the worker's ``Snapshot``s, not the database.
+
+    ``snapshot_scope`` is the URL kwarg, named like the foreign key column
+    (``league_id``), whose rows are listed; an id that isn't in the
+    database is a 404. ``season__season`` reads that season's snapshot,
+    otherwise every season's rows are merged. Requests with only pagination, ``ordering``,
+    ``fields``/``omit`` and ``season__season`` parameters are answered
+    from memory with the same output as the serializer. Any other filter,
+    ``?search=``, ``?cursor=`` and ``use_snapshot = False`` use the
+    regular path. Both break ties by id and sort strings in the database's
+    collation, so an offset page holds the same rows either way.
+    """
+
+    use_snapshot = True
+    snapshot_scope = None
+    snapshot_params = frozenset(
+        {"limit", "offset", "count", "ordering", "fields", "omit", "format"}
+    )
+
+    def get_snapshot_rows(self):
+        model = self.get_serializer_class().Meta.model
+        parent = next(
+            field.related_model
+            for field in model._meta.concrete_fields
+            if field.attname == self.snapshot_scope
+        )
+        scope_id = self.kwargs[self.snapshot_scope]
+        season = self.request.query_params.get("season__season")
+        if season and "season__season" in getattr(self, "filterset_fields", ()):
+            snapshots = get_snapshots([season])
+        else:
+            snapshots = get_snapshots()
+        # A league or club without stats is in no snapshot, but still listed
+        if not any(scope_id in snapshot.tables[parent] for snapshot in snapshots):
+            if not parent.objects.filter(pk=scope_id).exists():
+                raise Http404
+        ordering = OrderingFilter().get_ordering(self.request, None, self) or ()
+        return merge_ordered(snapshots, model, self.snapshot_scope, scope_id, ordering)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # The snapshot keeps tied rows in id order
+        return queryset.order_by(*queryset.query.order_by, "id")
+
+    def list(self, request, *args, **kwargs):
+        params = set(request.query_params) - {"season__season"}
+        plan = (
+            self.use_snapshot
+            and params <= self.snapshot_params
+            and plan_values(
+                self.get_serializer_class(),
+                getattr(self, "get_sparse_fields", lambda: None)(),
+            )
+        )
+        if not plan:
+            return super().list(request, *args, **kwargs)
+
+        names, lookups, converters = plan
+        rows = self.get_snapshot_rows()
+        page = self.paginate_queryset(rows)
+        getters = [lookup_getter(lookup) for lookup in lookups]
+        data = represent(
+            names,
+            converters,
+            (
+                tuple(get(row) for get in getters)
+                for row in (rows if page is None else page)
+            ),
+        )
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+
+class ExportMixin:
+    """An ``export`` action streaming every matching row as CSV or NDJSON.
+
+    It takes the list's filters, search, ordering and sparse fieldsets, but
+    has no pagination and no count. Rows are read from a server-side cursor
+    ``CHUNK_SIZE`` at a time, so memory stays flat however large the export.
+    The format comes from ``?format=csv|ndjson`` (or ``export.ndjson``) and
+    defaults to CSV.
+
+    With pyarrow installed, ``arrow`` (an IPC stream) and ``parquet`` write
+    the database values column by column, typed after the model fields.
+    """
+
+    def get_export_rows(self, queryset):
+        """``(names, rows)`` with the serializer's field names and output values."""
+        names = getattr(self, "get_sparse_fields", lambda: None)()
+        plan = plan_values(self.get_serializer_class(), names)
+        if plan is None:
+            serializer = self.get_serializer()
+            rows = (
+                tuple(serializer.to_representation(instance).values())
+                for instance in queryset.iterator(chunk_size=CHUNK_SIZE)
+            )
+            return list(serializer.fields), rows
+
+        names, lookups, converters = plan
+        rows = queryset.values_list(*lookups).iterator(chunk_size=CHUNK_SIZE)
+        if any(converters):
+            rows = (
+                tuple(
+                    value if convert is None or value is None else convert(value)
+                    for convert, value in zip(converters, row)
+                )
+                for row in rows
+            )
+        return names, rows
+
+    def get_columnar_rows(self, queryset):
+        """``(Arrow schema, rows)`` with the database values of the fields."""
+        names = getattr(self, "get_sparse_fields", lambda: None)()
+        plan = plan_values(self.get_serializer_class(), names)
+        if plan is None:
+            raise NotAcceptable(
+                f"{self.basename} can only be exported as {', '.join(STREAMS)}."
+            )
+        names, lookups, _ = plan
+        rows = queryset.values_list(*lookups).iterator(chunk_size=CHUNK_SIZE)
+        return arrow_schema(queryset.model, names, lookups), rows
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        renderer_classes=EXPORT_RENDERERS,
+    )
+    def export(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        queryset = self.filter_queryset(self.get_queryset())
+        if renderer.format in COLUMNAR_STREAMS:
+            schema, rows = self.get_columnar_rows(queryset)
+            content = COLUMNAR_STREAMS[renderer.format](schema, rows)
+        else:
+            names, rows = self.get_export_rows(queryset)
+            content = STREAMS[renderer.format](names, rows)
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f"; charset={renderer.charset}"
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.basename}.{renderer.format}"'
+        )
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Errors can't be written as Arrow or Parquet
+        renderer = getattr(request, "accepted_renderer", None)
+        if isinstance(response, Response) and response.exception:
+            if getattr(renderer, "render_style", "text") == "binary":
+                request.accepted_renderer = JSONRenderer()
+                request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,4 +1,63 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.db import models
+from django.db.models import Case, F, When, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+_deferred_bumps = ContextVar("deferred_data_version_bumps", default=None)
+
+
+def per90(field):
+    """``field`` per 90 minutes played, ``NULL`` without minutes."""
+    return Case(
+        When(minutes_played__gt=0, then=F(field) * 90.0 / F("minutes_played")),
+        default=None,
+    )
+
+
+def percentage(part, whole):
+    """``part`` as a percentage of ``whole``, ``NULL`` when ``whole`` is 0."""
+    return Case(
+        When(**{f"{whole}__gt": 0}, then=F(part) * 100.0 / F(whole)), default=None
+    )
+
+
+def derived(expression, output_field):
+    """A column the database computes from the row's other columns.
+
+    Stored rather than computed on read, so it can be indexed, filtered
+    and sorted on like the imported stats.
+    """
+    return models.GeneratedField(
+        expression=expression, output_field=output_field, db_persist=True, null=True
+    )
+
+
+class StatQuerySet(models.QuerySet):
+    def top_n_per(self, partition="season", metric="-goals", n=10, exclude_zero=True):
+        """The best ``n`` rows of every ``partition`` ranked by ``metric``.
+
+        Emits a single ``ROW_NUMBER() OVER (PARTITION BY ...)`` query instead
+        of one LIMIT query per partition. Ties are broken by id.
+        """
+        field = metric.lstrip("-")
+        qs = self
+        if exclude_zero:
+            qs = qs.filter(**{f"{field}__gt": 0})
+        order = F(field).desc() if metric.startswith("-") else F(field).asc()
+        return (
+            qs.annotate(
+                partition_rank=Window(
+                    RowNumber(),
+                    partition_by=[F(partition)],
+                    order_by=[order, F("id").asc()],
+                )
+            )
+            .filter(partition_rank__lte=n)
+            .order_by(partition, "partition_rank")
+        )
 
 
 class Country(models.Model):
@@ -45,10 +104,89 @@ class Season(models.Model):
         ]
 
 
-class Club(models.Model):
+def name_slug(name):
+    """``name`` as page URLs are matched: casefolded, without spaces or hyphens."""
+    return "".join(name.split()).replace("-", "").casefold()
+
+
+class SluggedModel(models.Model):
+    """Keeps ``slug``, the ``name_slug`` of ``slug_source``, in step on ``save()``.
+
+    The slug is unique; a name that normalizes to another row's slug gets
+    the row's fbref id appended. The slug, not the name, is the stable page
+    URL: a name finds the first row to have it, so pages link by slug and
+    the API returns it. Writes that bypass ``save()`` (``bulk_create``,
+    ``update``) have to set it themselves.
+    """
+
+    slug_source = None
+
+    class Meta:
+        abstract = True
+
+    def make_slug(self):
+        slug = name_slug(getattr(self, self.slug_source))
+        if slug == self.slug:
+            return slug
+        taken = type(self)._default_manager.filter(slug=slug).exclude(pk=self.pk)
+        if taken.exists():
+            slug += name_slug(self.fbref_id)
+        return slug
+
+    @classmethod
+    def id_for(cls, value):
+        """The id of the row whose slug, fbref id or id is ``value``, else ``None``.
+
+        Tried in that order, each an exact match on a unique column.
+        """
+        lookups = [{"slug": name_slug(value)}, {"fbref_id": value}]
+        if value.isdigit():
+            lookups.append({"pk": int(value)})
+        for lookup in lookups:
+            found = cls._default_manager.filter(**lookup).values_list("pk", flat=True)
+            if found:
+                return found[0]
+        return None
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or self.slug_source in update_fields:
+            self.slug = self.make_slug()
+            if update_fields is not None:
+                # update_or_create() only saves the fields it was given
+                kwargs["update_fields"] = {*update_fields, "slug"}
+        super().save(*args, **kwargs)
+
+
+class FingerprintedModel(models.Model):
+    """Clears ``fingerprint`` on a ``save()`` made outside an import.
+
+    ``fingerprint`` hashes the CSV row the stats were last imported from,
+    so an import skips rows it would not change. Once a row is written
+    some other way (the API, the admin) the hash no longer describes it,
+    and the next import has to write the CSV values back. Imports save
+    inside ``DataVersion.deferred()`` and keep the hash they set.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not DataVersion.is_deferred():
+            self.fingerprint = ""
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "fingerprint"}
+        super().save(*args, **kwargs)
+
+
+class Club(SluggedModel):
     name = models.CharField(max_length=300, unique=True)
     fbref_id = models.CharField(max_length=50, unique=True, db_index=True)
     stadium = models.CharField(max_length=200, blank=True, null=True)
+    slug = models.CharField(max_length=350, unique=True, editable=False)
+
+    slug_source = "name"
 
     def __str__(self):
         return self.name
@@ -79,6 +217,11 @@ class ClubSeasonStat(models.Model):
     comp_passes_allowed = models.IntegerField(null=True, blank=True)
     passes_to_final_third_allowed = models.IntegerField(null=True, blank=True)
     passes_to_pen_area_allowed = models.IntegerField(null=True, blank=True)
+    # Derived
+    goal_diff = derived(F("goals_scored") - F("goals_conceded"), models.IntegerField())
+    xg_diff = derived(F("xg_created") - F("xg_conceded"), models.FloatField())
+
+    objects = StatQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -91,17 +234,25 @@ class ClubSeasonStat(models.Model):
         return f"{self.club.name}, {self.season.season}"
 
 
-class Player(models.Model):
+class Player(SluggedModel):
     full_name = models.CharField(max_length=500)
     fbref_id = models.CharField(max_length=100, unique=True)
     nationality = models.CharField(max_length=50, null=True, blank=True)
     age = models.SmallIntegerField(null=True, blank=True)
+    slug = models.CharField(max_length=600, unique=True, editable=False)
+
+    slug_source = "full_name"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["full_name"], name="api_player_full_na_e65fa1_idx")
+        ]
 
     def __str__(self):
         return self.full_name
 
 
-class PlayerSeasonStats(models.Model):
+class PlayerSeasonStats(FingerprintedModel):
     player = models.ForeignKey(
         Player, on_delete=models.CASCADE, related_name="player_season", db_index=True
     )
@@ -157,6 +308,20 @@ class PlayerSeasonStats(models.Model):
     carries_to_pen_area = models.IntegerField(null=True, blank=True)
     yellow_card = models.SmallIntegerField(null=True, blank=True)
     red_card = models.SmallIntegerField(null=True, blank=True)
+    # Hash of the CSV row last imported, so unchanged rows can be skipped
+    fingerprint = models.CharField(max_length=16, blank=True, default="")
+    # Derived
+    GA = derived(F("goals") + F("assists"), models.IntegerField())
+    goals_per90 = derived(per90("goals"), models.FloatField())
+    xg_per90 = derived(per90("xg"), models.FloatField())
+    npxg_per90 = derived(per90("npxg"), models.FloatField())
+    sca_per90 = derived(per90("shots_creation_action"), models.FloatField())
+    tackles_won_pct = derived(percentage("tackles_won", "tackles"), models.FloatField())
+    take_ons_won_pct = derived(
+        percentage("take_ons_won", "take_ons"), models.FloatField()
+    )
+
+    objects = StatQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -164,12 +329,33 @@ class PlayerSeasonStats(models.Model):
                 fields=["player", "season", "club"], name="unique_player_season_club"
             )
         ]
+        # From manage.py index_advisor: the lists' default ordering, overall
+        # and per club
+        indexes = [
+            models.Index(
+                fields=["-goals", "-assists", "-minutes_played"],
+                name="api_players_goals_5eedf5_idx",
+            ),
+            models.Index(
+                fields=["club", "-goals", "-assists", "-minutes_played"],
+                name="api_players_club_id_a4f29e_idx",
+            ),
+            # Leaderboards of the derived metrics, e.g. the best xG per 90
+            # with a minimum of minutes
+            models.Index(fields=["-GA"], name="api_players_GA_3a5d15_idx"),
+            models.Index(
+                fields=["-goals_per90"], name="api_players_goals_p_c273a0_idx"
+            ),
+            models.Index(fields=["-xg_per90"], name="api_players_xg_per9_812646_idx"),
+            models.Index(fields=["-npxg_per90"], name="api_players_npxg_pe_59dfb6_idx"),
+            models.Index(fields=["-sca_per90"], name="api_players_sca_per_369250_idx"),
+        ]
 
     def __str__(self):
         return f"{self.player.full_name} {self.position}"
 
 
-class Goalkeeper(models.Model):
+class Goalkeeper(FingerprintedModel):
     player = models.ForeignKey(
         Player, on_delete=models.CASCADE, related_name="goalkeeper_season"
     )
@@ -198,6 +384,13 @@ class Goalkeeper(models.Model):
     crosses_stopped = models.IntegerField(null=True, blank=True)
     sweeper_action = models.IntegerField(null=True, blank=True)
     sweeper_action_per90 = models.FloatField(null=True, blank=True)
+    # Hash of the CSV row last imported, so unchanged rows can be skipped
+    fingerprint = models.CharField(max_length=16, blank=True, default="")
+    # Derived
+    goals_conceded_per90 = derived(per90("goals_conceded"), models.FloatField())
+    psxg_per90 = derived(per90("psxg"), models.FloatField())
+
+    objects = StatQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -209,3 +402,84 @@ class Goalkeeper(models.Model):
 
     def __str__(self):
         return f"{self.player.full_name}, GK ({self.season.season})"
+
+
+class DataVersion(models.Model):
+    """A generation counter bumped whenever data changes.
+
+    There is one row per model (named after its label, e.g.
+    ``api.playerseasonstats``), one per season of the stats models
+    (``api.playerseasonstats@2023/2024``) plus the ``stats`` row that covers
+    every model. Caches and HTTP validators put the current generation in their
+    keys, so everything cached before a change stops being served as soon
+    as the change lands.
+    """
+
+    STATS = "stats"
+
+    name = models.CharField(max_length=50, unique=True)
+    generation = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} #{self.generation}"
+
+    @staticmethod
+    def name_for(model, season=None):
+        name = model._meta.label_lower
+        return name if season is None else f"{name}@{season}"
+
+    @classmethod
+    def current(cls, name=STATS):
+        return (
+            cls.objects.filter(name=name).values_list("generation", flat=True).first()
+            or 0
+        )
+
+    @classmethod
+    def bump(cls, *names):
+        """Move ``names`` (the ``stats`` row by default) to a new generation.
+
+        Inside ``deferred()`` the names are collected and bumped once on exit.
+        """
+        names = names or (cls.STATS,)
+        pending = _deferred_bumps.get()
+        if pending is not None:
+            pending.update(names)
+            return
+        now = timezone.now()
+        for name in names:
+            cls.objects.get_or_create(name=name)
+            cls.objects.filter(name=name).update(
+                generation=F("generation") + 1, updated_at=now
+            )
+
+    @classmethod
+    def bump_models(cls, *models, seasons=()):
+        """Bump ``models`` and, for each of ``seasons``, their rows in it."""
+        cls.bump(
+            cls.STATS,
+            *(cls.name_for(model) for model in models),
+            *(cls.name_for(model, season) for model in models for season in seasons),
+        )
+
+    @classmethod
+    def is_deferred(cls):
+        """Whether a ``deferred()`` bulk write (e.g. an import) is running."""
+        return _deferred_bumps.get() is not None
+
+    @classmethod
+    @contextmanager
+    def deferred(cls):
+        """Collapse the bumps of a bulk write (e.g. an import) into one per name."""
+        if _deferred_bumps.get() is not None:
+            yield
+            return
+        pending = set()
+        token = _deferred_bumps.set(pending)
+        try:
+            yield
+        finally:
+            _deferred_bumps.reset(token)
+            if pending:
+                cls.bump(*sorted(pending))
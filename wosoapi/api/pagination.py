@@ -0,0 +1,296 @@
+import base64
+import binascii
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import F, GeneratedField, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Shared between the workers, entries never expire on their own
+COUNT_CACHE = "pages"
+
+
+class StatsPagination(LimitOffsetPagination):
+    """``limit``/``offset`` pages, plus an opt-in keyset mode and ``count=false``.
+
+    Passing ``cursor`` (empty for the first page) switches to keyset
+    pagination: the page starts right after the row the cursor points to,
+    found with a ``WHERE`` on the ordering columns instead of an ``OFFSET``,
+    so every page costs the same however deep it is. Rows imported or
+    deleted before the cursor don't shift the next pages either. The
+    ordering (the view's default or ``?ordering=``) gets the id as a
+    tiebreaker and puts NULLs last whatever the database. Only ``next``
+    links are given; ``previous`` is always null.
+
+    ``count=false`` skips the ``COUNT(*)`` in either mode; the response then
+    has no ``count`` and ``next`` is found by reading one extra row.
+
+    Counts are cached per filter set until the view's data versions change,
+    and run without the joins that only the serializer needs. Above
+    ``COUNT_ESTIMATE_THRESHOLD`` rows the PostgreSQL planner's estimate is
+    used instead; ``count_exact`` says which one the response holds.
+    """
+
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+    # Query parameters that don't change which rows are counted
+    uncounted_params = (
+        "limit",
+        "offset",
+        "cursor",
+        "count",
+        "ordering",
+        "fields",
+        "omit",
+        "format",
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.view = view
+        self.count_exact = True
+        count = request.query_params.get(self.count_query_param, "")
+        self.use_count = count.lower() not in ("false", "0")
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if not self.use_cursor and self.use_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count = self.get_count(queryset) if self.use_count else None
+
+        if self.use_cursor:
+            self.offset = 0
+            keys = self.get_keys(queryset)
+            values = self.decode_cursor(request, queryset.model, keys)
+            queryset = queryset.annotate(
+                **{alias: F(field) for alias, field, _ in keys}
+            ).order_by(
+                *(
+                    (
+                        F(field).desc(nulls_last=True)
+                        if descending
+                        else F(field).asc(nulls_last=True)
+                    )
+                    for _, field, descending in keys
+                )
+            )
+            if values is not None:
+                queryset = queryset.filter(self.after(queryset.model, keys, values))
+        else:
+            self.offset = self.get_offset(request)
+
+        rows = list(queryset[self.offset : self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[: self.limit]
+        if self.use_cursor:
+            self.next_values = (
+                self.key_values(rows[-1], keys) if self.has_next else None
+            )
+            rows = [self.strip_keys(row, keys) for row in rows]
+        return rows
+
+    def get_count(self, queryset):
+        cache = caches[COUNT_CACHE]
+        key = self.get_count_cache_key()
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            count, self.count_exact = cached
+            return count
+
+        # values_list() pages (FastListMixin) would join every column they read
+        if getattr(self.view, "count_queryset", None) is not None:
+            queryset = self.view.count_queryset
+        # Ordering and select_related() joins don't change the count
+        queryset = queryset.order_by()
+        if not queryset.query.values_select:
+            queryset = queryset.select_related(None)
+        threshold = settings.COUNT_ESTIMATE_THRESHOLD
+        estimate = self.estimate_count(queryset) if threshold else None
+        if estimate is not None and estimate > threshold:
+            count, self.count_exact = estimate, False
+        else:
+            count, self.count_exact = queryset.count(), True
+        if key:
+            cache.set(key, (count, self.count_exact))
+        return count
+
+    def get_count_cache_key(self):
+        """The path, the filters and the data versions, or ``None`` to not cache."""
+        if not hasattr(self.view, "get_version_token"):
+            return None
+        params = sorted(
+            (key, value)
+            for key, values in self.request.query_params.lists()
+            if key not in self.uncounted_params
+            for value in values
+            if value != ""
+        )
+        fingerprint = "|".join(
+            [self.request.path, urlencode(params), self.view.get_version_token()]
+        )
+        return f"api:count:{hashlib.md5(fingerprint.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def estimate_count(queryset):
+        """The planner's row estimate for ``queryset``, where the database has one."""
+        if connections[queryset.db].vendor != "postgresql":
+            return None
+        plan = json.loads(queryset.explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def get_keys(self, queryset):
+        """``(alias, field, descending)`` for every column of the ordering and the id."""
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        keys, seen = [], set()
+        for name in ordering:
+            if not isinstance(name, str) or name == "?":
+                raise ValidationError(
+                    {"cursor": ["Cursor pagination needs an ordering on fields."]}
+                )
+            field = name.lstrip("-")
+            field = "id" if field == "pk" else field
+            if field not in seen:
+                seen.add(field)
+                keys.append((field, name.startswith("-")))
+        if "id" not in seen:
+            keys.append(("id", False))
+        return [
+            (f"cursor_key_{index}", field, descending)
+            for index, (field, descending) in enumerate(keys)
+        ]
+
+    @staticmethod
+    def nullable(model, path):
+        """Whether the ``a__b`` lookup from ``model`` can be NULL."""
+        for name in path.split("__"):
+            field = model._meta.get_field(name)
+            if field.null:
+                return True
+            model = field.related_model
+        return False
+
+    def after(self, model, keys, values):
+        """Rows after ``values`` in the ``keys`` ordering, NULLs last."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (_, field, descending), value in zip(keys, values):
+            if value is not None:
+                lookup = "lt" if descending else "gt"
+                later = Q(**{f"{field}__{lookup}": value})
+                if self.nullable(model, field):
+                    later |= Q(**{f"{field}__isnull": True})
+                condition |= equal & later
+                equal &= Q(**{field: value})
+            else:
+                equal &= Q(**{f"{field}__isnull": True})
+        return condition
+
+    @staticmethod
+    def key_values(row, keys):
+        if isinstance(row, tuple):
+            # values_list() rows end with the annotations, in order
+            return list(row[-len(keys) :])
+        if isinstance(row, dict):
+            return [row[alias] for alias, _, _ in keys]
+        return [getattr(row, alias) for alias, _, _ in keys]
+
+    @staticmethod
+    def strip_keys(row, keys):
+        if isinstance(row, dict):
+            aliases = {alias for alias, _, _ in keys}
+            return {key: value for key, value in row.items() if key not in aliases}
+        if isinstance(row, tuple):
+            return row[: -len(keys)]
+        return row
+
+    @staticmethod
+    def key_field(model, path):
+        """The field the ``a__b`` lookup from ``model`` ends on."""
+        for name in path.split("__"):
+            field = model._meta.get_field(name)
+            model = field.related_model
+        if isinstance(field, GeneratedField):
+            return field.output_field
+        return field
+
+    def decode_cursor(self, request, model, keys):
+        """The cursor's values, each checked and converted for its key's field."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+        except (binascii.Error, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise NotFound(self.invalid_cursor_message)
+        decoded = []
+        for (_, path, _), value in zip(keys, values):
+            if value is not None:
+                if isinstance(value, (dict, list)):
+                    raise NotFound(self.invalid_cursor_message)
+                field = self.key_field(model, path)
+                try:
+                    value = field.to_python(value)
+                    field.run_validators(value)
+                    value = field.get_prep_value(value)
+                except (DjangoValidationError, TypeError, ValueError):
+                    raise NotFound(self.invalid_cursor_message)
+            decoded.append(value)
+        return decoded
+
+    def encode_cursor(self, values):
+        return base64.urlsafe_b64encode(
+            json.dumps(values, separators=(",", ":")).encode("utf-8")
+        ).decode("ascii")
+
+    def get_next_link(self):
+        if self.use_count and not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        if self.use_cursor:
+            return replace_query_param(
+                url, self.cursor_query_param, self.encode_cursor(self.next_values)
+            )
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit
+        )
+
+    def get_previous_link(self):
+        if self.use_cursor:
+            return None
+        if self.use_count:
+            return super().get_previous_link()
+        if self.offset <= 0:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        if self.offset - self.limit <= 0:
+            return remove_query_param(url, self.offset_query_param)
+        return replace_query_param(
+            url, self.offset_query_param, self.offset - self.limit
+        )
+
+    def get_paginated_response(self, data):
+        body = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+        if self.use_count:
+            body = {"count": self.count, "count_exact": self.count_exact, **body}
+        return Response(body)
@@ -0,0 +1,120 @@
+"""Percentile ranks of a player's season, for ``/api/players/<id>/percentiles/``.
+
+The values of every metric are kept sorted in memory per season, league
+and position, so a rank is two binary searches instead of a scan. A
+season's rows are read with one query the first time the season is asked
+for, and each group is sorted the first time it is ranked against. Both
+happen again once the ``api.playerseasonstats`` data version has moved
+on, i.e. after an import or a write (see ``SeasonCache``).
+"""
+
+from bisect import bisect_left, bisect_right
+from functools import partial
+from itertools import product
+from operator import is_not
+
+from django.db import models
+
+from api.models import PlayerSeasonStats
+from api.season_cache import SeasonCache
+from core.leaderboards import EUROPE_LEAGUES
+
+LEAGUE = "league"
+TOP5 = "top5"
+PEERS = (LEAGUE, TOP5)
+is_not_none = partial(is_not, None)
+# Every numeric stat, the derived columns included
+METRICS = [
+    field.name
+    for field in PlayerSeasonStats._meta.concrete_fields
+    if not (field.is_relation or field.primary_key or field.name == "age")
+    and isinstance(
+        field.output_field if field.generated else field,
+        (models.IntegerField, models.FloatField),
+    )
+]
+
+
+def position_codes(position):
+    """``"DF,MF"`` -> ``["DF", "MF"]``."""
+    return [code.strip() for code in (position or "").split(",") if code.strip()]
+
+
+def percentile(values, value):
+    """The share of ``values`` (sorted) below ``value``, ties counting half."""
+    below = bisect_left(values, value)
+    equal = bisect_right(values, value) - below
+    return round(100 * (below + equal / 2) / len(values), 1)
+
+
+class SeasonDistributions:
+    """The sorted values of each metric per (league, position) for one season.
+
+    ``TOP5`` stands for the ``EUROPE_LEAGUES`` together, and the position
+    ``""`` for every position. A player listed as ``"DF,MF"`` counts
+    among the defenders and among the midfielders.
+    """
+
+    def __init__(self, season):
+        self.season = season
+        rows = PlayerSeasonStats.objects.filter(season__season=season).values_list(
+            "league__code", "position", *METRICS
+        )
+        self.groups = {}
+        for league, position, *values in rows:
+            leagues = [league, TOP5] if league in EUROPE_LEAGUES else [league]
+            for key in product(leagues, ["", *position_codes(position)]):
+                self.groups.setdefault(key, []).append(values)
+        self.sorted = {}
+
+    def columns(self, key):
+        """One sorted list per metric for the group ``key``, sorted on first use."""
+        columns = self.sorted.get(key)
+        if columns is None and key in self.groups:
+            # Two threads may both sort a group; either result is the same
+            columns = [
+                sorted(filter(is_not_none, column)) for column in zip(*self.groups[key])
+            ]
+            self.sorted[key] = columns
+        return columns
+
+    def ranks(self, league, position, stat):
+        """``(peers, {metric: {"value", "percentile"}})`` of ``stat`` in a group."""
+        columns = self.columns((league, position))
+        if columns is None:
+            return 0, {}
+        ranks = {}
+        for metric, column in zip(METRICS, columns):
+            value = getattr(stat, metric)
+            ranks[metric] = {
+                "value": value,
+                "percentile": (
+                    percentile(column, value) if value is not None and column else None
+                ),
+            }
+        return len(self.groups[(league, position)]), ranks
+
+
+distributions = SeasonCache(SeasonDistributions, PlayerSeasonStats)
+
+
+def player_percentiles(stat, peer=LEAGUE, position=""):
+    """The percentile ranks of ``stat`` among its league's or the top 5 leagues' players.
+
+    ``position`` (``"MF"``, ...) narrows the peers to one position.
+    """
+    season = stat.season.season
+    league = stat.league.code if peer == LEAGUE else TOP5
+    peers, ranks = distributions.get(season).ranks(league, position, stat)
+    return {
+        "player_id": stat.player_id,
+        "player_name": stat.player.full_name,
+        "season": season,
+        "league": stat.league.code,
+        "club": stat.club.name,
+        "position": stat.position,
+        "peer": peer,
+        "peer_position": position or None,
+        "peers": peers,
+        "percentiles": ranks,
+    }
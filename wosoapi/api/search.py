@@ -0,0 +1,64 @@
+"""Ranked name search over players and clubs, for ``/api/search/``.
+
+On PostgreSQL a name matches when ``pg_trgm``'s word similarity to the
+query reaches the extension's threshold. The ``%>`` operator is answered
+from the trigram GIN indexes of migration 0008, and results are ranked by
+that similarity. Other databases fall back to ``icontains``, ranked by
+where the query matches: the whole name, its start, the start of a word
+or anywhere.
+"""
+
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, F, FloatField, Value, When
+
+from api.models import Club, Player
+
+# type: (model, name field, other fields returned)
+SEARCH_TYPES = {
+    "player": (Player, "full_name", ["fbref_id", "nationality", "slug"]),
+    "club": (Club, "name", ["fbref_id", "slug"]),
+}
+
+
+def match(queryset, field, q):
+    """The rows of ``queryset`` whose ``field`` matches ``q``, with a ``score`` in [0, 1]."""
+    if connections[queryset.db].vendor == "postgresql":
+        return queryset.filter(TrigramWordSimilar(F(field), q)).annotate(
+            score=TrigramWordSimilarity(q, field)
+        )
+    return queryset.filter(**{f"{field}__icontains": q}).annotate(
+        score=Case(
+            When(**{f"{field}__iexact": q}, then=Value(1.0)),
+            When(**{f"{field}__istartswith": q}, then=Value(0.8)),
+            When(**{f"{field}__icontains": f" {q}"}, then=Value(0.6)),
+            default=Value(0.4),
+            output_field=FloatField(),
+        )
+    )
+
+
+def search(q, types, limit):
+    """The ``limit`` best matches of ``q`` among ``types``, best first."""
+    results = []
+    for name in types:
+        model, field, extra = SEARCH_TYPES[name]
+        rows = (
+            match(model.objects.all(), field, q)
+            .order_by("-score", field, "id")
+            .values("id", field, *extra, "score")[:limit]
+        )
+        for row in rows:
+            score = round(row.pop("score"), 3)
+            results.append(
+                {
+                    "type": name,
+                    "id": row.pop("id"),
+                    "name": row.pop(field),
+                    **row,
+                    "score": score,
+                }
+            )
+    results.sort(key=lambda row: (-row["score"], row["name"], row["type"], row["id"]))
+    return results[:limit]
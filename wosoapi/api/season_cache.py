@@ -0,0 +1,69 @@
+"""Objects built per season from the database and kept in process memory."""
+
+import threading
+
+from api.models import DataVersion
+
+# Every SeasonCache, so they can all be dropped at once
+season_caches = []
+
+
+class SeasonCache:
+    """``build(season)`` per season, for the current data of ``models``.
+
+    The data versions of ``models``, and of the ``seasonal`` models' rows in
+    the season, are read on every ``get()`` (one query). Once an import or
+    a write has moved one on, the season is built again; a write to another
+    season's ``seasonal`` rows leaves it as it is. The new object replaces
+    the old one in a single assignment, so readers never see a half-built
+    season. Builds are serialized, so concurrent requests for a stale
+    season build it once.
+    """
+
+    def __init__(self, build, *models, seasonal=()):
+        self.build = build
+        self.names = [DataVersion.name_for(model) for model in models]
+        self.seasonal = list(seasonal)
+        self.entries = {}
+        self.lock = threading.Lock()
+        season_caches.append(self)
+
+    def names_for(self, season):
+        return [
+            *self.names,
+            *(DataVersion.name_for(model, season) for model in self.seasonal),
+        ]
+
+    def versions(self, seasons):
+        names = {season: self.names_for(season) for season in seasons}
+        found = dict(
+            DataVersion.objects.filter(
+                name__in={name for listed in names.values() for name in listed}
+            ).values_list("name", "generation")
+        )
+        return {
+            season: tuple(found.get(name, 0) for name in listed)
+            for season, listed in names.items()
+        }
+
+    def get(self, season):
+        return self.get_many([season])[0]
+
+    def get_many(self, seasons):
+        """``get()`` of each of ``seasons``, reading their versions in one query."""
+        versions = self.versions(seasons)
+        return [self.current(season, versions[season]) for season in seasons]
+
+    def current(self, season, version):
+        entry = self.entries.get(season)
+        if entry is None or entry[0] != version:
+            with self.lock:
+                entry = self.entries.get(season)
+                if entry is None or entry[0] != version:
+                    entry = (version, self.build(season))
+                    self.entries[season] = entry
+        return entry[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
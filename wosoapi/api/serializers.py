@@ -39,7 +39,7 @@ class SeasonSerializer(serializers.ModelSerializer):
 class ClubSerializer(serializers.ModelSerializer):
     class Meta:
         model = Club
-        fields = ["id", "name", "fbref_id", "stadium"]
+        fields = ["id", "name", "fbref_id", "stadium", "slug"]
 
 
 
@@ -56,6 +56,8 @@ class ClubSeasonStatSerializer(serializers.ModelSerializer):
     league = serializers.ReadOnlyField(source="league.code")
     club = serializers.ReadOnlyField(source="club.name")
     season = serializers.ReadOnlyField(source="season.season")
+    goal_diff = serializers.IntegerField(read_only=True)
+    xg_diff = serializers.FloatField(read_only=True)
 
 
     class Meta:
@@ -89,6 +91,9 @@ class ClubSeasonStatSerializer(serializers.ModelSerializer):
             "comp_passes_allowed",
             "passes_to_final_third_allowed",
             "passes_to_pen_area_allowed",
+            # Derived
+            "goal_diff",
+            "xg_diff",
         ]
 
 
@@ -96,7 +101,7 @@ class ClubSeasonStatSerializer(serializers.ModelSerializer):
 class PlayerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Player
-        fields = ["id", "full_name", "fbref_id", "nationality", "age"]
+        fields = ["id", "full_name", "fbref_id", "nationality", "age", "slug"]
 
 
 
@@ -117,6 +122,13 @@ class PlayerSeasonStatsSerializer(serializers.ModelSerializer):
     player_name = serializers.ReadOnlyField(source="player.full_name")
     club_name = serializers.ReadOnlyField(source="club.name")
     season = serializers.ReadOnlyField(source="season.season")
+    GA = serializers.IntegerField(read_only=True)
+    goals_per90 = serializers.FloatField(read_only=True)
+    xg_per90 = serializers.FloatField(read_only=True)
+    npxg_per90 = serializers.FloatField(read_only=True)
+    sca_per90 = serializers.FloatField(read_only=True)
+    tackles_won_pct = serializers.FloatField(read_only=True)
+    take_ons_won_pct = serializers.FloatField(read_only=True)
 
 
     class Meta:
@@ -182,6 +194,14 @@ class PlayerSeasonStatsSerializer(serializers.ModelSerializer):
             "fouls_committed",
             "yellow_card",
             "red_card",
+            # Derived
+            "GA",
+            "goals_per90",
+            "xg_per90",
+            "npxg_per90",
+            "sca_per90",
+            "tackles_won_pct",
+            "take_ons_won_pct",
         ]
 
 
@@ -203,6 +223,8 @@ class GoalkeeperSerializer(serializers.ModelSerializer):
     player_name = serializers.ReadOnlyField(source="player.full_name")
     club_name = serializers.ReadOnlyField(source="club.name")
     season = serializers.ReadOnlyField(source="season.season")
+    goals_conceded_per90 = serializers.FloatField(read_only=True)
+    psxg_per90 = serializers.FloatField(read_only=True)
 
 
     class Meta:
@@ -237,4 +259,7 @@ class GoalkeeperSerializer(serializers.ModelSerializer):
             # Sweeper actions
             "sweeper_action",
             "sweeper_action_per90",
+            # Derived
+            "goals_conceded_per90",
+            "psxg_per90",
         ]
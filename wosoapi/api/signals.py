@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from api.models import (
+    Club,
+    ClubSeasonStat,
+    Country,
+    DataVersion,
+    Goalkeeper,
+    League,
+    Player,
+    PlayerSeasonStats,
+    Season,
+)
+
+VERSIONED_MODELS = [
+    Country,
+    League,
+    Season,
+    Club,
+    Player,
+]
+# Also versioned per season, so caches of one season outlive writes to others
+SEASON_MODELS = [
+    ClubSeasonStat,
+    PlayerSeasonStats,
+    Goalkeeper,
+]
+
+
+def bump_data_version(sender, **kwargs):
+    DataVersion.bump_models(sender)
+
+
+def note_stored_season(sender, instance, **kwargs):
+    """Remembers the season a row is saved over, in case it moves out of it.
+
+    Imports only write rows in place, so they skip the query.
+    """
+    instance._stored_season = None
+    if instance.pk is not None and not DataVersion.is_deferred():
+        instance._stored_season = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("season__season", flat=True)
+            .first()
+        )
+
+
+def bump_season_data_version(sender, instance, **kwargs):
+    seasons = {instance.season.season, getattr(instance, "_stored_season", None)}
+    DataVersion.bump_models(sender, seasons=sorted(seasons - {None}))
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_data_version, sender=model)
+    post_delete.connect(bump_data_version, sender=model)
+
+for model in SEASON_MODELS:
+    pre_save.connect(note_stored_season, sender=model)
+    post_save.connect(bump_season_data_version, sender=model)
+    post_delete.connect(bump_season_data_version, sender=model)
@@ -0,0 +1,142 @@
+"""Players with a similar season profile, for ``/api/players/<id>/similar/``.
+
+A season's profiles form one NumPy matrix: a row per player season with
+minutes, a column per stat in ``FEATURES``, every value per 90 minutes
+and z-scored against the season's regulars. Ranking the neighbours of a
+row is one matrix-vector product (cosine) or one vectorized distance over
+the whole matrix. The matrices are kept per season in a ``SeasonCache``
+and built again only after the player stats have changed.
+"""
+
+import numpy as np
+
+from api.models import PlayerSeasonStats
+from api.percentiles import LEAGUE, METRICS, TOP5
+from api.season_cache import SeasonCache
+from core.leaderboards import EUROPE_LEAGUES
+
+ALL = "all"
+PEERS = (ALL, LEAGUE, TOP5)
+COSINE = "cosine"
+ZSCORE = "zscore"
+METHODS = (COSINE, ZSCORE)
+# Playing time says nothing about a player's style; derived columns repeat others
+PLAYING_TIME = {
+    "matches_played",
+    "minutes_played",
+    "matches_completed",
+    "matches_substituted",
+    "unused_sub",
+}
+FEATURES = [
+    name
+    for name in METRICS
+    if name not in PLAYING_TIME
+    and not PlayerSeasonStats._meta.get_field(name).generated
+]
+# Below this, per 90 values are too noisy to be matched against; such a
+# season can still be the one searched from
+MIN_MINUTES = 450
+DESCRIBED = [
+    "id",
+    "player_id",
+    "player__full_name",
+    "club__name",
+    "league__code",
+    "position",
+    "minutes_played",
+]
+
+
+class SeasonProfiles:
+    """The z-scored per 90 profiles of one season's players."""
+
+    def __init__(self, season):
+        rows = list(
+            PlayerSeasonStats.objects.filter(
+                season__season=season, minutes_played__gt=0
+            ).values_list(*DESCRIBED, *FEATURES)
+        )
+        self.described = [row[: len(DESCRIBED)] for row in rows]
+        self.index = {row[0]: position for position, row in enumerate(rows)}
+        self.player_ids = np.array([row[1] for row in rows])
+        self.leagues = np.array([row[4] for row in rows], dtype=object)
+        minutes = np.array([row[6] for row in rows], dtype=float)
+        # A missing stat counts as none of it
+        values = np.array([row[len(DESCRIBED) :] for row in rows], dtype=float).reshape(
+            len(rows), len(FEATURES)
+        )
+        per90 = np.nan_to_num(values) * (90 / minutes)[:, None]
+
+        self.regular = minutes >= MIN_MINUTES
+        sample = per90[self.regular] if self.regular.any() else per90
+        std = sample.std(axis=0)
+        std[std == 0] = 1
+        self.z = (per90 - sample.mean(axis=0)) / std
+        norms = np.linalg.norm(self.z, axis=1)
+        norms[norms == 0] = 1
+        self.unit = self.z / norms[:, None]
+
+    def similar(self, stat_id, k=10, method=COSINE, peer=ALL):
+        """``[(described row, score), ...]``, the ``k`` nearest regulars first.
+
+        The score is the cosine similarity (1 is the same profile) or the
+        distance between the z-scored profiles (0 is the same profile).
+        ``None`` when ``stat_id`` has no profile (no minutes).
+        """
+        row = self.index.get(stat_id)
+        if row is None:
+            return None
+        if method == COSINE:
+            closeness = self.unit @ self.unit[row]
+        else:
+            closeness = -np.linalg.norm(self.z - self.z[row], axis=1)
+
+        candidates = self.regular & (self.player_ids != self.player_ids[row])
+        if peer == LEAGUE:
+            candidates &= self.leagues == self.leagues[row]
+        elif peer == TOP5:
+            candidates &= np.isin(self.leagues, EUROPE_LEAGUES)
+        indices = np.flatnonzero(candidates)
+        k = min(k, len(indices))
+        if k == 0:
+            return []
+        nearest = indices[np.argpartition(-closeness[indices], k - 1)[:k]]
+        nearest = nearest[np.argsort(-closeness[nearest], kind="stable")]
+        sign = 1 if method == COSINE else -1
+        return [
+            (self.described[index], round(sign * float(closeness[index]), 4))
+            for index in nearest
+        ]
+
+
+profiles = SeasonCache(SeasonProfiles, PlayerSeasonStats)
+
+
+def similar_players(stat, k=10, method=COSINE, peer=ALL):
+    """The players whose season profile is closest to ``stat``'s, or ``None``."""
+    found = profiles.get(stat.season.season).similar(stat.pk, k, method, peer)
+    if found is None:
+        return None
+    return {
+        "player_id": stat.player_id,
+        "player_name": stat.player.full_name,
+        "season": stat.season.season,
+        "league": stat.league.code,
+        "club": stat.club.name,
+        "position": stat.position,
+        "method": method,
+        "peer": peer,
+        "results": [
+            {
+                "player_id": player_id,
+                "player_name": name,
+                "club": club,
+                "league": league,
+                "position": position,
+                "minutes_played": minutes,
+                "score": score,
+            }
+            for (_, player_id, name, club, league, position, minutes), score in found
+        ],
+    }
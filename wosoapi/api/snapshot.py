@@ -0,0 +1,314 @@
+"""A read-only copy of the stats tables, kept per season in each worker's memory.
+
+Nearly every request is a read, and the data only changes when an import
+runs, so the hot read paths (the top 5 leagues leaderboards and the
+``/leagues/<id>/...`` and ``/clubs/<id>/...`` lists) are answered from
+these copies instead of the database. A row is a named tuple of its
+model's columns followed by its related rows, so ``stat.player.full_name``
+reads like it does on a model instance. The leagues, clubs, players and
+seasons the stats rows point to are id -> row lookups they share.
+
+A season's copy is read the first time a worker needs it, and read again
+once a write or an import has changed that season's stats rows, or any
+league, club, player or season (see ``SeasonCache``). Requests still
+holding the old copy finish with it. Every worker holds its own copies:
+with the benchmark's 50,000 player seasons over four seasons, one season
+is about 18 MB, read again in about 0.3 s after a write to it.
+"""
+
+import heapq
+from collections import namedtuple
+from functools import reduce
+from operator import attrgetter, or_
+
+from django.db import models
+from django.db.models import Q
+
+from api.models import (
+    Club,
+    ClubSeasonStat,
+    Goalkeeper,
+    League,
+    Player,
+    PlayerSeasonStats,
+    Season,
+)
+from api.season_cache import SeasonCache
+from api.signals import SEASON_MODELS
+
+# Related tables first, so the rows a relation points to are already read
+MODELS = [League, Club, Player, Season, ClubSeasonStat, PlayerSeasonStats, Goalkeeper]
+LOOKUP_MODELS = [model for model in MODELS if model not in SEASON_MODELS]
+# Sorted groups kept per snapshot; ?ordering= can combine fields without end
+MAX_ORDERED = 256
+
+
+def row_type(model):
+    """``(row type, columns, relations)`` for the rows of ``model``.
+
+    ``relations`` are ``(column index, related model)`` for the foreign keys
+    to other snapshot tables; the row type has a field for each of them,
+    named like the relation, after the columns.
+    """
+    fields = model._meta.concrete_fields
+    columns = [field.attname for field in fields]
+    linked = [
+        field for field in fields if field.is_relation and field.related_model in MODELS
+    ]
+    base = namedtuple(
+        f"{model.__name__}Row", [*columns, *(field.name for field in linked)]
+    )
+    row = type(
+        base.__name__, (base,), {"__slots__": (), "pk": property(attrgetter("id"))}
+    )
+    relations = [
+        (columns.index(field.attname), field.related_model) for field in linked
+    ]
+    return row, columns, relations
+
+
+ROW_TYPES = {model: row_type(model) for model in MODELS}
+
+
+def lookup_getter(lookup):
+    """Reads the ``a__b`` lookup off a row; ``None`` past a missing relation."""
+    names = ["id" if name == "pk" else name for name in lookup.split("__")]
+
+    def get(row):
+        for name in names:
+            if row is None:
+                return None
+            row = getattr(row, name)
+        return row
+
+    return get
+
+
+def lookup_field(model, lookup):
+    """The field the ``a__b`` lookup from ``model`` ends on."""
+    for name in lookup.split("__"):
+        field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+        model = field.related_model
+    return field
+
+
+def order_rows(rows, ordering, getter=lookup_getter):
+    """``rows`` sorted by ``ordering`` (``["-goals", "player__full_name"]``).
+
+    ``getter(lookup)`` reads the sort value of a lookup off a row. NULLs
+    come last ascending and first descending, like PostgreSQL puts them.
+    Rows that tie keep their order.
+    """
+    rows = list(rows)
+    for name in reversed(ordering):
+        get = getter(name.lstrip("-"))
+
+        def key(row):
+            value = get(row)
+            return (value is None, value)
+
+        rows.sort(key=key, reverse=name.startswith("-"))
+    return rows
+
+
+def read_collation(field):
+    """``{value: rank}`` of the string ``field``'s values in database order."""
+    values = (
+        field.model._default_manager.exclude(**{field.attname: None})
+        .order_by(field.attname)
+        .values_list(field.attname, flat=True)
+        .distinct()
+    )
+    return {value: rank for rank, value in enumerate(values)}
+
+
+# One per model, so a write only re-reads the ranks of its own table
+collations = {model: SeasonCache(read_collation, model) for model in MODELS}
+
+
+def sort_getter(model, lookup):
+    """Reads ``lookup`` off ``model``'s rows as a value that sorts like SQL.
+
+    Python compares strings by code point, the database by its collation
+    ("Élise" before "Emma" before "van"), so string lookups read the rank
+    the database gives the value among every value of the column. The
+    ranks are shared by all seasons, so rows of different seasons compare.
+    """
+    get = lookup_getter(lookup)
+    field = lookup_field(model, lookup)
+    if not isinstance(field, (models.CharField, models.TextField)):
+        return get
+    ranks = collations[field.model].get(field)
+
+    def rank(row):
+        value = get(row)
+        # Only a value written after the ranks were read can be missing
+        return None if value is None else ranks.get(value, len(ranks))
+
+    return rank
+
+
+class Descending:
+    """Wraps a sort key so it sorts in reverse, for one part of a longer key."""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+
+def season_querysets(season):
+    """``{model: queryset}`` of the rows of ``MODELS`` a season's copy holds.
+
+    The stats tables hold the rows of the season named ``season``, every
+    other table the rows those (or the other tables) point to.
+    """
+    querysets = {}
+    for model in reversed(MODELS):
+        if model in SEASON_MODELS:
+            querysets[model] = model.objects.filter(season__season=season)
+            continue
+        linked = [
+            Q(pk__in=querysets[other].values(field.attname))
+            for other in querysets
+            for field in other._meta.concrete_fields
+            if field.is_relation and field.related_model is model
+        ]
+        querysets[model] = model.objects.filter(reduce(or_, linked))
+    return querysets
+
+
+class Snapshot:
+    """The rows of ``MODELS`` in one season, as ``{id: row}`` per model, in id order.
+
+    See ``season_querysets()`` for the rows each table holds.
+    """
+
+    def __init__(self, season):
+        self.season = season
+        querysets = season_querysets(season)
+        # The stats rows first: the lookups read after them still hold
+        # every row they point to, even if a write lands in between
+        values = {
+            model: list(
+                querysets[model].order_by("pk").values_list(*ROW_TYPES[model][1])
+            )
+            for model in reversed(MODELS)
+        }
+        self.tables = {}
+        for model in MODELS:
+            row, columns, relations = ROW_TYPES[model]
+            links = [(index, self.tables[related]) for index, related in relations]
+            rows = (
+                row._make(
+                    (*items, *(table.get(items[index]) for index, table in links))
+                )
+                for items in values.pop(model)
+            )
+            self.tables[model] = {obj.id: obj for obj in rows}
+        self.groups = {}
+        self.ordered_groups = {}
+
+    @property
+    def leagues(self):
+        return self.tables[League]
+
+    @property
+    def clubs(self):
+        return self.tables[Club]
+
+    @property
+    def players(self):
+        return self.tables[Player]
+
+    @property
+    def seasons(self):
+        return self.tables[Season]
+
+    def group(self, model, key):
+        """``{value: (row, ...)}`` of ``model``'s rows by the ``key`` attribute.
+
+        ``key`` may be dotted (``"season.season"``). Grouped on first use.
+        """
+        grouped = self.groups.get((model, key))
+        if grouped is None:
+            get = attrgetter(key)
+            lists = {}
+            for row in self.tables[model].values():
+                lists.setdefault(get(row), []).append(row)
+            grouped = {value: tuple(rows) for value, rows in lists.items()}
+            # Two threads may both group; either result is the same
+            self.groups[(model, key)] = grouped
+        return grouped
+
+    def ordered(self, model, key, value, ordering):
+        """``group(model, key)[value]`` sorted by ``ordering``, ties by id.
+
+        Strings sort in the database's collation, see ``sort_getter()``.
+        """
+        cache_key = (model, key, value, tuple(ordering))
+        rows = self.ordered_groups.get(cache_key)
+        if rows is None:
+            rows = tuple(
+                order_rows(
+                    self.group(model, key).get(value, ()),
+                    ordering,
+                    lambda lookup: sort_getter(model, lookup),
+                )
+            )
+            if len(self.ordered_groups) < MAX_ORDERED:
+                self.ordered_groups[cache_key] = rows
+        return rows
+
+
+def merge_ordered(snapshots, model, key, value, ordering):
+    """``ordered()`` of each of ``snapshots`` merged into one sorted list.
+
+    Each season is already sorted, so the seasons are merged rather than
+    sorted again, on the same key with the id as the last tiebreak.
+    """
+    if len(snapshots) == 1:
+        return list(snapshots[0].ordered(model, key, value, ordering))
+    getters = [
+        (sort_getter(model, name.lstrip("-")), name.startswith("-"))
+        for name in ordering
+    ]
+
+    def sort_key(row):
+        parts = []
+        for get, descending in getters:
+            found = get(row)
+            part = (found is None, found)
+            parts.append(Descending(part) if descending else part)
+        parts.append(row.id)
+        return parts
+
+    return list(
+        heapq.merge(
+            *(snapshot.ordered(model, key, value, ordering) for snapshot in snapshots),
+            key=sort_key,
+        )
+    )
+
+
+# A write to one season's stats rows only has that season read again
+snapshots = SeasonCache(Snapshot, *LOOKUP_MODELS, seasonal=SEASON_MODELS)
+
+
+def get_snapshots(seasons=None):
+    """The snapshots of those of ``seasons`` (every season by default) that exist.
+
+    In season order, each read now if its data has changed. Names that
+    aren't a season get no snapshot, so they can't fill the cache.
+    """
+    names = Season.objects.order_by("season").values_list("season", flat=True)
+    names = list(names.distinct())
+    if seasons is not None:
+        names = [name for name in names if name in seasons]
+    return snapshots.get_many(names)
@@ -1,3 +1,1410 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import re
+import tempfile
+from pathlib import Path
+from unittest import mock, skipIf
 
-# Create your tests here.
+import pandas as pd
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import Http404
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.benchmark import clear_caches, seed
+from api.columns import (
+    AGE,
+    FLOAT,
+    Column,
+    convert,
+    parse_age,
+    parse_numbers,
+    preloaded,
+    read_and_convert,
+    records,
+    required_columns,
+)
+from api.exports import pyarrow
+from api.management.commands.import_player_stats import COLUMNS as IMPORT_COLUMNS
+from api.management.commands.import_season import PLAYER_SPECS
+from api.index_advisor import Query, access_pattern, propose
+from api.mixins import response_caches
+from api.models import (
+    Club,
+    ClubSeasonStat,
+    DataVersion,
+    Goalkeeper,
+    League,
+    Player,
+    PlayerSeasonStats,
+    Season,
+    name_slug,
+)
+from api.pagination import StatsPagination
+from api.percentiles import distributions
+from api.similarity import FEATURES, MIN_MINUTES
+from api.snapshot import get_snapshots
+from api.views import (
+    ClubDetailView,
+    ClubSeasonStatView,
+    GoalkeeperView,
+    LeaguePlayerView,
+    PlayerSeasonStatsView,
+)
+from core.leaderboards import (
+    EUROPE_LEAGUES,
+    club_scope,
+    europe_tables,
+    league_scope,
+    refresh_leaderboards,
+    stored_tables,
+)
+from core.models import LeaderboardEntry
+from core.views import ClubSeasonStatView as CoreClubSeasonStatView
+from core.views import PlayerSeasonDetailView
+
+LIST_ROUTES = [
+    "all_countries-list",
+    "all_leagues-list",
+    "seasons-list",
+    "all_clubs-list",
+    "club_stats-list",
+    "all_players-list",
+    "season_player_stats-list",
+    "goalkeepers-list",
+]
+LEAGUE_ROUTES = [
+    "league_seasons",
+    "league_clubs",
+    "league_players",
+    "league_goalkeepers",
+]
+CLUB_ROUTES = ["club_players", "club_goalkeepers"]
+
+
+class SeededTestCase(TestCase):
+    """A small synthetic dataset and a reader authenticated with a JWT."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(leagues=2, seasons=2, clubs=3, players=4)
+        cls.user = get_user_model().objects.create_user(
+            username="reader", email="reader@example.com", is_active=True
+        )
+        cls.headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(cls.user)}"}
+
+    def get(self, url, params=None):
+        return self.client.get(url, params, secure=True, **self.headers)
+
+
+class StoredLeaderboardTests(SeededTestCase):
+    def setUp(self):
+        refresh_leaderboards()
+        self.stat = PlayerSeasonStats.objects.first()
+        self.other = PlayerSeasonStats.objects.exclude(league=self.stat.league).first()
+
+    def test_write_drops_the_affected_scopes(self):
+        self.stat.goals = 999
+        self.stat.save()
+        self.assertIsNone(stored_tables(league_scope(self.stat.league_id)))
+        self.assertIsNone(stored_tables(club_scope(self.stat.club_id)))
+        self.assertIsNotNone(stored_tables(league_scope(self.other.league_id)))
+
+        # The league page falls back to the live tables
+        response = self.client.get(
+            reverse("club_stats_by_league", args=[self.stat.league.code]),
+            secure=True,
+        )
+        top = response.context["player_goals"][self.stat.season.season][0]
+        self.assertEqual(top.pk, self.stat.pk)
+
+    def test_imports_leave_them_to_the_refresh(self):
+        with DataVersion.deferred():
+            self.stat.goals = 999
+            self.stat.save()
+        self.assertIsNotNone(stored_tables(league_scope(self.stat.league_id)))
+
+
+class CachedPageTests(SeededTestCase):
+    def setUp(self):
+        clear_caches()
+        self.stat = PlayerSeasonStats.objects.select_related("club").first()
+        self.url = reverse("club_stats_by_club", args=[self.stat.club.slug])
+
+    def page(self):
+        response = self.client.get(self.url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response["X-Page-Cache"], response
+
+    def test_a_second_get_is_served_from_the_cache(self):
+        state, first = self.page()
+        self.assertEqual(state, "miss")
+        with CaptureQueriesContext(connection) as queries:
+            state, again = self.page()
+        self.assertEqual(state, "hit")
+        self.assertEqual(again.content, first.content)
+        # Only the DataVersion generation is read
+        self.assertEqual(len(queries), 1)
+        self.assertIn("api_dataversion", queries[0]["sql"])
+
+    def test_writes_and_imports_render_a_fresh_page(self):
+        self.page()
+        self.stat.player.full_name = "Zed Renamed"
+        self.stat.player.save()
+        self.stat.goals = 999
+        self.stat.save()
+        state, response = self.page()
+        self.assertEqual(state, "miss")
+        self.assertContains(response, "Zed Renamed")
+
+        with DataVersion.deferred():
+            self.stat.player.full_name = "Zed Imported"
+            self.stat.player.save()
+            # The generation moves on once, when the import is done
+            self.assertEqual(self.page()[0], "hit")
+        state, response = self.page()
+        self.assertEqual(state, "miss")
+        self.assertContains(response, "Zed Imported")
+        self.assertEqual(self.page()[0], "hit")
+
+
+class ImportSeasonTests(SeededTestCase):
+    SEASON = "2030/2031"
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write_league(self, league, drop=()):
+        """The manifest entry of a one player CSV and a one club CSV for ``league``."""
+        club = Club.objects.filter(season_stats__league=league).first()
+        player = {name: "1" for name in required_columns(sum(PLAYER_SPECS, []))}
+        player.update(
+            player_id=f"new-{league.code}",
+            team_id=club.fbref_id,
+            player_name=f"New {league.code}",
+            position="MF",
+            age="24-100",
+            goals="7",
+        )
+        clubs = {
+            "team_name": club.name,
+            "team_id": club.fbref_id,
+            "points": 9,
+            "rank": 1,
+        }
+        entry = {"league": league.code}
+        for kind, row in (("players", player), ("clubs", clubs)):
+            row = {key: value for key, value in row.items() if key not in drop}
+            entry[kind] = f"{league.code}_{kind}.csv"
+            with open(self.directory / entry[kind], "w", newline="") as handle:
+                writer = csv.DictWriter(handle, fieldnames=list(row))
+                writer.writeheader()
+                writer.writerow(row)
+        return entry
+
+    def import_season(self, *entries):
+        manifest = self.directory / "season.json"
+        manifest.write_text(json.dumps({"season": self.SEASON, "leagues": entries}))
+        call_command(
+            "import_season",
+            str(manifest),
+            workers=1,
+            stdout=io.StringIO(),
+            stderr=io.StringIO(),
+        )
+
+    def imported(self, league):
+        return PlayerSeasonStats.objects.filter(
+            player__fbref_id=f"new-{league.code}", season__season=self.SEASON
+        )
+
+    def test_conversions_run_in_the_workers(self):
+        league = League.objects.first()
+        self.import_season(self.write_league(league))
+        self.assertEqual(self.imported(league).get().goals, 7)
+        self.assertTrue(LeaderboardEntry.objects.exists())
+
+        path = str(self.directory / f"{league.code}_players.csv")
+        df, conversions = read_and_convert(path, PLAYER_SPECS)
+        self.assertEqual(len(conversions), len(PLAYER_SPECS))
+        preloaded_conversions = {(path, key): done for key, done in conversions.items()}
+        with preloaded({path: df}, preloaded_conversions):
+            with mock.patch("api.columns.parse_numbers") as parse:
+                data, valid = convert(df, PLAYER_SPECS[1], path)
+        parse.assert_not_called()
+        self.assertEqual(data["goals"].tolist(), [7])
+
+    def test_reimport_restores_rows_edited_since(self):
+        league = League.objects.first()
+        entry = self.write_league(league)
+        self.import_season(entry)
+        stat = self.imported(league).get()
+        self.assertTrue(stat.fingerprint)
+
+        stat.goals = 999
+        stat.save(update_fields=["goals"])
+        stat.refresh_from_db()
+        self.assertEqual(stat.fingerprint, "")
+
+        self.import_season(entry)
+        stat.refresh_from_db()
+        self.assertEqual(stat.goals, 7)
+        self.assertTrue(stat.fingerprint)
+
+    def test_failed_league_stops_the_refresh(self):
+        good, bad = League.objects.all()[:2]
+        with self.assertRaisesMessage(CommandError, bad.code):
+            self.import_season(
+                self.write_league(good), self.write_league(bad, drop={"goals"})
+            )
+        self.assertTrue(self.imported(good).exists())
+        self.assertFalse(self.imported(bad).exists())
+        self.assertFalse(LeaderboardEntry.objects.exists())
+
+
+class ConditionalGetTests(SeededTestCase):
+    def setUp(self):
+        clear_caches()
+        # A write, so the versions have an updated_at for Last-Modified
+        DataVersion.bump_models(PlayerSeasonStats)
+        self.url = reverse("season_player_stats-list")
+        self.stat = PlayerSeasonStats.objects.first()
+
+    def get_if(self, url, **headers):
+        return self.client.get(url, secure=True, **self.headers, **headers)
+
+    def test_matching_validators_get_a_304(self):
+        detail = reverse("season_player_stats-detail", args=[self.stat.pk])
+        for url in (self.url, detail):
+            first = self.get(url)
+            self.assertEqual(first.status_code, 200)
+            etag, last_modified = first["ETag"], first["Last-Modified"]
+            matching = [
+                {"HTTP_IF_NONE_MATCH": etag},
+                {"HTTP_IF_NONE_MATCH": f'"other", W/{etag}'},
+                {"HTTP_IF_MODIFIED_SINCE": last_modified},
+            ]
+            for headers in matching:
+                with self.subTest(url=url, **headers):
+                    response = self.get_if(url, **headers)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response.content, b"")
+                    self.assertEqual(response["ETag"], etag)
+
+            response = self.get_if(url, HTTP_IF_NONE_MATCH='"other"')
+            self.assertEqual(response.status_code, 200)
+
+    def test_writes_and_imports_change_the_validators(self):
+        etag = self.get(self.url)["ETag"]
+        writes = [
+            lambda: self.stat.save(),
+            # The player is serialized with the stats
+            lambda: self.stat.player.save(),
+        ]
+        for write in writes:
+            write()
+            response = self.get_if(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+            etag = response["ETag"]
+
+        with DataVersion.deferred():
+            self.stat.save()
+            # An import moves the versions on once, when it is done
+            response = self.get_if(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+        response = self.get_if(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ResponseCacheTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        admin = get_user_model().objects.create_superuser(
+            username="admin", email="admin@example.com", password="x"
+        )
+        cls.admin_headers = {
+            "HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(admin)}"
+        }
+
+    def setUp(self):
+        clear_caches()
+        # A fresh cache of two entries, so the counters and the LRU start over
+        self.size = mock.patch.object(PlayerSeasonStatsView, "response_cache_size", 2)
+        self.size.start()
+        self.addCleanup(self.size.stop)
+        for name in ("PlayerSeasonStatsView", "GoalkeeperView"):
+            response_caches.pop(name, None)
+            self.addCleanup(response_caches.pop, name, None)
+        self.url = reverse("season_player_stats-list")
+
+    def cached(self, params, **extra):
+        response = self.client.get(
+            self.url, params, secure=True, **{**self.headers, **extra}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response["X-Response-Cache"], response
+
+    def test_a_repeated_request_is_a_hit(self):
+        state, first = self.cached({"limit": 3, "offset": 1})
+        self.assertEqual(state, "miss")
+        # The parameters are keyed in sorted order
+        state, again = self.cached({"offset": 1, "limit": 3})
+        self.assertEqual(state, "hit")
+        self.assertEqual(again.json(), first.json())
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for limit, expected in [
+            (1, "miss"),
+            (2, "miss"),
+            (1, "hit"),
+            (3, "miss"),  # evicts limit=2, the least recently used
+            (1, "hit"),
+            (2, "miss"),
+        ]:
+            with self.subTest(limit=limit):
+                self.assertEqual(self.cached({"limit": limit})[0], expected)
+
+    def test_counters_are_reported(self):
+        self.cached({"limit": 1})
+        self.cached({"limit": 1})
+        self.cached({"limit": 2})
+        stats_url = reverse("response_cache_stats")
+        self.assertEqual(self.get(stats_url).status_code, 403)
+        response = self.client.get(stats_url, secure=True, **self.admin_headers)
+        self.assertEqual(
+            response.data["PlayerSeasonStatsView"],
+            {"hits": 1, "misses": 2, "entries": 2, "max_entries": 2},
+        )
+
+    def test_a_write_through_the_view_clears_the_model_caches(self):
+        self.get(reverse("goalkeepers-list"))
+        self.cached({"limit": 1})
+        stat = PlayerSeasonStats.objects.first()
+        response = self.client.patch(
+            reverse("season_player_stats-detail", args=[stat.pk]),
+            {"goals": 999},
+            content_type="application/json",
+            secure=True,
+            **self.admin_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response_caches["PlayerSeasonStatsView"].stats()["entries"], 0)
+        self.assertEqual(response_caches["GoalkeeperView"].stats()["entries"], 1)
+        state, response = self.cached({"limit": 1, "ordering": "-goals"})
+        self.assertEqual(state, "miss")
+        self.assertEqual(response.data["results"][0]["goals"], 999)
+
+    @override_settings(ALLOWED_HOSTS=["testserver", "mirror.example"])
+    def test_links_follow_the_requested_host(self):
+        for host in ("testserver", "mirror.example", "testserver"):
+            with self.subTest(host=host):
+                _, response = self.cached({"limit": 1}, HTTP_HOST=host)
+                self.assertTrue(
+                    response.data["next"].startswith(f"https://{host}/"),
+                    response.data["next"],
+                )
+
+
+def cleaned_cell(value, dtype):
+    """A cell as the per-cell importers cleaned it; raises for a rejected row."""
+    if dtype == "age":
+        try:
+            text = str(value)
+            if pd.notna(value) and "-" in text:
+                return int(text.split("-")[0])
+            return int(float(text)) if pd.notna(value) else None
+        except (ValueError, TypeError):
+            return None
+    if pd.isna(value):
+        return 0 if dtype == "int" else 0.0
+    number = float(str(value).replace(",", ""))
+    return int(number) if dtype == "int" else number
+
+
+class ConvertTests(SimpleTestCase):
+    """``convert`` agrees with the per-cell cleaning it replaced."""
+
+    SPEC = [
+        Column("goals", "goals"),
+        Column("xg", "xg", FLOAT, 0.0),
+        Column("xg_performance", "goals", FLOAT, 0.0, minus="xg"),
+        Column("age", "age", AGE, None),
+    ]
+    # (goals, xg, age) rows; read_csv reads "goals" of the first table as
+    # text (it holds "abc"), and every column of the last one as numbers
+    TABLES = [
+        [
+            (goals, "0.5", "23-145")
+            for goals in ["", "12", "1,234", "7.9", "-3", " 5 ", "1e3", "2,5"]
+            + ["NaN", "inf", "abc"]
+        ]
+        + [("4", "", "23-145"), ("", "", "23-145"), ("4", "x", "23-145")],
+        [
+            ("1", "1", age)
+            for age in ["", "23-145", "23-", "-5", "23.5-100", " 23-1", "23.0"]
+            + ["abc", "1,234"]
+        ],
+        [(cell, cell, cell) for cell in ["", "12", "7.5", "-3", "1e3", "NaN"]],
+    ]
+
+    def frame(self, rows):
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerow(["goals", "xg", "age"])
+        writer.writerows(rows)
+        return pd.read_csv(io.StringIO(text.getvalue()))
+
+    def expected(self, row):
+        """``(values, accepted)`` of the per-cell cleaning for a CSV row."""
+        try:
+            goals, xg = cleaned_cell(row["goals"], "int"), cleaned_cell(
+                row["xg"], "float"
+            )
+            both = pd.notna(row["goals"]) and pd.notna(row["xg"])
+            performance = cleaned_cell(row["goals"], "float") - xg if both else 0.0
+        except (ValueError, TypeError, OverflowError):
+            return None, False
+        values = {"goals": goals, "xg": xg, "xg_performance": performance}
+        return {**values, "age": cleaned_cell(row["age"], "age")}, True
+
+    def test_messy_cells_convert_like_the_per_cell_cleaning(self):
+        for rows in self.TABLES:
+            df = self.frame(rows)
+            data, valid = convert(df, self.SPEC)
+            for cells, (_, row), values, accepted in zip(
+                rows, df.iterrows(), records(data), valid
+            ):
+                with self.subTest(cells=cells, dtype=df["goals"].dtype.name):
+                    expected, ok = self.expected(row)
+                    self.assertEqual(accepted, ok)
+                    if ok:
+                        self.assertEqual(values, expected)
+
+    def test_parsers(self):
+        cases = [
+            (parse_numbers, ["1,234", "", "x", "0.5"], [1234.0, None, None, 0.5]),
+            (parse_age, ["23-145", "23", "23.9", "", "x-1"], [23, 23, 23, None, None]),
+        ]
+        for parse, cells, expected in cases:
+            with self.subTest(parse=parse.__name__):
+                column = pd.Series(cells, dtype=object).replace("", None)
+                parsed = parse(column).astype(object)
+                self.assertEqual(parsed.where(parsed.notna(), None).tolist(), expected)
+
+
+class BulkImportTests(SeededTestCase):
+    """``import_player_stats --bulk`` ends where the row-by-row import does."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        league, other = League.objects.all()[:2]
+        cls.league = league
+        cls.season = Season.objects.create(season="2031/2032", league=league)
+        cls.players = list(
+            Player.objects.filter(player_season__league=league)
+            .distinct()
+            .order_by("id")[:6]
+        )
+        cls.clubs = list(Club.objects.filter(season_stats__league=league).distinct())
+        # Stored under another league, which neither path may move
+        stat = PlayerSeasonStats.objects.filter(league=league).first()
+        stat.pk, stat.season, stat.league = None, cls.season, other
+        stat.player, stat.club = cls.players[4], cls.clubs[1]
+        stat.save()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write_csv(self, name, rows):
+        """A CSV of ``(player, club, changes)`` rows, 1 in every other column."""
+        path = self.directory / name
+        columns = ["player_id", "team_id", *required_columns(IMPORT_COLUMNS)]
+        with open(path, "w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=columns)
+            writer.writeheader()
+            for player, club, changes in rows:
+                row = dict.fromkeys(columns, "1")
+                row.update(player_id=player, team_id=club, position="MF", age="24-100")
+                writer.writerow({**row, **changes})
+        return str(path)
+
+    def run_import(self, path, bulk):
+        out = io.StringIO()
+        call_command(
+            "import_player_stats",
+            path,
+            season_id=self.season.pk,
+            league_id=self.league.pk,
+            bulk=bulk,
+            skip_refresh=True,
+            stdout=out,
+        )
+        return re.search(r"Created: \d+, Updated: \d+, Unchanged: \d+", out.getvalue())[
+            0
+        ]
+
+    def stored(self):
+        fields = [column.field for column in IMPORT_COLUMNS]
+        return list(
+            PlayerSeasonStats.objects.filter(season=self.season)
+            .order_by("player_id", "club_id")
+            .values_list("player_id", "club_id", "league_id", "fingerprint", *fields)
+        )
+
+    def test_bulk_matches_the_row_by_row_import(self):
+        p = [player.fbref_id for player in self.players]
+        c = [club.fbref_id for club in self.clubs]
+        first = self.write_csv(
+            "first.csv",
+            [
+                (p[0], c[0], {"goals": "5"}),
+                (p[1], c[0], {"goals": "abc"}),
+                (p[2], c[1], {"position": "GK"}),
+                ("nobody", c[0], {}),
+                (p[3], "nowhere", {}),
+                (p[0], c[0], {"goals": "6"}),
+                (p[4], c[1], {"goals": "2"}),
+                (p[5], c[1], {"goals": "3", "minutes": "1,234"}),
+            ],
+        )
+        second = self.write_csv(
+            "second.csv",
+            [
+                (p[0], c[0], {"goals": "6"}),
+                (p[1], c[0], {"goals": "4"}),
+                (p[5], c[1], {"goals": "3", "minutes": "1,234"}),
+                (p[3], c[0], {"assists": ""}),
+                (p[4], c[1], {"goals": "2"}),
+            ],
+        )
+        results = {}
+        for bulk in (False, True):
+            with transaction.atomic():
+                counts = [self.run_import(first, bulk), self.run_import(second, bulk)]
+                results[bulk] = (counts, self.stored())
+                transaction.set_rollback(True)
+
+        self.assertEqual(results[True], results[False])
+        counts, rows = results[False]
+        self.assertEqual(
+            counts,
+            [
+                "Created: 2, Updated: 1, Unchanged: 0",
+                "Created: 2, Updated: 0, Unchanged: 2",
+            ],
+        )
+        self.assertEqual(len(rows), 5)
+
+
+class ListQueryCountTests(SeededTestCase):
+    """List endpoints run as many queries for a page of 1 as for a page of 100."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        league, club = League.objects.first(), Club.objects.first()
+        cls.urls = [reverse(name) for name in LIST_ROUTES]
+        cls.urls += [reverse(name, args=[league.pk]) for name in LEAGUE_ROUTES]
+        cls.urls += [reverse(name, args=[club.pk]) for name in CLUB_ROUTES]
+        cls.club = club
+
+    def count_queries(self, get, limit):
+        clear_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = get({"limit": limit})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), len(response.data["results"])
+
+    def assertConstantQueries(self, get):
+        one, rows = self.count_queries(get, 1)
+        self.assertEqual(rows, 1)
+        many, rows = self.count_queries(get, 100)
+        self.assertGreater(rows, 1)
+        self.assertEqual(one, many)
+
+    def test_query_count_is_constant_in_page_size(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertConstantQueries(lambda params: self.get(url, params))
+
+    def test_club_detail_query_count_is_constant_in_page_size(self):
+        # The router's clubs/<pk>/ shadows the club_detail route, so call the view
+        view = ClubDetailView.as_view()
+
+        def get(params):
+            request = APIRequestFactory().get("/", params, secure=True)
+            force_authenticate(request, user=self.user)
+            return view(request, club_id=self.club.pk)
+
+        self.assertConstantQueries(get)
+
+
+class SparseFieldsTests(SeededTestCase):
+    def get_with_sql(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(reverse("season_player_stats-list"), params)
+        return response, queries[-1]["sql"]
+
+    def test_fields_trims_the_output_and_the_query(self):
+        response, sql = self.get_with_sql({"fields": "player_name,goals,xg"})
+        self.assertEqual(response.status_code, 200)
+        for row in response.data["results"]:
+            self.assertEqual(set(row), {"player_name", "goals", "xg"})
+        self.assertIn("api_player", sql)
+        self.assertNotIn("api_club", sql)
+        self.assertNotIn("minutes_played", sql.split(" FROM ")[0])
+
+    def test_omit_drops_fields_and_joins(self):
+        response, sql = self.get_with_sql({"omit": "club_name,season,league"})
+        self.assertEqual(response.status_code, 200)
+        row = response.data["results"][0]
+        self.assertIn("player_name", row)
+        self.assertFalse({"club_name", "season", "league"} & set(row))
+        self.assertNotIn("api_club", sql)
+        self.assertNotIn("api_season", sql)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.get(reverse("season_player_stats-list"), {"fields": "goalz"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("goalz", response.data["fields"][0])
+
+
+class FastListTests(SeededTestCase):
+    """The values_list() list path renders the same bytes as the serializers."""
+
+    def test_output_matches_the_serializers(self):
+        views = {
+            "club_stats-list": ClubSeasonStatView,
+            "season_player_stats-list": PlayerSeasonStatsView,
+            "goalkeepers-list": GoalkeeperView,
+        }
+        params = [
+            {},
+            {"limit": 100},
+            {"limit": 5, "offset": 5, "ordering": "-season__season"},
+            {"fields": "season,league"},
+            {"omit": "season"},
+        ]
+        for name, view in views.items():
+            for query in params:
+                with self.subTest(route=name, **query):
+                    clear_caches()
+                    fast = self.get(reverse(name), query)
+                    clear_caches()
+                    with mock.patch.object(view, "fast_list", False):
+                        regular = self.get(reverse(name), query)
+                    self.assertEqual(fast.status_code, 200)
+                    self.assertEqual(fast.content, regular.content)
+
+
+class CursorPaginationTests(SeededTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # NULLs and ties in the default ordering
+        ids = list(
+            PlayerSeasonStats.objects.order_by("id").values_list("id", flat=True)
+        )
+        PlayerSeasonStats.objects.filter(id__in=ids[::5]).update(goals=None)
+        PlayerSeasonStats.objects.filter(id__in=ids[1::7]).update(assists=None)
+        PlayerSeasonStats.objects.filter(id__in=ids[2:6]).update(
+            goals=3, assists=3, minutes_played=300
+        )
+        cls.expected = list(
+            PlayerSeasonStats.objects.order_by(
+                F("goals").desc(nulls_last=True),
+                F("assists").desc(nulls_last=True),
+                F("minutes_played").desc(nulls_last=True),
+                "player__full_name",
+                "id",
+            ).values_list("id", flat=True)
+        )
+
+    def walk(self, url):
+        ids, queries = [], set()
+        while url:
+            clear_caches()
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url, secure=True, **self.headers)
+            self.assertEqual(response.status_code, 200)
+            ids += [row["id"] for row in response.data["results"]]
+            queries.add(len(captured))
+            url = response.data["next"]
+        return ids, queries
+
+    def test_pages_follow_the_ordering_without_gaps_or_repeats(self):
+        url = reverse("season_player_stats-list") + "?cursor=&limit=7"
+        for fast in (True, False):
+            with self.subTest(fast_list=fast), mock.patch.object(
+                PlayerSeasonStatsView, "fast_list", fast
+            ):
+                ids, queries = self.walk(url)
+                self.assertEqual(ids, self.expected)
+                # Deep pages cost as many queries as the first one
+                self.assertEqual(len(queries), 1)
+
+    def test_rows_moving_before_the_cursor_do_not_shift_the_next_page(self):
+        url = reverse("season_player_stats-list")
+        first = self.get(url, {"cursor": "", "limit": 5}).data
+        second = self.client.get(first["next"], secure=True, **self.headers).data
+        PlayerSeasonStats.objects.filter(id=self.expected[-1]).update(goals=1000)
+        clear_caches()
+        again = self.client.get(first["next"], secure=True, **self.headers).data
+        self.assertEqual(again["results"], second["results"])
+
+    def test_count_false_skips_the_count(self):
+        url = reverse("season_player_stats-list")
+        for params in ({"cursor": "", "limit": 5}, {"limit": 5, "offset": 5}):
+            with self.subTest(**params), CaptureQueriesContext(connection) as captured:
+                response = self.get(url, {**params, "count": "false"})
+            self.assertNotIn("count", response.data)
+            self.assertIsNotNone(response.data["next"])
+            self.assertFalse(any("COUNT(" in query["sql"] for query in captured))
+
+    def test_invalid_cursor_is_a_404(self):
+        response = self.get(reverse("season_player_stats-list"), {"cursor": "nope"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_values_of_the_wrong_type_are_a_404(self):
+        url = reverse("season_player_stats-list")
+        pagination = StatsPagination()
+        # The keys of ?ordering=-goals are the goals and the id
+        for values in (["abc", 1], [{"a": 1}, 1], [1, "x"], [[1], 1], [1, 2**70]):
+            with self.subTest(values=values):
+                cursor = pagination.encode_cursor(values)
+                response = self.get(url, {"cursor": cursor, "ordering": "-goals"})
+                self.assertEqual(response.status_code, 404)
+
+        cursor = pagination.encode_cursor(["3", "1"])
+        response = self.get(url, {"cursor": cursor, "ordering": "-goals"})
+        self.assertEqual(response.status_code, 200)
+
+
+class CountTests(SeededTestCase):
+    def count_queries(self, params=None):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.get(reverse("season_player_stats-list"), params)
+        self.assertEqual(response.status_code, 200)
+        return response, [q["sql"] for q in captured if "COUNT(" in q["sql"]]
+
+    def test_count_is_cached_until_the_data_changes(self):
+        clear_caches()
+        response, counts = self.count_queries({"league__code": "WSL", "limit": 5})
+        self.assertEqual(len(counts), 1)
+        self.assertTrue(response.data["count_exact"])
+
+        # Paging, ordering and sparse fieldsets count the same rows
+        params = {"league__code": "WSL", "offset": 5, "ordering": "-xg", "fields": "xg"}
+        again, counts = self.count_queries(params)
+        self.assertEqual(counts, [])
+        self.assertEqual(again.data["count"], response.data["count"])
+
+        DataVersion.bump_models(PlayerSeasonStats)
+        _, counts = self.count_queries({"league__code": "WSL"})
+        self.assertEqual(len(counts), 1)
+
+    def test_count_only_joins_what_the_filters_need(self):
+        clear_caches()
+        _, counts = self.count_queries()
+        self.assertNotIn("JOIN", counts[0])
+        clear_caches()
+        _, counts = self.count_queries({"league__code": "WSL"})
+        self.assertIn('"api_league"', counts[0])
+        self.assertNotIn('"api_player"', counts[0])
+
+    @override_settings(COUNT_ESTIMATE_THRESHOLD=1000)
+    def test_large_counts_are_estimated(self):
+        clear_caches()
+        with mock.patch.object(StatsPagination, "estimate_count", return_value=5000):
+            response, counts = self.count_queries()
+        self.assertEqual(counts, [])
+        self.assertEqual(response.data["count"], 5000)
+        self.assertFalse(response.data["count_exact"])
+
+        clear_caches()
+        with mock.patch.object(StatsPagination, "estimate_count", return_value=500):
+            response, counts = self.count_queries()
+        self.assertEqual(len(counts), 1)
+        self.assertTrue(response.data["count_exact"])
+
+
+class ExportTests(SeededTestCase):
+    url = "/api/playerstats/export/"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.stat_ids = list(PlayerSeasonStats.objects.values_list("id", flat=True))
+
+    def export(self, params=None, decode=True):
+        clear_caches()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.get(self.url, params)
+            self.assertTrue(response.streaming)
+            content = b"".join(response.streaming_content)
+        if decode:
+            content = content.decode("utf-8")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any("COUNT(" in query["sql"] for query in captured))
+        return response, content
+
+    def test_csv_has_a_header_and_every_row(self):
+        response, content = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn(
+            'filename="season_player_stats.csv"', response["Content-Disposition"]
+        )
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertIn("player_name", rows[0])
+        self.assertEqual(len(rows) - 1, PlayerSeasonStats.objects.count())
+
+    def test_ndjson_matches_the_list(self):
+        params = {"league__code": "WSL", "fields": "id,player_name,goals,xg"}
+        _, content = self.export({**params, "format": "ndjson"})
+        exported = [json.loads(line) for line in content.splitlines()]
+        listed = self.get(
+            reverse("season_player_stats-list"), {**params, "limit": 1000}
+        ).json()["results"]
+        self.assertEqual(exported, listed)
+        self.assertEqual(
+            len(exported), PlayerSeasonStats.objects.filter(league__code="WSL").count()
+        )
+
+    def test_invalid_filters_are_a_400(self):
+        response = self.get(self.url, {"goals__gte": "many"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.streaming)
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_columnar_formats_mirror_the_model_fields(self):
+        readers = {
+            "arrow": lambda data: pyarrow.ipc.open_stream(data).read_all(),
+            "parquet": lambda data: pyarrow.parquet.read_table(io.BytesIO(data)),
+        }
+        PlayerSeasonStats.objects.filter(id=self.stat_ids[0]).update(goals=None)
+        for name, read in readers.items():
+            with self.subTest(format=name):
+                response, content = self.export({"format": name}, decode=False)
+                table = read(content)
+                self.assertEqual(table.num_rows, len(self.stat_ids))
+                schema = table.schema
+                self.assertEqual(schema.field("goals").type, pyarrow.int32())
+                self.assertTrue(schema.field("goals").nullable)
+                self.assertEqual(schema.field("xg").type, pyarrow.float64())
+                self.assertFalse(schema.field("player_name").nullable)
+                self.assertEqual(table.column("goals").null_count, 1)
+
+                _, content = self.export(
+                    {"format": name, "league__code": "none"}, decode=False
+                )
+                self.assertEqual(read(content).num_rows, 0)
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_columnar_errors_are_json(self):
+        response = self.get(self.url, {"format": "parquet", "goals__gte": "many"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"goals__gte": ["Enter a number."]})
+
+
+class SearchTests(SeededTestCase):
+    url = "/api/search/"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for index, name in enumerate(["Mckerr", "Sam Kerr", "Kerrigan Doe", "Kerr"]):
+            Player.objects.create(full_name=name, fbref_id=f"search{index}")
+
+    def test_names_are_ranked_best_match_first(self):
+        response = self.get(self.url, {"q": "kerr", "type": "player", "limit": 50})
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        names = [row["name"] for row in results]
+        self.assertEqual(names[:2], ["Kerr", "Kerrigan Doe"])
+        self.assertLess(names.index("Sam Kerr"), names.index("Mckerr"))
+        scores = [row["score"] for row in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual({row["type"] for row in results}, {"player"})
+
+    def test_players_and_clubs_are_merged(self):
+        response = self.get(self.url, {"q": "WSL Club", "limit": 3})
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertEqual(response.data["results"][0]["type"], "club")
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({}, {"q": " x "}, {"q": "kerr", "type": "team"}):
+            with self.subTest(**params):
+                self.assertEqual(self.get(self.url, params).status_code, 400)
+
+    def test_list_search_only_matches_text_columns(self):
+        # A number used to match every stat column holding it
+        response = self.get(
+            reverse("season_player_stats-list"), {"search": "1", "limit": 100}
+        )
+        self.assertEqual(response.status_code, 200)
+        for row in response.data["results"]:
+            text = [
+                row[name] for name in ("player_name", "club_name", "league", "season")
+            ]
+            self.assertTrue(any("1" in value for value in text), row)
+
+
+class SlugTests(SeededTestCase):
+    def test_save_keeps_the_slug_in_step(self):
+        player = Player.objects.create(full_name="Mary-Ann  Fox", fbref_id="slug1")
+        self.assertEqual(player.slug, "maryannfox")
+        # update_or_create() saves with update_fields
+        Player.objects.update_or_create(
+            fbref_id="slug1", defaults={"full_name": "Mary Ann Fox-Smith"}
+        )
+        player.refresh_from_db()
+        self.assertEqual(player.slug, "maryannfoxsmith")
+
+        namesake = Player.objects.create(full_name="Mary Ann Fox Smith", fbref_id="S2")
+        self.assertEqual(namesake.slug, "maryannfoxsmiths2")
+
+    def test_pages_resolve_through_unique_lookups(self):
+        stats = PlayerSeasonStats.objects.select_related("player", "club").first()
+        player, club = stats.player, stats.club
+        # value: the unique columns tried before it is found
+        pages = {
+            PlayerSeasonDetailView: (
+                "player_id",
+                Player,
+                {
+                    player.full_name.upper().replace(" ", "-"): 1,
+                    player.fbref_id: 2,
+                    player.pk: 3,
+                },
+                lambda found: found.player_id == player.pk,
+            ),
+            CoreClubSeasonStatView: (
+                "club_name",
+                Club,
+                {club.name.lower(): 1, club.fbref_id: 2, club.pk: 3},
+                lambda found: found.club_id == club.pk,
+            ),
+        }
+        for view_class, (kwarg, model, values, check) in pages.items():
+            table = f'"{model._meta.db_table}"'
+            for value, tried in values.items():
+                with self.subTest(view=view_class.__name__, value=value):
+                    view = view_class(kwargs={kwarg: str(value)})
+                    with CaptureQueriesContext(connection) as captured:
+                        self.assertTrue(check(view.get_object()))
+                    *lookups, stats_query = [query["sql"] for query in captured]
+                    self.assertEqual(len(lookups), tried)
+                    self.assertIn("slug", lookups[0])
+                    for sql in lookups:
+                        self.assertIn(table, sql)
+                        self.assertNotIn("JOIN", sql)
+                    self.assertNotIn(table, stats_query)
+
+            view = view_class(kwargs={kwarg: "Nobody"})
+            with self.assertRaises(Http404):
+                view.get_object()
+
+    def test_namesakes_link_to_their_own_pages(self):
+        stat = PlayerSeasonStats.objects.select_related("player", "club").first()
+        namesake = Player.objects.create(
+            full_name=stat.player.full_name, fbref_id="Twin1"
+        )
+        stat.pk, stat.player, stat.goals = None, namesake, 999
+        stat.save()
+        self.assertNotEqual(namesake.slug, name_slug(namesake.full_name))
+
+        clear_caches()
+        page = self.client.get(
+            reverse("club_stats_by_club", args=[stat.club.slug]), secure=True
+        )
+        self.assertContains(page, reverse("player_detail", args=[namesake.slug]))
+        view = PlayerSeasonDetailView(kwargs={"player_id": namesake.slug})
+        self.assertEqual(view.get_object().player_id, namesake.pk)
+
+        response = self.get(reverse("all_players-detail", args=[namesake.pk]))
+        self.assertEqual(response.data["slug"], namesake.slug)
+
+
+class DerivedMetricTests(SeededTestCase):
+    def test_columns_follow_the_stats(self):
+        stats = PlayerSeasonStats.objects.first()
+        PlayerSeasonStats.objects.filter(pk=stats.pk).update(
+            goals=6, assists=3, xg=4.5, minutes_played=900, tackles=0
+        )
+        stats.refresh_from_db()
+        self.assertEqual(stats.GA, 9)
+        self.assertAlmostEqual(stats.goals_per90, 0.6)
+        self.assertAlmostEqual(stats.xg_per90, 0.45)
+        self.assertIsNone(stats.tackles_won_pct)
+
+        PlayerSeasonStats.objects.filter(pk=stats.pk).update(minutes_played=0)
+        stats.refresh_from_db()
+        self.assertIsNone(stats.xg_per90)
+
+        club = ClubSeasonStat.objects.first()
+        self.assertEqual(club.goal_diff, club.goals_scored - club.goals_conceded)
+
+    def test_filter_and_order_through_the_api(self):
+        response = self.get(
+            reverse("season_player_stats-list"),
+            {"minutes_played__gte": 900, "ordering": "-xg_per90", "limit": 100},
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = response.data["results"]
+        self.assertTrue(rows)
+        self.assertTrue(all(row["minutes_played"] >= 900 for row in rows))
+        values = [row["xg_per90"] for row in rows]
+        self.assertEqual(values, sorted(values, reverse=True))
+        self.assertAlmostEqual(
+            values[0], rows[0]["xg"] * 90 / rows[0]["minutes_played"]
+        )
+
+        response = self.get(reverse("club_stats-list"), {"goal_diff__gte": 0})
+        self.assertTrue(all(row["goal_diff"] >= 0 for row in response.data["results"]))
+
+    def test_top_per90_reads_the_index(self):
+        plan = (
+            PlayerSeasonStats.objects.filter(minutes_played__gte=900)
+            .order_by("-xg_per90")[:50]
+            .explain()
+        )
+        self.assertIn("api_players_xg_per9_812646_idx", plan)
+
+
+class PercentileTests(SeededTestCase):
+    def setUp(self):
+        clear_caches()
+        self.stat = PlayerSeasonStats.objects.select_related("season", "league").first()
+        self.url = reverse("all_players-percentiles", args=[self.stat.player_id])
+        self.season = self.stat.season.season
+
+    def peers(self, **filters):
+        return PlayerSeasonStats.objects.filter(season__season=self.season, **filters)
+
+    def expected(self, peers, metric):
+        value = getattr(self.stat, metric)
+        values = list(peers.values_list(metric, flat=True))
+        below = sum(v < value for v in values)
+        equal = sum(v == value for v in values)
+        return round(100 * (below + equal / 2) / len(values), 1)
+
+    def test_ranks_match_a_scan_of_the_peers(self):
+        position = self.stat.position.split(",")[0]
+        groups = [
+            ({}, self.peers(league=self.stat.league)),
+            ({"position": position}, self.peers(league=self.stat.league)),
+            ({"peer": "top5"}, self.peers(league__code__in=EUROPE_LEAGUES)),
+        ]
+        for params, peers in groups:
+            if "position" in params:
+                peers = peers.filter(position__contains=position)
+            with self.subTest(**params):
+                response = self.get(self.url, {"season": self.season, **params})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data["peers"], peers.count())
+                for metric in ("goals", "xg", "xg_per90", "GA"):
+                    self.assertEqual(
+                        response.data["percentiles"][metric]["percentile"],
+                        self.expected(peers, metric),
+                    )
+
+    def test_distributions_are_reused_until_the_data_changes(self):
+        with mock.patch.object(
+            distributions, "build", wraps=distributions.build
+        ) as build:
+            self.get(self.url)
+            self.get(self.url, {"position": "MF"})
+            self.assertEqual(build.call_count, 1)
+
+            PlayerSeasonStats.objects.filter(league=self.stat.league).update(goals=0)
+            self.stat.goals = 100
+            self.stat.save()
+            response = self.get(self.url, {"season": self.season})
+            self.assertEqual(build.call_count, 2)
+        self.assertGreater(response.data["percentiles"]["goals"]["percentile"], 90)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get(self.url, {"peer": "world"}).status_code, 400)
+        self.assertEqual(self.get(self.url, {"season": "1900/1901"}).status_code, 404)
+
+
+class SimilarTests(SeededTestCase):
+    def setUp(self):
+        clear_caches()
+        self.stat = (
+            PlayerSeasonStats.objects.select_related("season")
+            .filter(minutes_played__gte=MIN_MINUTES)
+            .first()
+        )
+        self.url = reverse("all_players-similar", args=[self.stat.player_id])
+        self.params = {"season": self.stat.season.season}
+
+    def make_twin(self):
+        """Another regular of the season given the same per 90 profile."""
+        twin = (
+            PlayerSeasonStats.objects.filter(season=self.stat.season)
+            .exclude(player=self.stat.player)
+            .first()
+        )
+        for name in FEATURES:
+            value = getattr(self.stat, name)
+            setattr(twin, name, None if value is None else value * 2)
+        twin.minutes_played = self.stat.minutes_played * 2
+        twin.save()
+        return twin
+
+    def test_nearest_regulars_best_first(self):
+        self.get(self.url, self.params)
+        twin = self.make_twin()
+        for method, best in (("cosine", 1.0), ("zscore", 0.0)):
+            with self.subTest(method=method):
+                response = self.get(self.url, {**self.params, "method": method, "k": 5})
+                self.assertEqual(response.status_code, 200)
+                results = response.data["results"]
+                self.assertEqual(len(results), 5)
+                self.assertEqual(results[0]["player_id"], twin.player_id)
+                self.assertAlmostEqual(results[0]["score"], best, places=3)
+                scores = [row["score"] for row in results]
+                self.assertEqual(scores, sorted(scores, reverse=method == "cosine"))
+                for row in results:
+                    self.assertNotEqual(row["player_id"], self.stat.player_id)
+                    self.assertGreaterEqual(row["minutes_played"], MIN_MINUTES)
+
+        response = self.get(self.url, {**self.params, "peer": "league"})
+        self.assertEqual(
+            {row["league"] for row in response.data["results"]},
+            {response.data["league"]},
+        )
+
+    def test_invalid_parameters(self):
+        for params in ({"method": "manhattan"}, {"peer": "world"}):
+            with self.subTest(**params):
+                self.assertEqual(self.get(self.url, params).status_code, 400)
+        PlayerSeasonStats.objects.filter(pk=self.stat.pk).update(minutes_played=0)
+        self.assertEqual(self.get(self.url, self.params).status_code, 400)
+
+
+class SnapshotTests(SeededTestCase):
+    """The nested lists and the top 5 leagues tables read from memory."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        league, club = League.objects.first(), Club.objects.first()
+        cls.league = league
+        cls.urls = [reverse(name, args=[league.pk]) for name in LEAGUE_ROUTES[1:]]
+        cls.urls += [reverse(name, args=[club.pk]) for name in CLUB_ROUTES]
+        cls.season = PlayerSeasonStats.objects.first().season.season
+
+    def setUp(self):
+        clear_caches()
+
+    def test_output_matches_the_database(self):
+        params = [
+            {},
+            {"limit": 5, "offset": 3, "ordering": "-id"},
+            {"limit": 4, "count": "false", "ordering": "-season__season,club__name"},
+            {"fields": "season,league", "season__season": self.season},
+            {"omit": "season"},
+        ]
+        for url in self.urls:
+            view = resolve(url).func.view_class
+            for query in params:
+                with self.subTest(url=url, **query):
+                    snapshot = self.get(url, query)
+                    with mock.patch.object(view, "use_snapshot", False):
+                        regular = self.get(url, query)
+                    self.assertEqual(snapshot.status_code, 200)
+                    self.assertEqual(snapshot.content, regular.content)
+
+    def test_strings_and_ties_sort_like_the_database(self):
+        stats = PlayerSeasonStats.objects.filter(league=self.league)
+        names = ["Élise Abadie", "van Dijk", "Emma Zed", "eve Adams", "Zoë Ünal"]
+        for stat, name in zip(stats.select_related("player"), names * len(stats)):
+            stat.player.full_name = name
+            stat.player.save()
+        stats.update(goals=1)
+
+        url = reverse("league_players", args=[self.league.pk])
+        pages = [
+            {"limit": 3, "offset": offset, "ordering": ordering}
+            for offset in (0, 3, 6)
+            for ordering in ("", "-goals", "club__name,-player__full_name")
+        ]
+        for query in pages:
+            with self.subTest(**query):
+                snapshot = self.get(url, query)
+                with mock.patch.object(LeaguePlayerView, "use_snapshot", False):
+                    regular = self.get(url, query)
+                self.assertEqual(snapshot.status_code, 200)
+                self.assertEqual(snapshot.content, regular.content)
+
+    def test_stats_tables_are_not_read(self):
+        url = reverse("league_players", args=[self.league.pk])
+        self.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(url, {"ordering": "-goals"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            [query for query in queries if "api_playerseasonstats" in query["sql"]]
+        )
+        self.assertEqual(
+            self.get(url.replace(str(self.league.pk), "0")).status_code, 404
+        )
+
+    def test_replaced_after_a_write(self):
+        url = reverse("league_players", args=[self.league.pk])
+        self.get(url)
+        old = get_snapshots()
+        stat = PlayerSeasonStats.objects.filter(league=self.league).first()
+        stat.player.full_name = "Aaa Renamed"
+        stat.player.save()
+
+        response = self.get(url, {"limit": 1})
+        self.assertEqual(response.data["results"][0]["player_name"], "Aaa Renamed")
+        # Any season can hold the player, so every season is read again
+        for new, before in zip(get_snapshots(), old, strict=True):
+            self.assertIsNot(new, before)
+        # The old copy is left as it was for the requests still reading it
+        before = next(each for each in old if stat.player_id in each.players)
+        self.assertNotEqual(before.players[stat.player_id].full_name, "Aaa Renamed")
+
+    def test_a_stats_write_reads_only_its_season_again(self):
+        first, second = get_snapshots()
+        for snapshot in (first, second):
+            stats = PlayerSeasonStats.objects.filter(season__season=snapshot.season)
+            self.assertEqual(
+                set(snapshot.tables[PlayerSeasonStats]),
+                set(stats.values_list("pk", flat=True)),
+            )
+            self.assertEqual(
+                set(snapshot.players),
+                set(stats.values_list("player_id", flat=True))
+                | set(
+                    Goalkeeper.objects.filter(
+                        season__season=snapshot.season
+                    ).values_list("player_id", flat=True)
+                ),
+            )
+
+        stat = PlayerSeasonStats.objects.filter(season__season=second.season).first()
+        stat.goals = 99
+        stat.save()
+        kept, replaced = get_snapshots()
+        self.assertIs(kept, first)
+        self.assertIsNot(replaced, second)
+        self.assertEqual(replaced.tables[PlayerSeasonStats][stat.pk].goals, 99)
+
+        # A row moved to another season leaves both read again
+        target = Season.objects.get(season=first.season, league=stat.league)
+        PlayerSeasonStats.objects.filter(
+            season=target, player=stat.player, club=stat.club
+        ).delete()
+        first, second = get_snapshots()
+        stat.season = target
+        stat.save()
+        moved_to, moved_from = get_snapshots()
+        self.assertIsNot(moved_to, first)
+        self.assertIsNot(moved_from, second)
+        self.assertIn(stat.pk, moved_to.tables[PlayerSeasonStats])
+        self.assertNotIn(stat.pk, moved_from.tables[PlayerSeasonStats])
+
+    def test_europe_tables(self):
+        tables = europe_tables(self.season)
+        for metric in ("goals", "xg"):
+            with self.subTest(metric=metric):
+                expected = (
+                    PlayerSeasonStats.objects.filter(
+                        season__season=self.season, league__code__in=EUROPE_LEAGUES
+                    )
+                    .top_n_per(partition="season__season", metric=f"-{metric}")
+                    .values_list("id", flat=True)
+                )
+                rows = tables[f"player_{metric}"][self.season]
+                self.assertEqual([obj.pk for obj in rows], list(expected))
+                self.assertTrue(all(obj.player.full_name for obj in rows))
+
+        response = self.client.get(
+            reverse(
+                "europe_top5_leagues",
+                kwargs={"season_season": self.season.replace("/", "-")},
+            ),
+            secure=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, tables["player_goals"][self.season][0].club.name)
+
+
+class IndexAdvisorTests(SeededTestCase):
+    tables = {"api_playerseasonstats", "api_goalkeeper"}
+
+    def query(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        return Query("test", sql, params, 0.001)
+
+    def test_access_pattern(self):
+        stats = PlayerSeasonStats.objects.all()
+        pattern = access_pattern(
+            self.query(
+                stats.filter(
+                    league__code="WSL", season__season="2023/2024", goals__gte=5
+                )
+                .select_related("player")
+                .order_by("-xg", "player__full_name")[:50]
+            ).sql,
+            self.tables,
+        )
+        self.assertEqual(pattern.table, "api_playerseasonstats")
+        self.assertEqual(pattern.equal, {"league_id", "season_id"})
+        self.assertEqual(pattern.order, (("xg", True),))
+        self.assertEqual(pattern.ranges, {"goals"})
+
+        pk = self.query(stats.filter(pk=1)).sql
+        whole_table = self.query(stats.order_by("-goals")).sql
+        self.assertIsNone(access_pattern(pk, self.tables))
+        self.assertIsNone(access_pattern(whole_table, self.tables))
+
+    @mock.patch("api.index_advisor.MIN_ROWS", 0)
+    def test_propose(self):
+        stats = PlayerSeasonStats.objects.all()
+        club = stats.filter(club_id=1).order_by("-goals", "-assists")[:10]
+        league_season = stats.filter(league_id=1, season_id=1)
+        proposals = propose(
+            [
+                self.query(club),
+                self.query(league_season.order_by("-goals")[:10]),
+                self.query(league_season.order_by("-goals")[:20]),
+                self.query(league_season),
+                self.query(stats.filter(season_id=1, club_id=1)),
+            ]
+        )
+        new = [p for p in proposals if p.existing is None]
+        self.assertEqual(
+            [(p.describe(), p.queries) for p in new],
+            [
+                ("season_id, league_id, goals DESC", 3),
+                ("season_id, club_id", 1),
+            ],
+        )
+        self.assertEqual(
+            new[0].index(PlayerSeasonStats).fields, ["season", "league", "-goals"]
+        )
+        # The club's leaderboard is the shipped composite index
+        covered = [p for p in proposals if p.existing is not None]
+        self.assertEqual(covered[0].existing, "api_players_club_id_a4f29e_idx")
@@ -48,6 +48,12 @@ urlpatterns = [
         ClubGoalkeeperView.as_view(),
         name="club_goalkeepers",
     ),
-    path("documentation/", HomeView.as_view(), name="documentation_view"),
     #  Returns all goalkeepers (with stats) that belong to a specific club (by club_id)
+    path("search/", SearchView.as_view(), name="search"),
+    #  Players and clubs by name, best match first (?q=, ?type=, ?limit=)
+    path("documentation/", HomeView.as_view(), name="documentation_view"),
+    path(
+        "cache-stats/", ResponseCacheStatsView.as_view(), name="response_cache_stats"
+    ),
+    #  Hit/miss counters of the list response caches (admin only)
 ]
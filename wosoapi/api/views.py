@@ -4,17 +4,78 @@ from rest_framework.viewsets import ModelViewSet
 from api.serializers import *
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from api.permissions import IsSuperUserOrReadOnly
+from api.pagination import StatsPagination
+from api.filtersets import StatsFilterBackend
+from api.search import SEARCH_TYPES, search
+from api.percentiles import PEERS, LEAGUE, player_percentiles
+from api.similarity import ALL, COSINE, METHODS, similar_players
+from api.similarity import PEERS as SIMILAR_PEERS
+from api.mixins import (
+    ConditionalGetMixin,
+    ExportMixin,
+    FastListMixin,
+    ResponseCacheMixin,
+    SelectRelatedMixin,
+    SnapshotListMixin,
+    SparseFieldsMixin,
+    response_caches,
+)
+from django.db.models import F
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import filters, DjangoFilterBackend
 from rest_framework import filters
 from django.views.generic import TemplateView
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 
 class HomeView(TemplateView):
     template_name = "api/documentation.html"
 
 
-class CountryView(ModelViewSet):
+class ResponseCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        return Response(
+            {name: cache.stats() for name, cache in sorted(response_caches.items())}
+        )
+
+
+class SearchView(APIView):
+    """Players and clubs by name, best match first (see ``api.search``).
+
+    ``?q=`` is the name to look for, ``?type=player,club`` narrows the
+    search and ``?limit=`` caps the results (10 by default, at most 50).
+    """
+
+    authentication_classes = [JWTAuthentication]
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request):
+        q = request.query_params.get("q", "").strip()
+        if len(q) < 2:
+            raise ValidationError({"q": ["Search for at least 2 characters."]})
+        types = [t for t in request.query_params.get("type", "").split(",") if t]
+        unknown = [t for t in types if t not in SEARCH_TYPES]
+        if unknown:
+            raise ValidationError({"type": [f"Unknown type(s): {', '.join(unknown)}"]})
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        limit = min(max(limit, 1), self.max_limit)
+        return Response(
+            {"q": q, "results": search(q, types or list(SEARCH_TYPES), limit)}
+        )
+
+
+class CountryView(ConditionalGetMixin, SelectRelatedMixin, ModelViewSet):
     permission_classes = [IsSuperUserOrReadOnly]
     serializer_class = CountrySerializer
     queryset = Country.objects.all()
@@ -26,7 +87,7 @@ class CountryView(ModelViewSet):
     ]
 
     ordering_fields = ["id", "name", "code"]
-    search_fields = ["id", "name", "code"]
+    search_fields = ["name", "code"]
     ordering = ["name"]
     filterset_fields = {
         "id": ["exact"],
@@ -35,10 +96,10 @@ class CountryView(ModelViewSet):
     }
 
 
-class LeagueView(ModelViewSet):
+class LeagueView(ConditionalGetMixin, SelectRelatedMixin, ModelViewSet):
     permission_classes = [IsSuperUserOrReadOnly]
     serializer_class = LeagueSerializer
-    queryset = League.objects.select_related("country").all()
+    queryset = League.objects.all()
     authentication_classes = [JWTAuthentication]
     filter_backends = [
         filters.OrderingFilter,
@@ -47,7 +108,7 @@ class LeagueView(ModelViewSet):
     ]
 
     ordering_fields = ["id", "name", "country__name", "code", "total_clubs"]
-    search_fields = ["id", "name", "country__name", "code", "total_clubs"]
+    search_fields = ["name", "country__name", "code"]
     ordering = ["name"]
     filterset_fields = {
         "id": ["exact"],
@@ -58,10 +119,10 @@ class LeagueView(ModelViewSet):
     }
 
 
-class SeasonView(ModelViewSet):
+class SeasonView(ConditionalGetMixin, SelectRelatedMixin, ModelViewSet):
     permission_classes = [IsSuperUserOrReadOnly]
     authentication_classes = [JWTAuthentication]
-    queryset = Season.objects.select_related("league").all()
+    queryset = Season.objects.all()
     serializer_class = SeasonSerializer
 
     filter_backends = [
@@ -71,7 +132,7 @@ class SeasonView(ModelViewSet):
     ]
 
     ordering_fields = ["id", "season", "league__name"]
-    search_fields = ["id", "season", "league__name"]
+    search_fields = ["season", "league__name"]
     ordering = ["season", "league__name"]
     filterset_fields = {
         "id": ["exact"],
@@ -80,7 +141,7 @@ class SeasonView(ModelViewSet):
     }
 
 
-class Clubview(ModelViewSet):
+class Clubview(ConditionalGetMixin, SelectRelatedMixin, ModelViewSet):
     permission_classes = [IsSuperUserOrReadOnly]
     authentication_classes = [JWTAuthentication]
     serializer_class = ClubSerializer
@@ -92,7 +153,7 @@ class Clubview(ModelViewSet):
     ]
 
     ordering_fields = ["id", "name", "fbref_id", "stadium"]
-    search_fields = ["id", "name", "fbref_id", "stadium"]
+    search_fields = ["name", "fbref_id", "stadium"]
     ordering = ["name", "fbref_id"]
     filterset_fields = {
         "id": ["exact"],
@@ -102,15 +163,24 @@ class Clubview(ModelViewSet):
     }
 
 
-class ClubSeasonStatView(ModelViewSet):
+class ClubSeasonStatView(
+    ConditionalGetMixin,
+    SparseFieldsMixin,
+    ResponseCacheMixin,
+    FastListMixin,
+    ExportMixin,
+    ModelViewSet,
+):
     permission_classes = [IsSuperUserOrReadOnly]
+    pagination_class = StatsPagination
+    response_cache_size = 256
     authentication_classes = [JWTAuthentication]
-    queryset = ClubSeasonStat.objects.select_related("club", "season", "league").all()
+    queryset = ClubSeasonStat.objects.all()
     serializer_class = ClubSeasonStatSerializer
     filter_backends = [
         filters.OrderingFilter,
         filters.SearchFilter,
-        DjangoFilterBackend,
+        StatsFilterBackend,
     ]
 
     ordering_fields = [
@@ -134,29 +204,10 @@ class ClubSeasonStatView(ModelViewSet):
         "comp_passes_allowed",
         "passes_to_final_third_allowed",
         "passes_to_pen_area_allowed",
+        "goal_diff",
+        "xg_diff",
     ]
-    search_fields = [
-        "id",
-        "club__name",
-        "season__season",
-        "league__name",
-        "points_won",
-        "league_position",
-        "matches_played",
-        "win",
-        "draw",
-        "lost",
-        "goals_scored",
-        "goals_conceded",
-        "xg_created",
-        "xg_conceded",
-        "shots_allowed",
-        "shots_target_allowed",
-        "attempted_passes_against",
-        "comp_passes_allowed",
-        "passes_to_final_third_allowed",
-        "passes_to_pen_area_allowed",
-    ]
+    search_fields = ["club__name", "season__season", "league__name"]
     ordering = ["league_position"]
     filterset_fields = {
         "id": ["exact"],
@@ -179,10 +230,12 @@ class ClubSeasonStatView(ModelViewSet):
         "comp_passes_allowed": ["exact", "gte", "lte", "range"],
         "passes_to_final_third_allowed": ["exact", "gte", "lte", "range"],
         "passes_to_pen_area_allowed": ["exact", "gte", "lte", "range"],
+        "goal_diff": ["exact", "gte", "lte", "range"],
+        "xg_diff": ["exact", "gte", "lte", "range"],
     }
 
 
-class PlayerView(ModelViewSet):
+class PlayerView(ConditionalGetMixin, SelectRelatedMixin, ModelViewSet):
     permission_classes = [IsSuperUserOrReadOnly]
     authentication_classes = [JWTAuthentication]
     queryset = Player.objects.all()
@@ -194,7 +247,7 @@ class PlayerView(ModelViewSet):
     ]
 
     ordering_fields = ["id", "full_name", "fbref_id", "nationality", "age"]
-    search_fields = ["id", "full_name", "fbref_id", "nationality", "age"]
+    search_fields = ["full_name", "fbref_id", "nationality"]
     ordering = ["full_name"]
     filterset_fields = {
         "id": ["exact"],
@@ -204,18 +257,92 @@ class PlayerView(ModelViewSet):
         "age": ["exact", "gte", "lte", "range"],
     }
 
+    similar_k = 10
+    max_similar_k = 50
+
+    def get_season_stat(self, request):
+        """The ``?season=`` (the latest by default) stats of the player.
+
+        A season at several clubs is the one with most minutes.
+        """
+        player = self.get_object()
+        stats = PlayerSeasonStats.objects.select_related(
+            "player", "season", "league", "club"
+        ).filter(player=player)
+        season = request.query_params.get("season")
+        if season:
+            stats = stats.filter(season__season=season.replace("-", "/"))
+        stat = stats.order_by(
+            "-season__season", F("minutes_played").desc(nulls_last=True)
+        ).first()
+        if stat is None:
+            raise NotFound(f"No season stats for {player.full_name}.")
+        return stat
+
+    @action(detail=True, url_path="percentiles")
+    def percentiles(self, request, pk=None):
+        """Percentile ranks of one of the player's seasons among their peers.
+
+        ``?season=`` picks the season, ``?peer=`` compares with the
+        player's ``league`` or the ``top5`` leagues and ``?position=``
+        (``MF``, ...) only with the players of a position.
+        """
+        peer = request.query_params.get("peer", LEAGUE)
+        if peer not in PEERS:
+            raise ValidationError({"peer": [f"Use one of: {', '.join(PEERS)}."]})
+        position = request.query_params.get("position", "").strip().upper()
+        stat = self.get_season_stat(request)
+        return Response(player_percentiles(stat, peer, position))
+
+    @action(detail=True, url_path="similar")
+    def similar(self, request, pk=None):
+        """The ``?k=`` players whose season per 90 profile is closest.
+
+        ``?season=`` picks the season, ``?method=`` is ``cosine`` or
+        ``zscore`` (distance) and ``?peer=`` searches ``all`` leagues, the
+        player's ``league`` or the ``top5`` leagues.
+        """
+        params = request.query_params
+        method = params.get("method", COSINE)
+        if method not in METHODS:
+            raise ValidationError({"method": [f"Use one of: {', '.join(METHODS)}."]})
+        peer = params.get("peer", ALL)
+        if peer not in SIMILAR_PEERS:
+            raise ValidationError(
+                {"peer": [f"Use one of: {', '.join(SIMILAR_PEERS)}."]}
+            )
+        try:
+            k = int(params.get("k", self.similar_k))
+        except ValueError:
+            k = self.similar_k
+        k = min(max(k, 1), self.max_similar_k)
+        stat = self.get_season_stat(request)
+        data = similar_players(stat, k, method, peer)
+        if data is None:
+            raise ValidationError(
+                {"season": [f"{stat.player.full_name} didn't play in {stat.season.season}."]}
+            )
+        return Response(data)
 
-class PlayerSeasonStatsView(ModelViewSet):
+
+class PlayerSeasonStatsView(
+    ConditionalGetMixin,
+    SparseFieldsMixin,
+    ResponseCacheMixin,
+    FastListMixin,
+    ExportMixin,
+    ModelViewSet,
+):
     permission_classes = [IsSuperUserOrReadOnly]
+    pagination_class = StatsPagination
+    response_cache_size = 256
     authentication_classes = [JWTAuthentication]
-    queryset = PlayerSeasonStats.objects.select_related(
-        "player", "club", "league", "season"
-    ).all()
+    queryset = PlayerSeasonStats.objects.all()
     serializer_class = PlayerSeasonStatsSerializer
     filter_backends = [
         filters.OrderingFilter,
         filters.SearchFilter,
-        DjangoFilterBackend,
+        StatsFilterBackend,
     ]
 
     ordering_fields = [
@@ -263,59 +390,26 @@ class PlayerSeasonStatsView(ModelViewSet):
         "dispossessed",
         "miscontrols",
         "take_ons",
-        "take_ons_won", "carries_to_final_3rd",
+        "take_ons_won",
+        "carries_to_final_3rd",
         "carries_to_pen_area",
         "yellow_card",
         "red_card",
+        "GA",
+        "goals_per90",
+        "xg_per90",
+        "npxg_per90",
+        "sca_per90",
+        "tackles_won_pct",
+        "take_ons_won_pct",
     ]
     search_fields = [
-        "id",
-        "fouls_committed",
-        "fouls_won",
         "player__full_name",
         "club__name",
         "league__code",
-        "league__name" ,"season__season",
+        "league__name",
+        "season__season",
         "position",
-        "age",
-        "matches_played",
-        "minutes_played",
-        "matches_completed",
-        "matches_substituted",
-        "unused_sub",
-        "goals",
-        "assists",
-        "xg",
-        "npxg",
-        "xg_performance",
-        "npxg_performance",
-        "prog_carries",
-        "prog_carries_final_3rd",
-        "prog_passes",
-        "shots_target",
-        "passes_to_final_3rd",
-        "passes_to_pen_area",
-        "pass_switches",
-        "through_ball",
-        "shots_creation_action",
-        "offsides",
-        "pen_won",
-        "pen_conceded",
-        "tackles",
-        "tackles_won",
-        "interceptions",
-        "ball_recoveries",
-        "aerial_duels_won",
-        "aerial_duels_lost",
-        "blocks",
-        "touches",
-        "dispossessed",
-        "miscontrols",
-        "take_ons",
-        "take_ons_won" "carries_to_final_3rd",
-        "carries_to_pen_area",
-        "yellow_card",
-        "red_card",
     ]
     ordering = ["-goals", "-assists", "-minutes_played", "player__full_name"]
     filterset_fields = {
@@ -368,20 +462,34 @@ class PlayerSeasonStatsView(ModelViewSet):
         "carries_to_pen_area": ["exact", "gte", "lte", "range"],
         "yellow_card": ["exact", "gte", "lte", "range"],
         "red_card": ["exact", "gte", "lte", "range"],
+        "GA": ["exact", "gte", "lte", "range"],
+        "goals_per90": ["exact", "gte", "lte", "range"],
+        "xg_per90": ["exact", "gte", "lte", "range"],
+        "npxg_per90": ["exact", "gte", "lte", "range"],
+        "sca_per90": ["exact", "gte", "lte", "range"],
+        "tackles_won_pct": ["exact", "gte", "lte", "range"],
+        "take_ons_won_pct": ["exact", "gte", "lte", "range"],
     }
 
 
-class GoalkeeperView(ModelViewSet):
+class GoalkeeperView(
+    ConditionalGetMixin,
+    SparseFieldsMixin,
+    ResponseCacheMixin,
+    FastListMixin,
+    ExportMixin,
+    ModelViewSet,
+):
     permission_classes = [IsSuperUserOrReadOnly]
+    pagination_class = StatsPagination
+    response_cache_size = 256
     authentication_classes = [JWTAuthentication]
-    queryset = Goalkeeper.objects.select_related(
-        "player", "club", "league", "season"
-    ).all()
+    queryset = Goalkeeper.objects.all()
     serializer_class = GoalkeeperSerializer
     filter_backends = [
         filters.OrderingFilter,
         filters.SearchFilter,
-        DjangoFilterBackend,
+        StatsFilterBackend,
     ]
 
     ordering_fields = [
@@ -405,6 +513,8 @@ class GoalkeeperView(ModelViewSet):
         "crosses_stopped",
         "sweeper_action",
         "sweeper_action_per90",
+        "goals_conceded_per90",
+        "psxg_per90",
     ]
     search_fields = [
         "player__full_name",
@@ -412,21 +522,6 @@ class GoalkeeperView(ModelViewSet):
         "league__code",
         "league__name",
         "season__season",
-        "age",
-        "matches_played",
-        "minutes_played",
-        "goals_conceded",
-        "shots_faced",
-        "saves",
-        "save_percentage",
-        "clean_sheets",
-        "psxg",
-        "psxg_performance",
-        "pen_saved",
-        "passes",
-        "crosses_stopped",
-        "sweeper_action",
-        "sweeper_action_per90",
     ]
     ordering = [
         "matches_played",
@@ -455,10 +550,12 @@ class GoalkeeperView(ModelViewSet):
         "crosses_stopped": ["exact", "gte", "lte", "range"],
         "sweeper_action": ["exact", "gte", "lte", "range"],
         "sweeper_action_per90": ["exact", "gte", "lte", "range"],
+        "goals_conceded_per90": ["exact", "gte", "lte", "range"],
+        "psxg_per90": ["exact", "gte", "lte", "range"],
     }
 
 
-class LeagueSeasonView(ListAPIView):
+class LeagueSeasonView(ConditionalGetMixin, SelectRelatedMixin, ListAPIView):
     permission_classes = [IsSuperUserOrReadOnly]
     authentication_classes = [JWTAuthentication]
     serializer_class = SeasonSerializer
@@ -469,7 +566,7 @@ class LeagueSeasonView(ListAPIView):
     ]
 
     ordering_fields = ["id", "season", "league__name"]
-    search_fields = ["id", "season", "league__name"]
+    search_fields = ["season", "league__name"]
     ordering = ["season", "league__name"]
     filterset_fields = {
         "id": ["exact"],
@@ -480,13 +577,19 @@ class LeagueSeasonView(ListAPIView):
     def get_queryset(self):
         league_id = self.kwargs.get("league_id")
         get_object_or_404(League, pk=league_id)
-        queryset = Season.objects.select_related("league").filter(league_id=league_id)
+        queryset = Season.objects.filter(league_id=league_id)
         return queryset
 
 
-class LeagueClubView(ListAPIView):
+class LeagueClubView(
+    ConditionalGetMixin,
+    SnapshotListMixin,
+    SparseFieldsMixin,
+    ListAPIView,
+):
     permission_classes = [IsSuperUserOrReadOnly]
     authentication_classes = [JWTAuthentication]
+    snapshot_scope = "league_id"
     serializer_class = ClubSeasonStatSerializer
     filter_backends = [
         filters.OrderingFilter,
@@ -495,7 +598,7 @@ class LeagueClubView(ListAPIView):
     ]
 
     ordering_fields = ["id", "club__name", "club__fbref_id", "league__name"]
-    search_fields = ["id", "club__name", "club__fbref_id", "league__name"]
+    search_fields = ["club__name", "club__fbref_id", "league__name"]
     ordering = ["club__name", "club__fbref_id"]
     filterset_fields = {
         "id": ["exact"],
@@ -507,20 +610,24 @@ class LeagueClubView(ListAPIView):
     def get_queryset(self):
         league_id = self.kwargs.get("league_id")
         get_object_or_404(League, pk=league_id)
-        queryset = ClubSeasonStat.objects.select_related(
-            "club", "league", "season"
-        ).filter(league_id=league_id)
+        queryset = ClubSeasonStat.objects.filter(league_id=league_id)
         return queryset
 
 
-class LeaguePlayerView(ListAPIView):
+class LeaguePlayerView(
+    ConditionalGetMixin,
+    SnapshotListMixin,
+    SparseFieldsMixin,
+    ListAPIView,
+):
     permission_classes = [IsSuperUserOrReadOnly]
     authentication_classes = [JWTAuthentication]
+    snapshot_scope = "league_id"
     serializer_class = PlayerSeasonStatsSerializer
     filter_backends = [
         filters.OrderingFilter,
         filters.SearchFilter,
-        DjangoFilterBackend,
+        StatsFilterBackend,
     ]
 
     ordering_fields = [
@@ -568,60 +675,26 @@ class LeaguePlayerView(ListAPIView):
         "dispossessed",
         "miscontrols",
         "take_ons",
-        "take_ons_won" "carries_to_final_3rd",
+        "take_ons_won",
+        "carries_to_final_3rd",
         "carries_to_pen_area",
         "yellow_card",
         "red_card",
+        "GA",
+        "goals_per90",
+        "xg_per90",
+        "npxg_per90",
+        "sca_per90",
+        "tackles_won_pct",
+        "take_ons_won_pct",
     ]
     search_fields = [
-        "id",
-        "fouls_committed",
-        "fouls_won",
         "player__full_name",
         "club__name",
         "league__code",
         "league__name",
         "season__season",
         "position",
-        "age",
-        "matches_played",
-        "minutes_played",
-        "matches_completed",
-        "matches_substituted",
-        "unused_sub",
-        "goals",
-        "assists",
-        "xg",
-        "npxg",
-        "xg_performance",
-        "npxg_performance",
-        "prog_carries",
-        "prog_carries_final_3rd",
-        "prog_passes",
-        "shots_target",
-        "passes_to_final_3rd",
-        "passes_to_pen_area",
-        "pass_switches",
-        "through_ball",
-        "shots_creation_action",
-        "offsides",
-        "pen_won",
-        "pen_conceded",
-        "tackles",
-        "tackles_won",
-        "interceptions",
-        "ball_recoveries",
-        "aerial_duels_won",
-        "aerial_duels_lost",
-        "blocks",
-        "touches",
-        "dispossessed",
-        "miscontrols",
-        "take_ons",
-        "take_ons_won" "carries_to_final_3rd",
-        "carries_to_pen_area",
-        "yellow_card",
-        "red_card",
     ]
     ordering = ["player__full_name", "player__fbref_id"]
     filterset_fields = {
@@ -674,25 +747,36 @@ class LeaguePlayerView(ListAPIView):
         "carries_to_pen_area": ["exact", "gte", "lte", "range"],
         "yellow_card": ["exact", "gte", "lte", "range"],
         "red_card": ["exact", "gte", "lte", "range"],
+        "GA": ["exact", "gte", "lte", "range"],
+        "goals_per90": ["exact", "gte", "lte", "range"],
+        "xg_per90": ["exact", "gte", "lte", "range"],
+        "npxg_per90": ["exact", "gte", "lte", "range"],
+        "sca_per90": ["exact", "gte", "lte", "range"],
+        "tackles_won_pct": ["exact", "gte", "lte", "range"],
+        "take_ons_won_pct": ["exact", "gte", "lte", "range"],
     }
 
     def get_queryset(self):
         league_id = self.kwargs.get("league_id")
         get_object_or_404(League, pk=league_id)
-        queryset = PlayerSeasonStats.objects.select_related(
-            "player", "club", "season"
-        ).filter(club__league_id=league_id)
+        queryset = PlayerSeasonStats.objects.filter(league_id=league_id)
         return queryset
 
 
-class LeagueGoalkeeperView(ListAPIView):
+class LeagueGoalkeeperView(
+    ConditionalGetMixin,
+    SnapshotListMixin,
+    SparseFieldsMixin,
+    ListAPIView,
+):
     permission_classes = [IsSuperUserOrReadOnly]
     authentication_classes = [JWTAuthentication]
+    snapshot_scope = "league_id"
     serializer_class = GoalkeeperSerializer
     filter_backends = [
         filters.OrderingFilter,
         filters.SearchFilter,
-        DjangoFilterBackend,
+        StatsFilterBackend,
     ]
 
     ordering_fields = [
@@ -714,27 +798,10 @@ class LeagueGoalkeeperView(ListAPIView):
         "crosses_stopped",
         "sweeper_action",
         "sweeper_action_per90",
+        "goals_conceded_per90",
+        "psxg_per90",
     ]
-    search_fields = [
-        "player__full_name",
-        "club__name",
-        "season__season",
-        "age",
-        "matches_played",
-        "minutes_played",
-        "goals_conceded",
-        "shots_faced",
-        "saves",
-        "save_percentage",
-        "clean_sheets",
-        "psxg",
-        "psxg_performance",
-        "pen_saved",
-        "passes",
-        "crosses_stopped",
-        "sweeper_action",
-        "sweeper_action_per90",
-    ]
+    search_fields = ["player__full_name", "club__name", "season__season"]
     ordering = [
         "matches_played",
         "minutes_played",
@@ -763,25 +830,31 @@ class LeagueGoalkeeperView(ListAPIView):
         "crosses_stopped": ["exact", "gte", "lte", "range"],
         "sweeper_action": ["exact", "gte", "lte", "range"],
         "sweeper_action_per90": ["exact", "gte", "lte", "range"],
+        "goals_conceded_per90": ["exact", "gte", "lte", "range"],
+        "psxg_per90": ["exact", "gte", "lte", "range"],
     }
 
     def get_queryset(self):
         league_id = self.kwargs.get("league_id")
         get_object_or_404(League, pk=league_id)
-        queryset = Goalkeeper.objects.select_related(
-            "player", "league", "club", "season"
-        ).filter(league_id=league_id)
+        queryset = Goalkeeper.objects.filter(league_id=league_id)
         return queryset
 
 
-class ClubDetailView(ListAPIView):
+class ClubDetailView(
+    ConditionalGetMixin,
+    SnapshotListMixin,
+    SparseFieldsMixin,
+    ListAPIView,
+):
     permission_classes = [IsSuperUserOrReadOnly]
     authentication_classes = [JWTAuthentication]
+    snapshot_scope = "club_id"
     serializer_class = ClubSeasonStatSerializer
     filter_backends = [
         filters.OrderingFilter,
         filters.SearchFilter,
-        DjangoFilterBackend,
+        StatsFilterBackend,
     ]
 
     ordering_fields = [
@@ -804,28 +877,10 @@ class ClubDetailView(ListAPIView):
         "comp_passes_allowed",
         "passes_to_final_third_allowed",
         "passes_to_pen_area_allowed",
+        "goal_diff",
+        "xg_diff",
     ]
-    search_fields = [
-        "id",
-        "club__name",
-        "season__season",
-        "points_won",
-        "league_position",
-        "matches_played",
-        "win",
-        "draw",
-        "lost",
-        "goals_scored",
-        "goals_conceded",
-        "xg_created",
-        "xg_conceded",
-        "shots_allowed",
-        "shots_target_allowed",
-        "attempted_passes_against",
-        "comp_passes_allowed",
-        "passes_to_final_third_allowed",
-        "passes_to_pen_area_allowed",
-    ]
+    search_fields = ["club__name", "season__season"]
     ordering = ["league_position"]
     filterset_fields = {
         "id": ["exact"],
@@ -847,25 +902,31 @@ class ClubDetailView(ListAPIView):
         "comp_passes_allowed": ["exact", "gte", "lte", "range"],
         "passes_to_final_third_allowed": ["exact", "gte", "lte", "range"],
         "passes_to_pen_area_allowed": ["exact", "gte", "lte", "range"],
+        "goal_diff": ["exact", "gte", "lte", "range"],
+        "xg_diff": ["exact", "gte", "lte", "range"],
     }
 
     def get_queryset(self):
         club_id = self.kwargs.get("club_id")
         get_object_or_404(Club, pk=club_id)
-        queryset = ClubSeasonStat.objects.select_related("club", "season").filter(
-            club_id=club_id
-        )
+        queryset = ClubSeasonStat.objects.filter(club_id=club_id)
         return queryset
 
 
-class ClubPlayerView(ListAPIView):
+class ClubPlayerView(
+    ConditionalGetMixin,
+    SnapshotListMixin,
+    SparseFieldsMixin,
+    ListAPIView,
+):
     permission_classes = [IsSuperUserOrReadOnly]
     authentication_classes = [JWTAuthentication]
+    snapshot_scope = "club_id"
     serializer_class = PlayerSeasonStatsSerializer
     filter_backends = [
         filters.OrderingFilter,
         filters.SearchFilter,
-        DjangoFilterBackend,
+        StatsFilterBackend,
     ]
 
     ordering_fields = [
@@ -911,59 +972,20 @@ class ClubPlayerView(ListAPIView):
         "dispossessed",
         "miscontrols",
         "take_ons",
-        "take_ons_won" "carries_to_final_3rd",
-        "carries_to_pen_area",
-        "yellow_card",
-        "red_card",
-    ]
-    search_fields = [
-        "id",
-        "fouls_committed",
-        "fouls_won",
-        "player__full_name",
-        "club__name",
-        "season__season",
-        "position",
-        "age",
-        "matches_played",
-        "minutes_played",
-        "matches_completed",
-        "matches_substituted",
-        "unused_sub",
-        "goals",
-        "assists",
-        "xg",
-        "npxg",
-        "xg_performance",
-        "npxg_performance",
-        "prog_carries",
-        "prog_carries_final_3rd",
-        "prog_passes",
-        "shots_target",
-        "passes_to_final_3rd",
-        "passes_to_pen_area",
-        "pass_switches",
-        "through_ball",
-        "shots_creation_action",
-        "offsides",
-        "pen_won",
-        "pen_conceded",
-        "tackles",
-        "tackles_won",
-        "interceptions",
-        "ball_recoveries",
-        "aerial_duels_won",
-        "aerial_duels_lost",
-        "blocks",
-        "touches",
-        "dispossessed",
-        "miscontrols",
-        "take_ons",
-        "take_ons_won" "carries_to_final_3rd",
+        "take_ons_won",
+        "carries_to_final_3rd",
         "carries_to_pen_area",
         "yellow_card",
         "red_card",
+        "GA",
+        "goals_per90",
+        "xg_per90",
+        "npxg_per90",
+        "sca_per90",
+        "tackles_won_pct",
+        "take_ons_won_pct",
     ]
+    search_fields = ["player__full_name", "club__name", "season__season", "position"]
     ordering = ["-goals", "-assists", "-minutes_played", "player__full_name"]
     filterset_fields = {
         "id": ["exact"],
@@ -987,7 +1009,7 @@ class ClubPlayerView(ListAPIView):
         "npxg": ["exact", "gte", "lte", "range"],
         "xg_performance": ["exact", "gte", "lte", "range"],
         "npxg_performance": ["exact", "gte", "lte", "range"],
-        "prog_carrides": ["exact", "gte", "lte", "range"],
+        "prog_carries": ["exact", "gte", "lte", "range"],
         "prog_carries_final_3rd": ["exact", "gte", "lte", "range"],
         "prog_passes": ["exact", "gte", "lte", "range"],
         "shots_target": ["exact", "gte", "lte", "range"],
@@ -1015,26 +1037,37 @@ class ClubPlayerView(ListAPIView):
         "carries_to_pen_area": ["exact", "gte", "lte", "range"],
         "yellow_card": ["exact", "gte", "lte", "range"],
         "red_card": ["exact", "gte", "lte", "range"],
+        "GA": ["exact", "gte", "lte", "range"],
+        "goals_per90": ["exact", "gte", "lte", "range"],
+        "xg_per90": ["exact", "gte", "lte", "range"],
+        "npxg_per90": ["exact", "gte", "lte", "range"],
+        "sca_per90": ["exact", "gte", "lte", "range"],
+        "tackles_won_pct": ["exact", "gte", "lte", "range"],
+        "take_ons_won_pct": ["exact", "gte", "lte", "range"],
     }
 
     def get_queryset(self):
         club_id = self.kwargs.get("club_id")
         get_object_or_404(Club, pk=club_id)
-        queryset = PlayerSeasonStats.objects.select_related(
-            "player", "club", "season"
-        ).filter(club_id=club_id)
+        queryset = PlayerSeasonStats.objects.filter(club_id=club_id)
         return queryset
 
 
-class ClubGoalkeeperView(ListAPIView):
+class ClubGoalkeeperView(
+    ConditionalGetMixin,
+    SnapshotListMixin,
+    SparseFieldsMixin,
+    ListAPIView,
+):
     permission_classes = [IsSuperUserOrReadOnly]
     authentication_classes = [JWTAuthentication]
+    snapshot_scope = "club_id"
     serializer_class = GoalkeeperSerializer
 
     filter_backends = [
         filters.OrderingFilter,
         filters.SearchFilter,
-        DjangoFilterBackend,
+        StatsFilterBackend,
     ]
 
     ordering_fields = [
@@ -1056,27 +1089,10 @@ class ClubGoalkeeperView(ListAPIView):
         "crosses_stopped",
         "sweeper_action",
         "sweeper_action_per90",
+        "goals_conceded_per90",
+        "psxg_per90",
     ]
-    search_fields = [
-        "player__full_name",
-        "club__name",
-        "season__season",
-        "age",
-        "matches_played",
-        "minutes_played",
-        "goals_conceded",
-        "shots_faced",
-        "saves",
-        "save_percentage",
-        "clean_sheets",
-        "psxg",
-        "psxg_performance",
-        "pen_saved",
-        "passes",
-        "crosses_stopped",
-        "sweeper_action",
-        "sweeper_action_per90",
-    ]
+    search_fields = ["player__full_name", "club__name", "season__season"]
     ordering = [
         "matches_played",
         "minutes_played",
@@ -1103,12 +1119,12 @@ class ClubGoalkeeperView(ListAPIView):
         "crosses_stopped": ["exact", "gte", "lte", "range"],
         "sweeper_action": ["exact", "gte", "lte", "range"],
         "sweeper_action_per90": ["exact", "gte", "lte", "range"],
+        "goals_conceded_per90": ["exact", "gte", "lte", "range"],
+        "psxg_per90": ["exact", "gte", "lte", "range"],
     }
 
     def get_queryset(self):
         club_id = self.kwargs.get("club_id")
         get_object_or_404(Club, pk=club_id)
-        queryset = Goalkeeper.objects.select_related("player", "club", "season").filter(
-            club_id=club_id
-        )
+        queryset = Goalkeeper.objects.filter(club_id=club_id)
         return queryset
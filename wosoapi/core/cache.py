@@ -0,0 +1,44 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from api.models import DataVersion
+
+PAGE_CACHE = "pages"
+
+
+def page_cache_key(view_name, kwargs, generation):
+    """Cache key for a page, built from the view and its URL kwargs."""
+    params = urlencode(sorted(kwargs.items()))
+    digest = hashlib.md5(params.encode("utf-8")).hexdigest()
+    return f"core:page:{view_name}:{generation}:{digest}"
+
+
+class CachedPageMixin:
+    """Serve the rendered page from the ``pages`` cache.
+
+    The key holds the current ``DataVersion`` generation, so a page is
+    rebuilt exactly once after every import instead of on every request.
+    Only successful responses are cached.
+    """
+
+    def get(self, request, *args, **kwargs):
+        cache = caches[PAGE_CACHE]
+        key = page_cache_key(type(self).__name__, kwargs, DataVersion.current())
+
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response["X-Page-Cache"] = "hit"
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        if response.status_code == 200:
+            cache.set(key, (response.content, response["Content-Type"]))
+        response["X-Page-Cache"] = "miss"
+        return response
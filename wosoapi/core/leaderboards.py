@@ -0,0 +1,380 @@
+import heapq
+from itertools import groupby
+from operator import attrgetter
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+
+from api.models import ClubSeasonStat, Goalkeeper, PlayerSeasonStats
+from api.snapshot import get_snapshots
+from core.models import LeaderboardEntry
+
+EUROPE_LEAGUES = ["Arkema", "WSL", "LigaF", "SerieA", "Frauen"]
+
+PLAYER_METRICS = [
+    "matches_played",
+    "minutes_played",
+    "matches_completed",
+    "matches_substituted",
+    "unused_sub",
+    "goals",
+    "assists",
+    "GA",
+    "xg",
+    "npxg",
+    "xg_performance",
+    "npxg_performance",
+    "prog_carries",
+    "prog_carries_final_3rd",
+    "prog_passes",
+    "shots_target",
+    "passes_to_final_3rd",
+    "passes_to_pen_area",
+    "pass_switches",
+    "through_ball",
+    "shots_creation_action",
+    "offsides",
+    "pen_won",
+    "pen_conceded",
+    "tackles",
+    "ball_recoveries",
+    "aerial_duels_won",
+    "aerial_duels_lost",
+    "blocks",
+    "tackles_won",
+    "interceptions",
+    "touches",
+    "dispossessed",
+    "miscontrols",
+    "take_ons",
+    "take_ons_won",
+    "fouls_won",
+    "fouls_committed",
+    "carries_to_final_3rd",
+    "carries_to_pen_area",
+    "yellow_card",
+    "red_card",
+]
+
+GOALKEEPER_METRICS = [
+    "matches_played",
+    "minutes_played",
+    "goals_conceded",
+    "shots_faced",
+    "saves",
+    "save_percentage",
+    "clean_sheets",
+    "psxg",
+    "psxg_performance",
+    "pen_saved",
+    "passes",
+    "crosses_stopped",
+    "sweeper_action",
+    "sweeper_action_per90",
+]
+
+# Template keys that don't follow the "<prefix>_<metric>" naming.
+PLAYER_ALIASES = {
+    "minutes": "minutes_played",
+    "games_completed": "matches_completed",
+}
+GOALKEEPER_ALIASES = {
+    "games_played": "matches_played",
+}
+
+CLUB_METRICS = [
+    "points_won",
+    "league_position",
+    "matches_played",
+    "win",
+    "draw",
+    "lost",
+    "goals_scored",
+    "goals_conceded",
+    "xg_created",
+    "xg_conceded",
+    "shots_allowed",
+    "shots_target_allowed",
+    "attempted_passes_against",
+    "comp_passes_allowed",
+    "passes_to_final_third_allowed",
+    "passes_to_pen_area_allowed",
+]
+
+
+def is_u23(obj):
+    # Mirrors exclude(player__age__gt=23): players without an age are kept.
+    return obj.player.age is None or obj.player.age <= 23
+
+
+def sort_rows(rows, order_by):
+    """Sort like the database would, NULLs last ascending and first descending."""
+    field = order_by.lstrip("-")
+
+    def key(obj):
+        value = getattr(obj, field)
+        return (value is None, value)
+
+    return sorted(rows, key=key, reverse=order_by.startswith("-"))
+
+
+def build_tables(top, prefix, metrics):
+    """Top tables keyed the way the templates expect, e.g. ``player_goals``.
+
+    ``top`` is called with a descending order (``"-goals"``) for each metric.
+    """
+    return {f"{prefix}_{metric}": top(f"-{metric}") for metric in metrics}
+
+
+def add_aliases(context, prefix, aliases):
+    for alias, metric in aliases.items():
+        context[f"{prefix}_{alias}"] = context.get(f"{prefix}_{metric}", {})
+
+
+def top_per_season(queryset, order_by, seasons=(), size=10):
+    """Group a ``top_n_per`` window query by season name.
+
+    Seasons listed in ``seasons`` are kept as empty tables when none of their
+    rows has a positive value. ``size`` matches ``Leaderboard``.
+    """
+    grouped = {season: [] for season in seasons}
+    for obj in queryset.top_n_per(partition="season__season", metric=order_by, n=size):
+        grouped.setdefault(obj.season.season, []).append(obj)
+    return grouped
+
+
+class Leaderboard:
+    """Per-season rankings computed from a single pass over a queryset.
+
+    The rows are fetched once and grouped by season; every table built
+    afterwards is plain Python, so the number of queries doesn't grow with
+    the number of seasons or metrics.
+    """
+
+    def __init__(self, rows, size=10):
+        self.size = size
+        self.seasons = {}
+        if isinstance(rows, QuerySet):
+            rows = rows.order_by("season__season", "id")
+        for obj in rows:
+            self.seasons.setdefault(obj.season.season, []).append(obj)
+
+    def ordered(self, order_by):
+        """Every row of each season, sorted by ``order_by``."""
+        return {
+            season: sort_rows(rows, order_by) for season, rows in self.seasons.items()
+        }
+
+    def top(self, order_by, where=None):
+        """The best ``size`` rows of each season with a positive ``order_by`` value."""
+        get = attrgetter(order_by.lstrip("-"))
+        # Same as sorting and slicing, ties included, without sorting every row
+        best = heapq.nlargest if order_by.startswith("-") else heapq.nsmallest
+        grouped = {}
+        for season, rows in self.seasons.items():
+            rows = [
+                obj for obj in rows if (value := get(obj)) is not None and value > 0
+            ]
+            if where is not None:
+                rows = [obj for obj in rows if where(obj)]
+            grouped[season] = best(self.size, rows, key=get)
+        return grouped
+
+    def tables(self, prefix, metrics, where=None):
+        board = self
+        if where is not None:
+            # Filtered once rather than once per metric
+            rows = [obj for rows in self.seasons.values() for obj in rows if where(obj)]
+            board = Leaderboard(rows, self.size)
+        return build_tables(board.top, prefix, metrics)
+
+
+def player_queryset():
+    return PlayerSeasonStats.objects.select_related("club", "season", "player")
+
+
+def goalkeeper_queryset():
+    return Goalkeeper.objects.select_related("player", "club", "season")
+
+
+def club_queryset():
+    return ClubSeasonStat.objects.select_related("club", "season", "league")
+
+
+def league_scope(league_id):
+    return f"league:{league_id}"
+
+
+def club_scope(club_id):
+    return f"club:{club_id}"
+
+
+def league_tables(league):
+    """Live top tables for ``LeagueSeasonDetailView``."""
+    players = Leaderboard(player_queryset().filter(league=league))
+    goalkeepers = Leaderboard(goalkeeper_queryset().filter(league=league))
+    return {
+        **players.tables("player", PLAYER_METRICS),
+        **players.tables("U23_player", PLAYER_METRICS, where=is_u23),
+        **goalkeepers.tables("goalkeeper", GOALKEEPER_METRICS),
+    }
+
+
+def club_tables(club):
+    """Live top tables for ``ClubSeasonStatView``."""
+    player_qs = player_queryset().filter(club=club)
+    goalkeeper_qs = goalkeeper_queryset().filter(club=club)
+
+    def season_names(qs):
+        return list(
+            qs.order_by("season__season")
+            .values_list("season__season", flat=True)
+            .distinct()
+        )
+
+    player_seasons = season_names(player_qs)
+    goalkeeper_seasons = season_names(goalkeeper_qs)
+    return {
+        **build_tables(
+            lambda orderby: top_per_season(player_qs, orderby, player_seasons),
+            "player",
+            PLAYER_METRICS,
+        ),
+        **build_tables(
+            lambda orderby: top_per_season(goalkeeper_qs, orderby, goalkeeper_seasons),
+            "goalkeeper",
+            GOALKEEPER_METRICS,
+        ),
+    }
+
+
+def europe_tables(season):
+    """Top tables for ``EuropeTop5Leagues``, ranked from the worker's snapshot."""
+    snapshots = get_snapshots([season])
+
+    def board(model):
+        rows = [
+            row for snapshot in snapshots for row in snapshot.tables[model].values()
+        ]
+        return Leaderboard([obj for obj in rows if obj.league.code in EUROPE_LEAGUES])
+
+    players = board(PlayerSeasonStats)
+    return {
+        **players.tables("player", PLAYER_METRICS),
+        **players.tables("U23_player", PLAYER_METRICS, where=is_u23),
+        **board(Goalkeeper).tables("gk", GOALKEEPER_METRICS),
+        **board(ClubSeasonStat).tables("club", CLUB_METRICS),
+    }
+
+
+def stored_tables(scope, season=None):
+    """Top tables of ``scope`` read back from ``LeaderboardEntry``.
+
+    Returns ``None`` when nothing has been stored for the scope yet, so the
+    caller can fall back to the live tables.
+    """
+    entries = LeaderboardEntry.objects.filter(scope=scope)
+    if season is not None:
+        entries = entries.filter(season=season)
+    entries = list(entries.order_by("season", "metric", "rank"))
+    if not entries:
+        return None
+
+    querysets = {
+        LeaderboardEntry.PLAYER: player_queryset(),
+        LeaderboardEntry.GOALKEEPER: goalkeeper_queryset(),
+        LeaderboardEntry.CLUB: club_queryset(),
+    }
+    objects = {}
+    for stat_type, queryset in querysets.items():
+        ids = [entry.stat_id for entry in entries if entry.stat_type == stat_type]
+        if ids:
+            objects[stat_type] = queryset.in_bulk(ids)
+
+    tables = {}
+    seasons = {}
+    for entry in entries:
+        seasons.setdefault(entry.stat_type, {})[entry.season] = None
+        rows = tables.setdefault((entry.stat_type, entry.metric), {})
+        obj = objects[entry.stat_type].get(entry.stat_id)
+        if obj is not None:
+            rows.setdefault(entry.season, []).append(obj)
+
+    # A season where nobody has a positive value keeps an empty table.
+    return {
+        metric: {name: grouped.get(name, []) for name in seasons[stat_type]}
+        for (stat_type, metric), grouped in tables.items()
+    }
+
+
+def forget_stored_tables(stat_type, rows):
+    """Drop the stored tables that the stats ``rows`` of ``stat_type`` can change.
+
+    That is their league's and club's, and any other scope they are still
+    ranked in (a row moved to another club). Those pages use the live
+    tables until the next ``refresh_leaderboards``.
+    """
+    scopes = set()
+    for obj in rows:
+        scopes |= {league_scope(obj.league_id), club_scope(obj.club_id)}
+    ranked = LeaderboardEntry.objects.filter(
+        stat_type=stat_type, stat_id__in=[obj.pk for obj in rows]
+    ).values_list("scope", flat=True)
+    LeaderboardEntry.objects.filter(Q(scope__in=scopes) | Q(scope__in=ranked)).delete()
+
+
+def _entries(scope, stat_type, board, prefix, metrics, where=None):
+    for metric in metrics:
+        for season, rows in board.top(f"-{metric}", where=where).items():
+            for rank, obj in enumerate(rows, start=1):
+                yield LeaderboardEntry(
+                    scope=scope,
+                    season=season,
+                    metric=f"{prefix}_{metric}",
+                    rank=rank,
+                    stat_type=stat_type,
+                    stat_id=obj.pk,
+                    value=getattr(obj, metric),
+                )
+
+
+def refresh_leaderboards():
+    """Rebuild every stored leaderboard from the current stats.
+
+    Each model is read once and ranked in memory; the old entries are
+    replaced in a single transaction. Returns the number of entries written.
+    """
+    players = list(player_queryset().order_by("season__season", "id"))
+    goalkeepers = list(goalkeeper_queryset().order_by("season__season", "id"))
+
+    def boards(rows, key):
+        for value, group in groupby(sorted(rows, key=key), key=key):
+            yield value, Leaderboard(group)
+
+    PLAYER = LeaderboardEntry.PLAYER
+    GOALKEEPER = LeaderboardEntry.GOALKEEPER
+    entries = []
+    for league_id, board in boards(players, lambda obj: obj.league_id):
+        scope = league_scope(league_id)
+        entries += _entries(scope, PLAYER, board, "player", PLAYER_METRICS)
+        entries += _entries(
+            scope, PLAYER, board, "U23_player", PLAYER_METRICS, where=is_u23
+        )
+    for league_id, board in boards(goalkeepers, lambda obj: obj.league_id):
+        entries += _entries(
+            league_scope(league_id), GOALKEEPER, board, "goalkeeper", GOALKEEPER_METRICS
+        )
+
+    for club_id, board in boards(players, lambda obj: obj.club_id):
+        entries += _entries(
+            club_scope(club_id), PLAYER, board, "player", PLAYER_METRICS
+        )
+    for club_id, board in boards(goalkeepers, lambda obj: obj.club_id):
+        entries += _entries(
+            club_scope(club_id), GOALKEEPER, board, "goalkeeper", GOALKEEPER_METRICS
+        )
+
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import DataVersion
+from core.leaderboards import refresh_leaderboards
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the precomputed leaderboards shown on the league, club and Europe pages."
+
+    def handle(self, *args, **kwargs):
+        started = time.perf_counter()
+        count = refresh_leaderboards()
+        DataVersion.bump()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Leaderboards refreshed! Entries: {count} ({time.perf_counter() - started:.2f}s)"
+            )
+        )
+
+
+"""
+ python manage.py refresh_leaderboards
+"""
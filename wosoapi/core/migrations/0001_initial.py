@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=50)),
+                ("season", models.CharField(max_length=9)),
+                ("metric", models.CharField(max_length=60)),
+                ("rank", models.PositiveSmallIntegerField()),
+                (
+                    "stat_type",
+                    models.CharField(
+                        choices=[
+                            ("player", "Player season stats"),
+                            ("goalkeeper", "Goalkeeper season stats"),
+                            ("club", "Club season stats"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("stat_id", models.BigIntegerField()),
+                ("value", models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["scope", "season", "metric", "rank"],
+                        name="leaderboard_lookup_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,3 +1,41 @@
 from django.db import models
 
-# Create your models here.
+
+class LeaderboardEntry(models.Model):
+    """One ranked row of a precomputed leaderboard.
+
+    Rebuilt by the ``refresh_leaderboards`` command after every import so
+    the core pages can read their top tables instead of ranking live.
+    A stats write outside an import drops the scopes it touches (see
+    ``core.signals``), whose pages then rank live until the next refresh.
+    """
+
+    PLAYER = "player"
+    GOALKEEPER = "goalkeeper"
+    CLUB = "club"
+    STAT_TYPES = [
+        (PLAYER, "Player season stats"),
+        (GOALKEEPER, "Goalkeeper season stats"),
+        (CLUB, "Club season stats"),
+    ]
+
+    # "league:<id>" or "club:<id>"
+    scope = models.CharField(max_length=50)
+    season = models.CharField(max_length=9)
+    # The template key of the table, e.g. "player_goals" or "gk_saves".
+    metric = models.CharField(max_length=60)
+    rank = models.PositiveSmallIntegerField()
+    stat_type = models.CharField(max_length=10, choices=STAT_TYPES)
+    stat_id = models.BigIntegerField()
+    value = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["scope", "season", "metric", "rank"],
+                name="leaderboard_lookup_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.season} {self.metric} #{self.rank}"
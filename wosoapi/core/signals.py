@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+
+from api.models import DataVersion, Goalkeeper, Player, PlayerSeasonStats
+from core.leaderboards import forget_stored_tables
+from core.models import LeaderboardEntry
+
+STAT_TYPES = {
+    PlayerSeasonStats: LeaderboardEntry.PLAYER,
+    Goalkeeper: LeaderboardEntry.GOALKEEPER,
+}
+
+
+def stats_changed(sender, instance, **kwargs):
+    # Imports refresh every leaderboard once they are done
+    if not DataVersion.is_deferred():
+        forget_stored_tables(STAT_TYPES[sender], [instance])
+
+
+def player_changed(sender, instance, **kwargs):
+    # An age change moves the player in or out of the U23 tables
+    if not DataVersion.is_deferred():
+        for model, stat_type in STAT_TYPES.items():
+            forget_stored_tables(stat_type, model.objects.filter(player=instance))
+
+
+for model in STAT_TYPES:
+    post_save.connect(stats_changed, sender=model)
+    post_delete.connect(stats_changed, sender=model)
+post_save.connect(player_changed, sender=Player)
@@ -5,18 +5,31 @@ from api.models import *
 from django.views.generic import ListView, DetailView
 from django.shortcuts import get_object_or_404
 from itertools import groupby
-from django.db.models import F, Q, Value
-from django.db.models.functions import Replace
 from django.http import HttpResponse
-
-
-class HomeView(ListView):
+from api.snapshot import get_snapshots
+from core.cache import CachedPageMixin
+from core.leaderboards import (
+    EUROPE_LEAGUES,
+    GOALKEEPER_ALIASES,
+    PLAYER_ALIASES,
+    Leaderboard,
+    add_aliases,
+    club_scope,
+    club_tables,
+    europe_tables,
+    league_scope,
+    league_tables,
+    stored_tables,
+)
+
+
+class HomeView(CachedPageMixin, ListView):
     queryset = League.objects.all()
     template_name = "core/home.html"
     context_object_name = "leagues"
 
 
-class LeagueSeasonDetailView(DetailView):
+class LeagueSeasonDetailView(CachedPageMixin, DetailView):
     model = ClubSeasonStat
     template_name = "core/clubs.html"
     context_object_name = "league"
@@ -27,327 +40,71 @@ class LeagueSeasonDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        league = self.get_object()
-
-        base_qs = ClubSeasonStat.objects.select_related(
-            "club", "season", "league"
-        ).filter(league=league)
-        distinct_qs = PlayerSeasonStats.objects.select_related(
-            "club", "season", "player"
-        ).filter(league=league)
-
-        goalkeeper_qs = Goalkeeper.objects.select_related(
-            "player", "club", "season"
-        ).filter(league=league)
-
-        def get_season_key(obj):
-            return obj.season.season
-
-        def group_by_season(qs, order_by):
-            ordered = qs.order_by("season__season", order_by)
-            grouped = {}
-
-            for season, obj in groupby(ordered, key=get_season_key):
-                grouped[season] = list(obj)
-            return grouped
-
-        def group_by_distinct(qs, orderby):
-            seasons = qs.values_list("season__season", flat=True).distinct()
-            grouped = {}
-            field_name = orderby.lstrip("-")
-            for season in seasons:
-                season_players = qs.filter(season__season=season)
-                field_kwargs = {f"{field_name}__gt": 0}
-                top10 = season_players.filter(**field_kwargs).order_by(orderby)[:10]
+        league = self.object
 
-                grouped[season] = list(top10)
-            return grouped
-
-        goal_diff = base_qs.annotate(goal_diff=F("goals_scored") - F("goals_conceded"))
-        distinct_qs = distinct_qs.annotate(GA=F("goals") + F("assists"))
-
-        def U23_stats(qs, orderby):
-            seasons = qs.values_list("season__season", flat=True).distinct()
-            grouped = {}
-
-            field_name = orderby.lstrip("-")
-
-            for season in seasons:
-
-                season_qs = qs.filter(season__season=season).exclude(player__age__gt=23)
-
-                filter_kwargs = {f"{field_name}__gt": 0}
-                season_qs = season_qs.filter(**filter_kwargs)
-
-                top10 = season_qs.order_by(orderby)[:10]
-                grouped[season] = list(top10)
-
-            return grouped
+        clubs = Leaderboard(
+            ClubSeasonStat.objects.select_related("club", "season", "league").filter(
+                league=league
+            )
+        )
 
         context["season"] = Season.objects.all()
         context["club_names"] = Club.objects.all().distinct()
-        context["goal_scored"] = group_by_season(base_qs, "-goals_scored")
-        context["goal_conceded"] = group_by_season(base_qs, "-goals_conceded")
-        context["xg_create"] = group_by_season(base_qs, "-xg_created")
-        context["xg_concede"] = group_by_season(base_qs, "-xg_conceded")
-        context["shot"] = group_by_season(base_qs, "-shots_allowed")
-        context["shots_on_target"] = group_by_season(base_qs, "-shots_target_allowed")
-        context["attempted_passes"] = group_by_season(
-            base_qs, "-attempted_passes_against"
-        )
-        context["completed_passes"] = group_by_season(base_qs, "-comp_passes_allowed")
-        context["passes_into_final_third"] = group_by_season(
-            base_qs, "-passes_to_final_third_allowed"
-        )
-        context["passes_into_pen_area"] = group_by_season(
-            base_qs, "-passes_to_pen_area_allowed"
-        )
-        context["league_table"] = group_by_season(goal_diff, "league_position")
-        context["goal_difference"] = group_by_season(goal_diff, "goal_diff")
-        context["player_minutes"] = group_by_distinct(distinct_qs, "-minutes_played")
-        context["player_games_completed"] = group_by_distinct(
-            distinct_qs, "-matches_completed"
-        )
-        context["player_matches_played"] = group_by_distinct(
-            distinct_qs, "-matches_played"
-        )
-        context["player_minutes_played"] = group_by_distinct(
-            distinct_qs, "-minutes_played"
-        )
-        context["player_matches_substituted"] = group_by_distinct(
-            distinct_qs, "-matches_substituted"
-        )
-        context["player_unused_sub"] = group_by_distinct(distinct_qs, "-unused_sub")
-        context["player_goals"] = group_by_distinct(distinct_qs, "-goals")
-        context["player_assists"] = group_by_distinct(distinct_qs, "-assists")
-        context["player_GA"] = group_by_distinct(distinct_qs, "-GA")
-        context["player_xg"] = group_by_distinct(distinct_qs, "-xg")
-        context["player_npxg"] = group_by_distinct(distinct_qs, "-npxg")
-        context["player_xg_performance"] = group_by_distinct(
-            distinct_qs, "-xg_performance"
-        )
-        context["player_npxg_performance"] = group_by_distinct(
-            distinct_qs, "-npxg_performance"
-        )
-        context["player_prog_carries"] = group_by_distinct(distinct_qs, "-prog_carries")
-        context["player_prog_carries_final_3rd"] = group_by_distinct(
-            distinct_qs, "-prog_carries_final_3rd"
-        )
-        context["player_prog_passes"] = group_by_distinct(distinct_qs, "-prog_passes")
-        context["player_shots_target"] = group_by_distinct(distinct_qs, "-shots_target")
-        context["player_passes_to_final_3rd"] = group_by_distinct(
-            distinct_qs, "-passes_to_final_3rd"
-        )
-        context["player_passes_to_pen_area"] = group_by_distinct(
-            distinct_qs, "-passes_to_pen_area"
-        )
-        context["player_pass_switches"] = group_by_distinct(
-            distinct_qs, "-pass_switches"
-        )
-        context["player_through_ball"] = group_by_distinct(distinct_qs, "-through_ball")
-        context["player_shots_creation_action"] = group_by_distinct(
-            distinct_qs, "-shots_creation_action"
-        )
-        context["player_offsides"] = group_by_distinct(distinct_qs, "-offsides")
-        context["player_pen_won"] = group_by_distinct(distinct_qs, "-pen_won")
-        context["player_pen_conceded"] = group_by_distinct(distinct_qs, "-pen_conceded")
-        context["player_tackles"] = group_by_distinct(distinct_qs, "-tackles")
-        context["player_ball_recoveries"] = group_by_distinct(
-            distinct_qs, "-ball_recoveries"
-        )
-        context["player_aerial_duels_won"] = group_by_distinct(
-            distinct_qs, "-aerial_duels_won"
-        )
-        context["player_aerial_duels_lost"] = group_by_distinct(
-            distinct_qs, "-aerial_duels_lost"
-        )
-        context["player_blocks"] = group_by_distinct(distinct_qs, "-blocks")
-        context["player_tackles_won"] = group_by_distinct(distinct_qs, "-tackles_won")
-        context["player_interceptions"] = group_by_distinct(
-            distinct_qs, "-interceptions"
-        )
-        context["player_touches"] = group_by_distinct(distinct_qs, "-touches")
-        context["player_dispossessed"] = group_by_distinct(distinct_qs, "-dispossessed")
-        context["player_miscontrols"] = group_by_distinct(distinct_qs, "-miscontrols")
-        context["player_take_ons"] = group_by_distinct(distinct_qs, "-take_ons")
-        context["player_take_ons_won"] = group_by_distinct(distinct_qs, "-take_ons_won")
-        context["player_fouls_won"] = group_by_distinct(distinct_qs, "-fouls_won")
-        context["player_fouls_committed"] = group_by_distinct(
-            distinct_qs, "-fouls_committed"
-        )
-        context["player_carries_to_final_3rd"] = group_by_distinct(
-            distinct_qs, "-carries_to_final_3rd"
-        )
-        context["player_carries_to_pen_area"] = group_by_distinct(
-            distinct_qs, "-carries_to_pen_area"
-        )
-        context["player_yellow_card"] = group_by_distinct(distinct_qs, "-yellow_card")
-        context["player_red_card"] = group_by_distinct(distinct_qs, "-red_card")
-        context["U23_player_minutes"] = U23_stats(distinct_qs, "-minutes_played")
-        context["U23_player_games_completed"] = U23_stats(
-            distinct_qs, "-matches_completed"
-        )
-        context["U23_player_matches_played"] = U23_stats(distinct_qs, "-matches_played")
-        context["U23_player_minutes_played"] = U23_stats(distinct_qs, "-minutes_played")
-        context["U23_player_matches_substituted"] = U23_stats(
-            distinct_qs, "-matches_substituted"
-        )
-        context["U23_player_unused_sub"] = U23_stats(distinct_qs, "-unused_sub")
-        context["U23_player_goals"] = U23_stats(distinct_qs, "-goals")
-        context["U23_player_assists"] = U23_stats(distinct_qs, "-assists")
-        context["U23_player_GA"] = U23_stats(distinct_qs, "-GA")
-        context["U23_player_xg"] = U23_stats(distinct_qs, "-xg")
-        context["U23_player_npxg"] = U23_stats(distinct_qs, "-npxg")
-        context["U23_player_xg_performance"] = U23_stats(distinct_qs, "-xg_performance")
-        context["U23_player_npxg_performance"] = U23_stats(
-            distinct_qs, "-npxg_performance"
-        )
-        context["U23_player_prog_carries"] = U23_stats(distinct_qs, "-prog_carries")
-        context["U23_player_prog_carries_final_3rd"] = U23_stats(
-            distinct_qs, "-prog_carries_final_3rd"
-        )
-        context["U23_player_prog_passes"] = U23_stats(distinct_qs, "-prog_passes")
-        context["U23_player_shots_target"] = U23_stats(distinct_qs, "-shots_target")
-        context["U23_player_passes_to_final_3rd"] = U23_stats(
-            distinct_qs, "-passes_to_final_3rd"
-        )
-        context["U23_player_passes_to_pen_area"] = U23_stats(
-            distinct_qs, "-passes_to_pen_area"
-        )
-        context["U23_player_pass_switches"] = U23_stats(distinct_qs, "-pass_switches")
-        context["U23_player_through_ball"] = U23_stats(distinct_qs, "-through_ball")
-        context["U23_player_shots_creation_action"] = U23_stats(
-            distinct_qs, "-shots_creation_action"
-        )
-        context["U23_player_offsides"] = U23_stats(distinct_qs, "-offsides")
-        context["U23_player_pen_won"] = U23_stats(distinct_qs, "-pen_won")
-        context["U23_player_pen_conceded"] = U23_stats(distinct_qs, "-pen_conceded")
-        context["U23_player_tackles"] = U23_stats(distinct_qs, "-tackles")
-        context["U23_player_ball_recoveries"] = U23_stats(
-            distinct_qs, "-ball_recoveries"
-        )
-        context["U23_player_aerial_duels_won"] = U23_stats(
-            distinct_qs, "-aerial_duels_won"
-        )
-        context["U23_player_aerial_duels_lost"] = U23_stats(
-            distinct_qs, "-aerial_duels_lost"
-        )
-        context["U23_player_blocks"] = U23_stats(distinct_qs, "-blocks")
-        context["U23_player_tackles_won"] = U23_stats(distinct_qs, "-tackles_won")
-        context["U23_player_interceptions"] = U23_stats(distinct_qs, "-interceptions")
-        context["U23_player_touches"] = U23_stats(distinct_qs, "-touches")
-        context["U23_player_dispossessed"] = U23_stats(distinct_qs, "-dispossessed")
-        context["U23_player_miscontrols"] = U23_stats(distinct_qs, "-miscontrols")
-        context["U23_player_take_ons"] = U23_stats(distinct_qs, "-take_ons")
-        context["U23_player_take_ons_won"] = U23_stats(distinct_qs, "-take_ons_won")
-        context["U23_player_fouls_won"] = U23_stats(distinct_qs, "-fouls_won")
-        context["U23_player_fouls_committed"] = U23_stats(
-            distinct_qs, "-fouls_committed"
-        )
-        context["U23_player_carries_to_final_3rd"] = U23_stats(
-            distinct_qs, "-carries_to_final_3rd"
-        )
-        context["U23_player_carries_to_pen_area"] = U23_stats(
-            distinct_qs, "-carries_to_pen_area"
-        )
-        context["U23_player_yellow_card"] = U23_stats(distinct_qs, "-yellow_card")
-        context["U23_player_red_card"] = U23_stats(distinct_qs, "-red_card")
-        context["goalkeeper_games_played"] = group_by_distinct(
-            goalkeeper_qs, "-matches_played"
-        )
-        context["goalkeeper_minutes_played"] = group_by_distinct(
-            goalkeeper_qs, "-minutes_played"
-        )
-        context["goalkeeper_goals_conceded"] = group_by_distinct(
-            goalkeeper_qs, "-goals_conceded"
-        )
-        context["goalkeeper_shots_faced"] = group_by_distinct(
-            goalkeeper_qs, "-shots_faced"
-        )
-        context["goalkeeper_saves"] = group_by_distinct(goalkeeper_qs, "-saves")
-        context["goalkeeper_save_percentage"] = group_by_distinct(
-            goalkeeper_qs, "-save_percentage"
-        )
-        context["goalkeeper_clean_sheets"] = group_by_distinct(
-            goalkeeper_qs, "-clean_sheets"
-        )
-        context["goalkeeper_psxg"] = group_by_distinct(goalkeeper_qs, "-psxg")
-        context["goalkeeper_psxg_performance"] = group_by_distinct(
-            goalkeeper_qs, "-psxg_performance"
-        )
-        context["goalkeeper_pen_saved"] = group_by_distinct(goalkeeper_qs, "-pen_saved")
-        context["goalkeeper_passes"] = group_by_distinct(goalkeeper_qs, "-passes")
-        context["goalkeeper_crosses_stopped"] = group_by_distinct(
-            goalkeeper_qs, "-crosses_stopped"
-        )
-        context["goalkeeper_sweeper_action"] = group_by_distinct(
-            goalkeeper_qs, "-sweeper_action"
-        )
-        context["goalkeeper_sweeper_action_per90"] = group_by_distinct(
-            goalkeeper_qs, "-sweeper_action_per90"
-        )
+        context["goal_scored"] = clubs.ordered("-goals_scored")
+        context["goal_conceded"] = clubs.ordered("-goals_conceded")
+        context["xg_create"] = clubs.ordered("-xg_created")
+        context["xg_concede"] = clubs.ordered("-xg_conceded")
+        context["shot"] = clubs.ordered("-shots_allowed")
+        context["shots_on_target"] = clubs.ordered("-shots_target_allowed")
+        context["attempted_passes"] = clubs.ordered("-attempted_passes_against")
+        context["completed_passes"] = clubs.ordered("-comp_passes_allowed")
+        context["passes_into_final_third"] = clubs.ordered(
+            "-passes_to_final_third_allowed"
+        )
+        context["passes_into_pen_area"] = clubs.ordered("-passes_to_pen_area_allowed")
+        context["league_table"] = clubs.ordered("league_position")
+        context["goal_difference"] = clubs.ordered("goal_diff")
+
+        tables = stored_tables(league_scope(league.pk))
+        if tables is None:
+            tables = league_tables(league)
+        context.update(tables)
+        add_aliases(context, "player", PLAYER_ALIASES)
+        add_aliases(context, "U23_player", PLAYER_ALIASES)
+        add_aliases(context, "goalkeeper", GOALKEEPER_ALIASES)
 
         return context
 
 
-class ClubSeasonStatView(DetailView):
+class ClubSeasonStatView(CachedPageMixin, DetailView):
     model = ClubSeasonStat
     template_name = "core/clubstats.html"
     context_object_name = "club"
 
     def get_object(self):
+        # The name (slug), fbref id or id, each a unique Club column
         club = self.kwargs.get("club_name")
-        club_param = club.replace(" ", "").replace("-", "")
-
-        try:
-            club_id = int(club)
-            search = (
-                ClubSeasonStat.objects.filter(club__id=club_id)
-                .order_by("-season__season")
-                .first()
-            )
-            return search
-
-        except ClubSeasonStat.MultipleObjectsReturned:
-            search = (
-                ClubSeasonStat.objects.filter(club__name__iexact=club)
-                .order_by("-season__season")
-                .first()
-            )
-            return search
-        except ValueError:
-            normalized = club.replace(" ", "").replace("-", "")
-            search = (
-                ClubSeasonStat.objects.annotate(
-                    normalized_name=Replace(
-                        Replace(F("club__name"), Value(" "), Value("")),
-                        Value("-"),
-                        Value(""),
-                    )
-                )
-                .filter(
-                    Q(normalized_name__icontains=normalized)
-                    | Q(club__fbref_id__iexact=club)
-                )
-                .order_by("-season__season")
-                .first()
-            )
-
+        club_id = Club.id_for(club)
+        search = (
+            ClubSeasonStat.objects.filter(club_id=club_id)
+            .order_by("-season__season")
+            .first()
+            if club_id is not None
+            else None
+        )
         if search is None:
             raise Http404(f"Club '{club}' not found")
-        print(search)
         return search
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        club = self.get_object()
+        club = self.object
         player_qs = PlayerSeasonStats.objects.select_related(
             "club", "season", "player"
         ).filter(club=club.club)
         goalkeeper_qs = Goalkeeper.objects.select_related(
             "player", "club", "season"
         ).filter(club=club.club)
-        player_qs = player_qs.annotate(GA=F("goals") + F("assists"))
         all_seasons = ClubSeasonStat.objects.filter(club=club.club).order_by(
             "-season__season"
         )
@@ -363,105 +120,12 @@ class ClubSeasonStatView(DetailView):
                 grouped[season] = list(obj)
             return grouped
 
-        def Top_players(qs, orderby):
-            seasons = qs.values_list("season__season", flat=True).distinct()
-            grouped = {}
-            field_name = orderby.lstrip("-")
-            for season in seasons:
-                zero_filter = {f"{field_name}__gt": 0}
-                season_query = qs.filter(season__season=season)
-                top10 = season_query.filter(**zero_filter).order_by(orderby)[:10]
-                grouped[season] = list(top10)
-            return grouped
-
-        context["player_games_completed"] = Top_players(player_qs, "-matches_completed")
-        context["player_matches_played"] = Top_players(player_qs, "-matches_played")
-        context["player_minutes_played"] = Top_players(player_qs, "-minutes_played")
-        context["player_matches_substituted"] = Top_players(
-            player_qs, "-matches_substituted"
-        )
-        context["player_unused_sub"] = Top_players(player_qs, "-unused_sub")
-        context["player_goals"] = Top_players(player_qs, "-goals")
-        context["player_assists"] = Top_players(player_qs, "-assists")
-        context["player_GA"] = Top_players(player_qs, "-GA")
-        context["player_xg"] = Top_players(player_qs, "-xg")
-        context["player_npxg"] = Top_players(player_qs, "-npxg")
-        context["player_xg_performance"] = Top_players(player_qs, "-xg_performance")
-        context["player_npxg_performance"] = Top_players(player_qs, "-npxg_performance")
-        context["player_prog_carries"] = Top_players(player_qs, "-prog_carries")
-        context["player_prog_carries_final_3rd"] = Top_players(
-            player_qs, "-prog_carries_final_3rd"
-        )
-        context["player_prog_passes"] = Top_players(player_qs, "-prog_passes")
-        context["player_shots_target"] = Top_players(player_qs, "-shots_target")
-        context["player_passes_to_final_3rd"] = Top_players(
-            player_qs, "-passes_to_final_3rd"
-        )
-        context["player_passes_to_pen_area"] = Top_players(
-            player_qs, "-passes_to_pen_area"
-        )
-        context["player_pass_switches"] = Top_players(player_qs, "-pass_switches")
-        context["player_through_ball"] = Top_players(player_qs, "-through_ball")
-        context["player_shots_creation_action"] = Top_players(
-            player_qs, "-shots_creation_action"
-        )
-        context["player_offsides"] = Top_players(player_qs, "-offsides")
-        context["player_pen_won"] = Top_players(player_qs, "-pen_won")
-        context["player_pen_conceded"] = Top_players(player_qs, "-pen_conceded")
-        context["player_tackles"] = Top_players(player_qs, "-tackles")
-        context["player_ball_recoveries"] = Top_players(player_qs, "-ball_recoveries")
-        context["player_aerial_duels_won"] = Top_players(player_qs, "-aerial_duels_won")
-        context["player_aerial_duels_lost"] = Top_players(
-            player_qs, "-aerial_duels_lost"
-        )
-        context["player_blocks"] = Top_players(player_qs, "-blocks")
-        context["player_tackles_won"] = Top_players(player_qs, "-tackles_won")
-        context["player_interceptions"] = Top_players(player_qs, "-interceptions")
-        context["player_touches"] = Top_players(player_qs, "-touches")
-        context["player_dispossessed"] = Top_players(player_qs, "-dispossessed")
-        context["player_miscontrols"] = Top_players(player_qs, "-miscontrols")
-        context["player_take_ons"] = Top_players(player_qs, "-take_ons")
-        context["player_take_ons_won"] = Top_players(player_qs, "-take_ons_won")
-        context["player_fouls_won"] = Top_players(player_qs, "-fouls_won")
-        context["player_fouls_committed"] = Top_players(player_qs, "-fouls_committed")
-        context["player_carries_to_final_3rd"] = Top_players(
-            player_qs, "-carries_to_final_3rd"
-        )
-        context["player_carries_to_pen_area"] = Top_players(
-            player_qs, "-carries_to_pen_area"
-        )
-        context["player_yellow_card"] = Top_players(player_qs, "-yellow_card")
-        context["player_red_card"] = Top_players(player_qs, "-red_card")
-        context["goalkeeper_games_played"] = Top_players(
-            goalkeeper_qs, "-matches_played"
-        )
-        context["goalkeeper_minutes_played"] = Top_players(
-            goalkeeper_qs, "-minutes_played"
-        )
-        context["goalkeeper_goals_conceded"] = Top_players(
-            goalkeeper_qs, "-goals_conceded"
-        )
-        context["goalkeeper_shots_faced"] = Top_players(goalkeeper_qs, "-shots_faced")
-        context["goalkeeper_saves"] = Top_players(goalkeeper_qs, "-saves")
-        context["goalkeeper_save_percentage"] = Top_players(
-            goalkeeper_qs, "-save_percentage"
-        )
-        context["goalkeeper_clean_sheets"] = Top_players(goalkeeper_qs, "-clean_sheets")
-        context["goalkeeper_psxg"] = Top_players(goalkeeper_qs, "-psxg")
-        context["goalkeeper_psxg_performance"] = Top_players(
-            goalkeeper_qs, "-psxg_performance"
-        )
-        context["goalkeeper_pen_saved"] = Top_players(goalkeeper_qs, "-pen_saved")
-        context["goalkeeper_passes"] = Top_players(goalkeeper_qs, "-passes")
-        context["goalkeeper_crosses_stopped"] = Top_players(
-            goalkeeper_qs, "-crosses_stopped"
-        )
-        context["goalkeeper_sweeper_action"] = Top_players(
-            goalkeeper_qs, "-sweeper_action"
-        )
-        context["goalkeeper_sweeper_action_per90"] = Top_players(
-            goalkeeper_qs, "-sweeper_action_per90"
-        )
+        tables = stored_tables(club_scope(club.club_id))
+        if tables is None:
+            tables = club_tables(club.club)
+        context.update(tables)
+        add_aliases(context, "player", {"games_completed": "matches_completed"})
+        add_aliases(context, "goalkeeper", GOALKEEPER_ALIASES)
 
         context["player_season"] = group_by_season(player_qs, "-position")
         context["all_seasons"] = all_seasons
@@ -472,72 +136,26 @@ class ClubSeasonStatView(DetailView):
         return context
 
 
-class PlayerSeasonDetailView(DetailView):
+class PlayerSeasonDetailView(CachedPageMixin, DetailView):
     model = PlayerSeasonStats
     template_name = "core/player.html"
     context_object_name = "player"
 
     def get_object(self):
+        # The name (slug), fbref id or id, each a unique Player column;
+        # the first season, as outfield player or else as goalkeeper
         player = self.kwargs.get("player_id")
-        normalized_name = player.replace(" ", "").replace("-", "")
-
-        # First: Try PlayerSeasonStats
-        try:
-            search = PlayerSeasonStats.objects.get(
-                Q(player__full_name__iexact=player) | Q(player__fbref_id=player)
-            )
-
-            return search
-        except PlayerSeasonStats.DoesNotExist:
-            pass
-        except PlayerSeasonStats.MultipleObjectsReturned:
-            search = (
-                PlayerSeasonStats.objects.annotate(
-                    normalized=Replace(
-                        Replace(F("player__full_name"), Value(" "), Value("")),
-                        Value("-"),
-                        Value(""),
-                    )
-                )
-                .filter(normalized__icontains=normalized_name)
-                .order_by("season__season")
-                .first()
-            )
-            if search:
-
-                return search
-
-        # Second: Try Goalkeeper model
-        try:
-            return Goalkeeper.objects.get(
-                Q(player__full_name__iexact=player) | Q(player__fbref_id=player)
-            )
-        except Goalkeeper.DoesNotExist:
-            pass
-        except Goalkeeper.MultipleObjectsReturned:
-            search = (
-                Goalkeeper.objects.annotate(
-                    normalized=Replace(
-                        Replace(F("player__full_name"), Value(" "), Value("")),
-                        Value("-"),
-                        Value(""),
-                    )
+        player_id = Player.id_for(player)
+        if player_id is not None:
+            for model in (PlayerSeasonStats, Goalkeeper):
+                search = (
+                    model.objects.filter(player_id=player_id)
+                    .order_by("season__season")
+                    .first()
                 )
-                .filter(normalized__icontains=normalized_name)
-                .order_by("season__season")
-                .first()
-            )
-            if search:
-                return search
-
-        try:
-            player_id = int(player)
-            return PlayerSeasonStats.objects.get(player__id=player_id)
-        except (ValueError, PlayerSeasonStats.DoesNotExist):
-            try:
-                return Goalkeeper.objects.get(player__id=player_id)
-            except Goalkeeper.DoesNotExist:
-                raise Http404(f"Stats for {player} not found")
+                if search is not None:
+                    return search
+        raise Http404(f"Stats for {player} not found")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -548,7 +166,6 @@ class PlayerSeasonDetailView(DetailView):
                 .filter(player=current_player_season.player)
                 .order_by("season__season")
             )
-            player_qs = player_qs.annotate(GA=F("goals") + F("assists"))
         else:
             player_qs = (
                 Goalkeeper.objects.select_related("club", "season", "player")
@@ -577,152 +194,31 @@ class PlayerSeasonDetailView(DetailView):
         return context
 
 
-class EuropeTop5Leagues(ListView):
+class EuropeTop5Leagues(CachedPageMixin, ListView):
 
     template_name = "core/top5leagueplayers.html"
     context_object_name = "players"
     model = PlayerSeasonStats
 
     def get_queryset(self):
-        self.europe_leagues = ["Arkema", "WSL", "LigaF", "SerieA", "Frauen"]
         season = self.kwargs.get("season_season")
         self.season_cleaned = season.replace("-", "/")
-        return PlayerSeasonStats.objects.select_related(
-            "club", "season", "player"
-        ).filter(
-            season__season=self.season_cleaned, league__code__in=self.europe_leagues
-        )
+        return [
+            obj
+            for snapshot in get_snapshots([self.season_cleaned])
+            for obj in snapshot.tables[PlayerSeasonStats].values()
+            if obj.league.code in EUROPE_LEAGUES
+        ]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        qs = self.get_queryset()
-
-        def Top_players(orderby):
-            field_name = orderby.lstrip("-")
-            zero_filter = {f"{field_name}__gt": 0}
-            top10 = qs.filter(**zero_filter).order_by(orderby)[:10]
-            return top10
-
-        def U23_top_players(orderby):
-            field_name = orderby.lstrip("-")
-            zero_filter = {f"{field_name}__gt": 0}
-            U23_qs = qs.filter(player__player_age__lt=23)
-            top10 = U23_qs.filter(**zero_filter).order_by(orderby)[:10]
-            return top10
-
-        def top_goalkeepers(orderby):
-            field_name = orderby.lstrip("-")
-            zero_filter = {f"{field_name}__gt": 0}
-            gk_qs = Goalkeeper.objects.select_related("player", "club", "season", "league").filter(
-                season__season=self.season_cleaned, league__code__in=self.europe_leagues
-            )
-            top10 = gk_qs.filter(**zero_filter).order_by(orderby)[:10]
-            return top10
-
-        def top_clubs(orderby):
-            field_name = orderby.lstrip("-")
-            zero_filter = {f"{field_name}__gt": 0}
-            club_qs = ClubSeasonStat.objects.select_related(
-                "club", "season", "league"
-            ).filter(
-                season__season=self.season_cleaned, league__code__in=self.europe_leagues
-            )
-            top10 = club_qs.filter(**zero_filter).order_by(orderby)[:10]
-            return top10
-
-        metrics = [
-            "matches_played",
-            "minutes_played",
-            "matches_completed",
-            "matches_substituted",
-            "unused_sub",
-            "goals",
-            "assists",
-            "xg",
-            "npxg",
-            "xg_performance",
-            "npxg_performance",
-            "prog_carries",
-            "prog_carries_final_3rd",
-            "prog_passes",
-            "shots_target",
-            "passes_to_final_3rd",
-            "passes_to_pen_area",
-            "pass_switches",
-            "through_ball",
-            "shots_creation_action",
-            "offsides",
-            "pen_won",
-            "pen_conceded",
-            "tackles",
-            "ball_recoveries",
-            "aerial_duels_won",
-            "aerial_duels_lost",
-            "blocks",
-            "tackles_won",
-            "interceptions",
-            "touches",
-            "dispossessed",
-            "miscontrols",
-            "take_ons",
-            "take_ons_won",
-            "fouls_won",
-            "fouls_committed",
-            "carries_to_final_3rd",
-            "carries_to_pen_area",
-            "yellow_card",
-            "red_card",
-        ]
-
-        for metric in metrics:
-            context[f"player_{metric}"] = Top_players(f"-{metric}")
-            context[f"U23_player_{metric}"] = U23_top_players(f"-{metric}")
-
-        gk_metrics = [
-            "matches_played",
-            "minutes_played",
-            "goals_conceded",
-            "shots_faced",
-            "saves",
-            "save_percentage",
-            "clean_sheets",
-            "psxg",
-            "psxg_performance",
-            "pen_saved",
-            "passes",
-            "crosses_stopped",
-            "sweeper_action",
-            "sweeper_action_per90",
-        ]
-
-        for metric in gk_metrics:
-            context[f"gk_{metric}"] = top_goalkeepers(f"-{metric}")
-
-        club_metrics = [
-            "points_won",
-            "league_position",
-            "matches_played",
-            "win",
-            "draw",
-            "lost",
-            "goals_scored",
-            "goals_conceded",
-            "xg_created",
-            "xg_conceded",
-            "shots_allowed",
-            "shots_target_allowed",
-            "attempted_passes_against",
-            "comp_passes_allowed",
-            "passes_to_final_third_allowed",
-            "passes_to_pen_area_allowed",
-        ]
-
-        for metric in club_metrics:
-            context[f"club_{metric}"] = top_clubs(f"-{metric}")
+        tables = europe_tables(self.season_cleaned)
+        for key, grouped in tables.items():
+            context[key] = grouped.get(self.season_cleaned, [])
         return context
 
 
-class EuropeSeasonList(ListView):
+class EuropeSeasonList(CachedPageMixin, ListView):
     queryset = Season.objects.all()
     template_name = "core/seasonlist.html"
     context_object_name = "seasons"
@@ -157,6 +157,44 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "accounts.CustomUser"
 
 
+# Caching
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Rendered core pages live in the "pages" cache. Entries never expire on
+# their own: the keys carry the data generation, which the import commands
+# bump. Pick "locmem" (per process), "file" or "redis" with PAGE_CACHE_BACKEND.
+
+PAGE_CACHE_BACKEND = os.getenv("PAGE_CACHE_BACKEND", "locmem")
+PAGE_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "wosoapi-pages",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("PAGE_CACHE_LOCATION", str(BASE_DIR / ".page_cache")),
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("PAGE_CACHE_LOCATION", "redis://127.0.0.1:6379/1"),
+    },
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "pages": {
+        **PAGE_CACHE_BACKENDS[PAGE_CACHE_BACKEND],
+        "TIMEOUT": None,
+    },
+}
+
+# Above this many rows (as estimated by the PostgreSQL planner) list responses
+# report the estimate instead of running an exact COUNT(*). 0 always counts.
+COUNT_ESTIMATE_THRESHOLD = int(os.getenv("COUNT_ESTIMATE_THRESHOLD", "100000"))
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework_simplejwt.authentication.JWTAuthentication",